@@ -0,0 +1,342 @@
+"""
+分析快照模組
+專案：CSV 數據分析與管理系統
+負責：將 test_records 維護為依 test_date / fixture 分區的 Parquet 資料集，供整體母體分析以欄式向量化掃描
+"""
+
+import os
+import json
+import shutil
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from urllib.parse import quote
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, func
+
+from config import Config
+from models import TestRecord, db_manager
+from result_cache import statistics_cache
+from population_stats import pivot_measurements
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 未安裝時停用快照功能
+    pa = ds = pq = None
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 flock，只能在本行程內互斥
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AnalyticsSnapshot:
+    """
+    Parquet 分析快照
+    每個 (test_date, fixture) 分區一個檔案，頻率為 freq_XXX 寬欄位（無值為 NaN）；
+    分區簽章（筆數、最大 ID、最後更新時間）記錄於 _state.json，刷新時只重寫簽章變動的分區並移除已不存在的分區，
+    因此匯入、覆蓋與刪除都能增量反映。匯入與刪除完成後以背景執行緒刷新，同時多次觸發合併為一次。
+    網頁服務、目錄監看與命令列可能是不同行程，刷新與讀取另以快照目錄中的 flock 檔案互斥
+    """
+
+    STATE_FILE = '_state.json'
+    DATA_FILE = 'data.parquet'
+    # 行程間鎖定檔（以 . 開頭，pyarrow 讀取資料集時忽略）
+    REFRESH_LOCK_FILE = '.refresh.lock'
+    FILES_LOCK_FILE = '.files.lock'
+    NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+    RECORD_COLUMNS = ['record_id', 'sn', 'test_time', 'test_type', 'import_time']
+    PARTITION_COLUMNS = ['test_date', 'fixture']
+
+    def __init__(self, snapshot_dir: Optional[str] = None):
+        self.snapshot_dir = snapshot_dir or Config.SNAPSHOT_DIR
+        self.bands = list(Config.FREQUENCY_BANDS)
+        self.band_columns = [f'freq_{band}' for band in self.bands]
+
+        # _files_lock：替換/讀取分區檔案；_refresh_lock：同時只執行一次刷新；_schedule_lock：背景刷新排程
+        self._files_lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._schedule_lock = threading.Lock()
+        self._pending = False
+        self._worker: Optional[threading.Thread] = None
+
+        self.stats = {'refreshes': 0, 'partitions_written': 0, 'partitions_removed': 0}
+
+    @property
+    def available(self) -> bool:
+        """是否可使用快照（已安裝 pyarrow 且未停用）"""
+        return pa is not None and Config.SNAPSHOT_ENABLED
+
+    @property
+    def ready(self) -> bool:
+        """快照是否已建立"""
+        return os.path.exists(os.path.join(self.snapshot_dir, self.STATE_FILE))
+
+    def _require_available(self):
+        if pa is None:
+            raise RuntimeError("分析快照需要 pyarrow，請執行 pip install pyarrow")
+        if not Config.SNAPSHOT_ENABLED:
+            raise RuntimeError("分析快照已停用（SNAPSHOT_ENABLED=false）")
+
+    @contextmanager
+    def _process_lock(self, name: str, shared: bool = False):
+        """以 flock 鎖定快照目錄中的鎖定檔（跨行程）；同一行程內的互斥仍由 threading 鎖負責"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with open(os.path.join(self.snapshot_dir, name), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def ensure_initialized(self):
+        """快照尚未建立時（例如既有資料庫升級後第一次啟動）於背景建立"""
+        if self.available and not self.ready:
+            logger.info("分析快照尚未建立，開始於背景建立")
+            self.schedule_refresh()
+
+    def schedule_refresh(self):
+        """於背景刷新快照；刷新進行中再次觸發時，於本次完成後再執行一次"""
+        if not self.available:
+            return
+        with self._schedule_lock:
+            self._pending = True
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._refresh_loop, name='analytics-snapshot', daemon=True)
+            self._worker.start()
+
+    def _refresh_loop(self):
+        while True:
+            with self._schedule_lock:
+                if not self._pending:
+                    self._worker = None
+                    return
+                self._pending = False
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"分析快照刷新失敗：{e}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待背景刷新（含刷新期間再次觸發的下一次）完成
+        刷新執行緒為 daemon，命令列匯入結束前須呼叫，否則行程結束時刷新會被中斷
+
+        Returns:
+            bool: 是否已完成（逾時為 False）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._schedule_lock:
+                worker = self._worker
+            if worker is None:
+                return True
+            worker.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+            if worker.is_alive():
+                return False
+
+    def refresh(self, full: bool = False) -> Dict:
+        """
+        刷新快照
+
+        Args:
+            full: 是否捨棄既有快照全部重建
+
+        Returns:
+            Dict: {'partitions': 分區總數, 'written': 重寫分區數, 'removed': 移除分區數, 'records': 重寫記錄數}
+        """
+        self._require_available()
+        with self._refresh_lock, self._process_lock(self.REFRESH_LOCK_FILE):
+            # 狀態檔須在取得行程間鎖定後讀取（其他行程可能剛完成刷新）
+            state = {} if full else self._load_state()
+            signatures = self._query_signatures()
+
+            changed = sorted(key for key, signature in signatures.items() if state.get(key) != signature)
+            removed = [key for key in state if key not in signatures]
+
+            written_records = 0
+            for start in range(0, len(changed), Config.SNAPSHOT_PARTITION_BATCH):
+                batch = changed[start:start + Config.SNAPSHOT_PARTITION_BATCH]
+                tables = self._load_partitions(batch)
+                with self._files_lock, self._process_lock(self.FILES_LOCK_FILE):
+                    for key in batch:
+                        table = tables.get(key)
+                        if table is None:
+                            # 讀取期間分區已被刪除，留待下次刷新
+                            signatures.pop(key, None)
+                            continue
+                        self._write_partition(key, table)
+                        written_records += table.num_rows
+                        state[key] = signatures[key]
+                    self._save_state(state)
+
+            with self._files_lock, self._process_lock(self.FILES_LOCK_FILE):
+                for key in removed:
+                    shutil.rmtree(self._partition_path(key), ignore_errors=True)
+                    state.pop(key, None)
+                self._save_state(state)
+
+        if changed or removed:
+            # 依快照計算的統計結果已過期
+            statistics_cache.invalidate()
+        self.stats['refreshes'] += 1
+        self.stats['partitions_written'] += len(changed)
+        self.stats['partitions_removed'] += len(removed)
+        result = {'partitions': len(state), 'written': len(changed), 'removed': len(removed),
+                  'records': written_records}
+        logger.info(f"分析快照刷新完成：{result}")
+        return result
+
+    def _query_signatures(self) -> Dict[Tuple[str, str], List]:
+        """
+        以單一分組查詢取得各分區簽章 [筆數, 最大 ID, 最後更新時間]
+        快照於寫入後立即刷新，簽章與分區內容須讀取主庫的最新資料（副本可能尚未同步，會把舊資料記為最新簽章）
+        """
+        stmt = select(
+            TestRecord.test_date, TestRecord.fixture,
+            func.count(), func.max(TestRecord.id), func.max(TestRecord.updated_at)
+        ).group_by(TestRecord.test_date, TestRecord.fixture)
+
+        with db_manager.get_read_session(fresh=True) as session:
+            return {
+                (test_date, fixture): [count, max_id, str(updated_at) if updated_at else None]
+                for test_date, fixture, count, max_id, updated_at in session.execute(stmt)
+            }
+
+    def _load_partitions(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], 'pa.Table']:
+        """自資料庫讀取多個分區的記錄與量測值（單一查詢，依測試日期篩選），量測值轉為頻帶寬矩陣"""
+        dates = sorted({test_date for test_date, _ in keys})
+        record_stmt = select(
+            TestRecord.id, TestRecord.sn, TestRecord.test_date, TestRecord.test_time,
+            TestRecord.test_type, TestRecord.fixture, TestRecord.import_time, TestRecord.measurement_data
+        ).where(TestRecord.test_date.in_(dates)).order_by(TestRecord.id)
+
+        # 以連線層級執行（Core 結果列），不經過 ORM 結果處理
+        with db_manager.get_read_session(fresh=True) as session:
+            records = session.connection().execute(record_stmt).all()
+
+        if not records:
+            return {}
+        record_ids, sns, test_dates, test_times, test_types, fixtures, import_times, blobs = (
+            list(column) for column in zip(*records)
+        )
+        record_ids = np.asarray(record_ids, dtype=np.int64)
+
+        values = pivot_measurements(blobs, self.bands)
+
+        partition_rows: Dict[Tuple[str, str], List[int]] = {}
+        for index, key in enumerate(zip(test_dates, fixtures)):
+            partition_rows.setdefault(key, []).append(index)
+        columns = {
+            'record_id': record_ids,
+            'sn': np.array(sns, dtype=object),
+            'test_time': np.array(test_times, dtype=object),
+            'test_type': np.array(test_types, dtype=object),
+            'import_time': np.array(import_times, dtype='datetime64[us]')
+        }
+
+        tables = {}
+        for key in keys:
+            if key not in partition_rows:
+                continue
+            mask = np.asarray(partition_rows[key])
+            arrays = [pa.array(columns[name][mask]) for name in self.RECORD_COLUMNS]
+            arrays += [pa.array(values[mask, index], type=pa.float64()) for index in range(len(self.bands))]
+            tables[key] = pa.Table.from_arrays(arrays, names=self.RECORD_COLUMNS + self.band_columns)
+        return tables
+
+    def _partition_path(self, key: Tuple[str, str]) -> str:
+        test_date, fixture = key
+        fixture_dir = self.NULL_PARTITION if fixture is None else quote(fixture, safe='')
+        return os.path.join(self.snapshot_dir, f'test_date={quote(test_date, safe="")}', f'fixture={fixture_dir}')
+
+    def _write_partition(self, key: Tuple[str, str], table: 'pa.Table'):
+        """寫入暫存檔後以 os.replace 替換，讀取端不會看到寫到一半的檔案"""
+        directory = self._partition_path(key)
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, f'.{self.DATA_FILE}.tmp')
+        pq.write_table(table, temp_path)
+        os.replace(temp_path, os.path.join(directory, self.DATA_FILE))
+
+    def _load_state(self) -> Dict[Tuple[str, str], List]:
+        """讀取分區簽章；頻帶設定已變更或狀態檔不存在時視為空快照"""
+        path = os.path.join(self.snapshot_dir, self.STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"分析快照狀態檔無法讀取，將重建：{e}")
+            return {}
+        if saved.get('bands') != self.bands:
+            return {}
+        return {(test_date, fixture): signature for test_date, fixture, signature in saved['partitions']}
+
+    def _save_state(self, state: Dict[Tuple[str, str], List]):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = os.path.join(self.snapshot_dir, self.STATE_FILE)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'bands': self.bands,
+                'partitions': [[test_date, fixture, signature] for (test_date, fixture), signature in state.items()]
+            }, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _dataset(self) -> Optional['ds.Dataset']:
+        if not self.ready:
+            return None
+        partitioning = ds.HivePartitioning(
+            pa.schema([('test_date', pa.string()), ('fixture', pa.string())]),
+            null_fallback=self.NULL_PARTITION
+        )
+        return ds.dataset(self.snapshot_dir, format='parquet', partitioning=partitioning)
+
+    def read(self, columns: List[str], fixtures: Optional[List[str]] = None,
+             test_types: Optional[List[str]] = None,
+             date_range: Optional[Tuple[str, str]] = None) -> Optional['pa.Table']:
+        """
+        讀取快照欄位（治具與日期條件只掃描符合的分區）
+
+        Args:
+            columns: 欄位名稱（record_id、sn、test_type、test_date、fixture、freq_XXX 等）
+            fixtures: 只讀取這些治具
+            test_types: 只讀取這些測試項目
+            date_range: 測試日期範圍 (start_date, end_date)
+
+        Returns:
+            Optional[pa.Table]: 快照尚未建立時為 None
+        """
+        self._require_available()
+        expression = None
+
+        def _and(condition):
+            return condition if expression is None else expression & condition
+
+        if fixtures is not None:
+            expression = _and(ds.field('fixture').isin(list(fixtures)))
+        if date_range:
+            expression = _and((ds.field('test_date') >= date_range[0]) & (ds.field('test_date') <= date_range[1]))
+        if test_types is not None:
+            expression = _and(ds.field('test_type').isin(list(test_types)))
+
+        with self._files_lock, self._process_lock(self.FILES_LOCK_FILE, shared=True):
+            dataset = self._dataset()
+            if dataset is None:
+                return None
+            return dataset.to_table(columns=columns, filter=expression)
+
+# 全域分析快照實例
+analytics_snapshot = AnalyticsSnapshot()
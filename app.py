@@ -5,18 +5,24 @@ Flask Web 應用主程式
 修正：相容 Flask 2.2+ 版本，新增治具功能
 """
 
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, flash, redirect, url_for
 from werkzeug.utils import secure_filename
 import os
 import tempfile
-from datetime import datetime
+import zipfile
+from datetime import datetime, timedelta
 import logging
 
 # 導入自定義模組
 try:
     from models import init_database
     from data_service import database_service, import_service, query_service
-    from config import get_config
+    from result_cache import statistics_cache
+    from export_service import export_service
+    from limit_service import limit_service
+    from analytics_snapshot import analytics_snapshot
+    import instrumentation
+    from config import get_config, Config
 except ImportError as e:
     print(f"❌ 模組匯入失敗：{e}")
     print("請確認所有檔案都在正確位置")
@@ -41,6 +47,9 @@ MAX_CONTENT_LENGTH = getattr(config_class, 'MAX_CONTENT_LENGTH', 16 * 1024 * 102
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
+# 請求延遲、SQL 次數與耗時量測
+instrumentation.init_app(app)
+
 # 確保上傳目錄存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -66,6 +75,9 @@ def initialize_app():
         else:
             logger.error("資料庫初始化失敗")
         
+        # 分析快照不存在時（例如既有資料庫升級）於背景建立
+        analytics_snapshot.ensure_initialized()
+        
         logger.info("應用初始化完成")
         
     except Exception as e:
@@ -124,9 +136,14 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'message': '只支援 CSV 檔案'}), 400
         
+        # 驗證匯入模式
+        import_mode = request.form.get('import_mode', Config.IMPORT_MODE)
+        if import_mode not in Config.IMPORT_MODES:
+            return jsonify({'success': False, 'message': f'不支援的匯入模式：{import_mode}'}), 400
+        
         # 儲存檔案
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')  # 背景匯入時避免檔名衝突
         safe_filename = f"{timestamp}_{filename}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
         
@@ -140,32 +157,124 @@ def upload_file():
         if fixture not in ['治具1', '治具2']:
             fixture = '治具1'  # 預設值
         
-        # 匯入資料
-        logger.info(f"開始匯入檔案：{filename}，治具：{fixture}")
-        success, result = import_service.import_csv_file(filepath, filename, fixture, encoding)
+        # 排入背景匯入佇列，立即返回匯入記錄 ID
+        logger.info(f"排入匯入佇列：{filename}，治具：{fixture}，模式：{import_mode}")
+        import_id = import_service.enqueue_import(filepath, filename, fixture, encoding, mode=import_mode)
         
-        # 清理臨時檔案
-        try:
-            os.remove(filepath)
-        except:
-            pass
+        return jsonify({
+            'success': True,
+            'message': '檔案已上傳，匯入作業處理中',
+            'import_id': import_id,
+            'status_url': url_for('api_import_status', import_id=import_id)
+        }), 202
+            
+    except Exception as e:
+        logger.error(f"檔案上傳錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'上傳失敗：{str(e)}'}), 500
+
+@app.route('/api/upload/batch', methods=['POST'])
+def upload_batch():
+    """批次上傳 API：一次上傳多個 CSV 檔案或 ZIP 壓縮檔"""
+    try:
+        uploaded_files = [file for file in request.files.getlist('files') + request.files.getlist('file')
+                          if file.filename]
+        if not uploaded_files:
+            return jsonify({'success': False, 'message': '未選擇檔案'}), 400
         
-        if success:
-            return jsonify({
-                'success': True,
-                'message': result['message'],
-                'statistics': result['statistics']
-            })
-        else:
+        # 獲取參數
+        encoding = request.form.get('encoding', 'utf-8')
+        fixture = request.form.get('fixture', '治具1')
+        import_mode = request.form.get('import_mode', Config.IMPORT_MODE)
+        
+        # 驗證匯入模式
+        if import_mode not in Config.IMPORT_MODES:
+            return jsonify({'success': False, 'message': f'不支援的匯入模式：{import_mode}'}), 400
+        
+        # 驗證治具參數
+        if fixture not in ['治具1', '治具2']:
+            fixture = '治具1'  # 預設值
+        
+        # 儲存檔案，ZIP 則解壓縮其中的 CSV
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        files = []
+        skipped_files = []
+        for index, file in enumerate(uploaded_files):
+            filename = secure_filename(file.filename)
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{timestamp}_{index:03d}_{filename}")
+            
+            if filename.lower().endswith('.zip'):
+                file.save(filepath)
+                try:
+                    files.extend(import_service.extract_zip_csv_files(
+                        filepath, app.config['UPLOAD_FOLDER'], prefix=f"{timestamp}_{index:03d}_"
+                    ))
+                except zipfile.BadZipFile:
+                    skipped_files.append(file.filename)
+                finally:
+                    os.remove(filepath)
+            elif allowed_file(filename):
+                file.save(filepath)
+                files.append((filepath, filename))
+            else:
+                skipped_files.append(file.filename)
+        
+        if not files:
             return jsonify({
                 'success': False,
-                'message': result['message'],
-                'errors': result.get('errors', [])[:10]  # 只返回前10個錯誤
+                'message': '未找到可匯入的 CSV 檔案',
+                'skipped_files': skipped_files
             }), 400
-            
+        
+        # 排入背景匯入佇列，以單一批次工作匯入
+        logger.info(f"排入批次匯入佇列：{len(files)} 個檔案，治具：{fixture}，模式：{import_mode}")
+        import_ids = import_service.enqueue_batch(files, fixture, encoding, mode=import_mode)
+        
+        return jsonify({
+            'success': True,
+            'message': f'已上傳 {len(files)} 個檔案，批次匯入作業處理中',
+            'import_ids': import_ids,
+            'skipped_files': skipped_files,
+            'status_url': url_for('api_batch_import_status', ids=','.join(map(str, import_ids)))
+        }), 202
+        
     except Exception as e:
-        logger.error(f"檔案上傳錯誤：{str(e)}")
-        return jsonify({'success': False, 'message': f'上傳失敗：{str(e)}'}), 500
+        logger.error(f"批次上傳錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'批次上傳失敗：{str(e)}'}), 500
+
+@app.route('/api/import-status/batch')
+def api_batch_import_status():
+    """批次匯入進度 API"""
+    try:
+        ids = request.args.get('ids', '').strip()
+        import_ids = [int(value) for value in ids.split(',') if value.strip()]
+        if not import_ids:
+            return jsonify({'success': False, 'message': '請提供匯入記錄 ID（ids）'}), 400
+        
+        status = import_service.get_batch_status(import_ids)
+        if status is None:
+            return jsonify({'success': False, 'message': f'找不到匯入記錄：{ids}'}), 404
+        
+        return jsonify({'success': True, 'data': status})
+        
+    except ValueError:
+        return jsonify({'success': False, 'message': '匯入記錄 ID 格式錯誤'}), 400
+    except Exception as e:
+        logger.error(f"批次匯入進度查詢錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'查詢批次匯入進度失敗：{str(e)}'}), 500
+
+@app.route('/api/import-status/<int:import_id>')
+def api_import_status(import_id):
+    """匯入進度 API"""
+    try:
+        status = import_service.get_import_status(import_id)
+        if status is None:
+            return jsonify({'success': False, 'message': f'找不到匯入記錄：{import_id}'}), 404
+        
+        return jsonify({'success': True, 'data': status})
+        
+    except Exception as e:
+        logger.error(f"匯入進度查詢錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'查詢匯入進度失敗：{str(e)}'}), 500
 
 @app.route('/api/search')
 def api_search():
@@ -181,6 +290,15 @@ def api_search():
         
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        cursor = request.args.get('cursor', '').strip()  # 上一頁返回的 next_cursor（keyset 分頁）
+        count_mode = request.args.get('count', '').strip() or Config.SEARCH_COUNT_MODE
+        sn_match = request.args.get('sn_match', '').strip() or Config.SN_MATCH_MODE
+        
+        if count_mode not in Config.SEARCH_COUNT_MODES:
+            return jsonify({
+                'success': False,
+                'message': f'不支援的總筆數模式：{count_mode}（可用：{", ".join(Config.SEARCH_COUNT_MODES)}）'
+            }), 400
         
         # 構建查詢參數
         query_params = {}
@@ -196,10 +314,18 @@ def api_search():
             query_params['date_range'] = (start_date, end_date)
         
         query_params['limit'] = per_page
-        query_params['offset'] = (page - 1) * per_page
+        query_params['count_mode'] = count_mode
+        query_params['sn_match'] = sn_match
+        if cursor:
+            query_params['cursor'] = cursor
+        else:
+            query_params['offset'] = (page - 1) * per_page
         
         # 執行查詢
-        records, total = query_service.search_records(**query_params)
+        try:
+            records, total, next_cursor = query_service.search_records(**query_params)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         
         return jsonify({
             'success': True,
@@ -208,7 +334,9 @@ def api_search():
                 'page': page,
                 'per_page': per_page,
                 'total': total,
-                'pages': (total + per_page - 1) // per_page
+                'pages': (total + per_page - 1) // per_page if total is not None else None,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             }
         })
         
@@ -233,6 +361,28 @@ def api_get_sn_records(sn):
         logger.error(f"獲取 SN 記錄錯誤：{str(e)}")
         return jsonify({'success': False, 'message': f'獲取記錄失敗：{str(e)}'}), 500
 
+@app.route('/api/sn-search')
+def api_sn_search():
+    """SN 搜尋 API（exact/prefix/contains）"""
+    try:
+        sn = request.args.get('q', '').strip()
+        match = request.args.get('match', '').strip() or Config.SN_MATCH_MODE
+        limit = min(int(request.args.get('limit', 20)), Config.MAX_RECORDS_PER_PAGE)
+        
+        if not sn:
+            return jsonify({'success': False, 'message': '請提供搜尋字串 q'}), 400
+        if match not in Config.SN_MATCH_MODES:
+            return jsonify({
+                'success': False,
+                'message': f'不支援的 SN 搜尋方式：{match}（可用：{", ".join(Config.SN_MATCH_MODES)}）'
+            }), 400
+        
+        sns = query_service.search_sns(sn, match, limit)
+        return jsonify({'success': True, 'match': match, 'count': len(sns), 'data': sns})
+    except Exception as e:
+        logger.error(f"SN 搜尋錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'SN 搜尋失敗：{str(e)}'}), 500
+
 @app.route('/api/analysis/frequency')
 def api_frequency_analysis():
     """頻率分析 API"""
@@ -284,6 +434,39 @@ def api_compare_sn():
         logger.error(f"SN 比較錯誤：{str(e)}")
         return jsonify({'success': False, 'message': f'比較失敗：{str(e)}'}), 500
 
+@app.route('/api/analysis/batch', methods=['POST'])
+def api_batch_analysis():
+    """
+    批次分析 API：多個 SN x 頻率（x 治具）的統計值，以欄式格式返回
+    請求 JSON：{"sns": [...], "frequencies": [...], "fixtures": [...], "by_fixture": false,
+               "start_date": "YYYYMMDD", "end_date": "YYYYMMDD"}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        sns = data.get('sns', [])
+        frequencies = data.get('frequencies') or None
+        fixtures = [fixture for fixture in data.get('fixtures') or [] if fixture and fixture != 'all'] or None
+        by_fixture = bool(data.get('by_fixture', False))
+        start_date = str(data.get('start_date') or '').strip()
+        end_date = str(data.get('end_date') or '').strip()
+        
+        if not isinstance(sns, list) or not sns:
+            return jsonify({'success': False, 'message': '請提供 SN 列表 sns'}), 400
+        
+        date_range = (start_date, end_date) if start_date and end_date else None
+        result = query_service.batch_frequency_analysis(
+            [str(sn).strip() for sn in sns], frequencies, fixtures, by_fixture, date_range
+        )
+        
+        if 'error' in result:
+            return jsonify({'success': False, 'message': result['error']}), 400
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"批次分析錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'批次分析失敗：{str(e)}'}), 500
+
 @app.route('/api/analysis/compare-fixture')
 def api_compare_fixture():
     """比較治具性能 API"""
@@ -307,9 +490,10 @@ def api_compare_fixture():
 
 @app.route('/api/statistics')
 def api_statistics():
-    """統計資訊 API"""
+    """統計資訊 API（refresh=1 略過快取重新查詢）"""
     try:
-        stats = database_service.get_sn_statistics()
+        use_cache = request.args.get('refresh') != '1'
+        stats = database_service.get_sn_statistics(use_cache)
         return jsonify({'success': True, 'data': stats})
     except Exception as e:
         logger.error(f"統計資訊錯誤：{str(e)}")
@@ -336,7 +520,8 @@ def api_import_history():
                     'import_status': log.import_status,
                     'import_time': log.import_time.isoformat() if log.import_time else None,
                     'completed_time': log.completed_time.isoformat() if log.completed_time else None,
-                    'error_message': log.error_message
+                    'error_message': log.error_message,
+                    'performance': log.get_performance()
                 }
                 for log in history
             ]
@@ -383,7 +568,7 @@ def api_trend_analysis():
         sn = request.args.get('sn', '').strip()
         frequency = request.args.get('frequency', '').strip()
         fixture = request.args.get('fixture', '').strip()
-        days = int(request.args.get('days', 30))  # 預設分析最近30天
+        days = request.args.get('days', type=int)  # 分析最近 N 天（未提供則分析全部數據）
         
         if not sn or not frequency:
             return jsonify({'success': False, 'message': '請提供 SN 和頻率參數'}), 400
@@ -391,8 +576,14 @@ def api_trend_analysis():
         # 如果 fixture 為空或 'all'，則不篩選治具
         fixture_param = fixture if fixture and fixture != 'all' else None
         
+        # 指定天數時，日期範圍與統計值在資料庫中篩選計算
+        date_range = None
+        if days:
+            today = datetime.now()
+            date_range = ((today - timedelta(days=days)).strftime('%Y%m%d'), today.strftime('%Y%m%d'))
+        
         # 獲取趨勢數據
-        result = query_service.get_frequency_analysis(sn, frequency, fixture_param)
+        result = query_service.get_frequency_analysis(sn, frequency, fixture_param, date_range)
         
         if 'error' in result:
             return jsonify({'success': False, 'message': result['error']}), 404
@@ -402,9 +593,8 @@ def api_trend_analysis():
         
         # 計算趨勢指標
         if len(trend_data) > 1:
-            values = [item['value'] for item in trend_data]
-            trend_direction = 'increasing' if values[-1] > values[0] else 'decreasing'
-            volatility = max(values) - min(values)
+            trend_direction = 'increasing' if trend_data[-1]['value'] > trend_data[0]['value'] else 'decreasing'
+            volatility = result['max_value'] - result['min_value']
         else:
             trend_direction = 'stable'
             volatility = 0
@@ -426,57 +616,308 @@ def api_trend_analysis():
         logger.error(f"趨勢分析錯誤：{str(e)}")
         return jsonify({'success': False, 'message': f'趨勢分析失敗：{str(e)}'}), 500
 
+@app.route('/api/analytics/bands')
+def api_band_statistics():
+    """
+    整體母體頻帶統計 API（自 Parquet 分析快照計算）
+    參數：frequencies、fixtures、test_types（逗號分隔）、start_date、end_date（YYYYMMDD）、group_by（fixture/test_type）
+    """
+    try:
+        def _list_arg(name):
+            values = [value.strip() for value in request.args.get(name, '').split(',')]
+            return [value for value in values if value and value != 'all'] or None
+        
+        start_date = request.args.get('start_date', '').strip()
+        end_date = request.args.get('end_date', '').strip()
+        date_range = (start_date, end_date) if start_date and end_date else None
+        
+        result = query_service.get_band_statistics(
+            _list_arg('frequencies'), _list_arg('fixtures'), _list_arg('test_types'),
+            date_range, request.args.get('group_by', '').strip() or None
+        )
+        
+        if 'error' in result:
+            return jsonify({'success': False, 'message': result['error']}), 400
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"頻帶統計錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'頻帶統計失敗：{str(e)}'}), 500
+
+@app.route('/api/analytics/population', methods=['POST'])
+def api_population_analysis():
+    """
+    母體分析 API：各頻帶母體統計、離群 SN 與規格界線判定
+    請求 JSON：{"frequencies": [...], "fixtures": [...], "test_types": [...],
+               "start_date": "YYYYMMDD", "end_date": "YYYYMMDD", "method": "zscore|mad", "threshold": 3.0,
+               "limits": {"1000": {"lower": -80, "upper": -40}}}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        start_date = str(data.get('start_date') or '').strip()
+        end_date = str(data.get('end_date') or '').strip()
+        limits = data.get('limits') or None
+        
+        if limits is not None and not isinstance(limits, dict):
+            return jsonify({'success': False, 'message': 'limits 應為 {頻率: {"lower": 下限, "upper": 上限}}'}), 400
+        try:
+            threshold = float(data['threshold']) if data.get('threshold') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'threshold 應為數值'}), 400
+        
+        def _list_field(name):
+            values = data.get(name) or []
+            if not isinstance(values, (list, tuple)):
+                values = [values]  # 單一值（例如 "治具1"）視為只含一個元素的列表
+            return [str(value) for value in values if value and value != 'all'] or None
+        
+        result = query_service.get_population_analysis(
+            _list_field('frequencies'), _list_field('fixtures'), _list_field('test_types'),
+            (start_date, end_date) if start_date and end_date else None,
+            data.get('method') or None, threshold, limits
+        )
+        
+        if 'error' in result:
+            return jsonify({'success': False, 'message': result['error']}), 400
+        
+        return jsonify({'success': True, 'data': result})
+        
+    except Exception as e:
+        logger.error(f"母體分析錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'母體分析失敗：{str(e)}'}), 500
+
+# ==================== 黃金曲線 / 界線判定 API ====================
+
+@app.route('/api/limits/curves')
+def api_list_golden_curves():
+    """列出所有黃金曲線"""
+    try:
+        return jsonify({'success': True, 'data': limit_service.list_curves()})
+    except Exception as e:
+        logger.error(f"黃金曲線查詢錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'黃金曲線查詢失敗：{str(e)}'}), 500
+
+@app.route('/api/limits/curves', methods=['POST'])
+def api_save_golden_curve():
+    """
+    新增或取代黃金曲線 API，儲存後重新判定該治具 + 測試項目的既有記錄
+    請求 JSON：{"fixture": "治具1", "test_type": "left", "name": "...",
+               "points": {"1000": {"target": -60, "lower": -65, "upper": -55}, "2000": {"target": -58, "tolerance": 3}},
+               "evaluate": true}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        fixture = str(data.get('fixture') or '').strip()
+        test_type = str(data.get('test_type') or '').strip()
+        
+        curve = limit_service.save_curve(fixture, test_type, data.get('points'), data.get('name') or None)
+        evaluation = limit_service.evaluate(fixture, test_type) if data.get('evaluate', True) else None
+        
+        return jsonify({'success': True, 'data': {'curve': curve, 'evaluation': evaluation}})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"黃金曲線儲存錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'黃金曲線儲存失敗：{str(e)}'}), 500
+
+@app.route('/api/limits/curves/<int:curve_id>', methods=['DELETE'])
+def api_delete_golden_curve(curve_id):
+    """刪除黃金曲線與其判定結果"""
+    try:
+        if not limit_service.delete_curve(curve_id):
+            return jsonify({'success': False, 'message': '黃金曲線不存在'}), 404
+        return jsonify({'success': True, 'message': '黃金曲線已刪除'})
+    except Exception as e:
+        logger.error(f"黃金曲線刪除錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'黃金曲線刪除失敗：{str(e)}'}), 500
+
+@app.route('/api/limits/evaluate', methods=['POST'])
+def api_evaluate_limits():
+    """
+    重新判定既有記錄 API
+    請求 JSON：{"fixture": "治具1", "test_type": "left"}（皆可省略，省略時判定全部記錄）
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        fixture = str(data.get('fixture') or '').strip()
+        test_type = str(data.get('test_type') or '').strip()
+        
+        outcome = limit_service.evaluate(
+            fixture if fixture and fixture != 'all' else None,
+            test_type if test_type and test_type != 'all' else None
+        )
+        return jsonify({'success': True, 'data': outcome})
+        
+    except Exception as e:
+        logger.error(f"界線判定錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'界線判定失敗：{str(e)}'}), 500
+
+@app.route('/api/limits/results')
+def api_limit_results():
+    """
+    判定結果查詢 API
+    參數：status（failed/passed/all，預設 failed）、start_date、end_date（YYYYMMDD）、fixture、test_type、sn、limit
+    """
+    try:
+        def _arg(name):
+            value = request.args.get(name, '').strip()
+            return value if value and value != 'all' else None
+        
+        start_date = request.args.get('start_date', '').strip()
+        end_date = request.args.get('end_date', '').strip()
+        
+        results, total = limit_service.query_results(
+            request.args.get('status', 'failed'),
+            (start_date, end_date) if start_date and end_date else None,
+            _arg('fixture'), _arg('test_type'), _arg('sn'),
+            request.args.get('limit', type=int)
+        )
+        
+        return jsonify({'success': True, 'data': results, 'total': total})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"判定結果查詢錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'判定結果查詢失敗：{str(e)}'}), 500
+
 # ==================== 批次操作 API ====================
 
+def _parse_record_filters(source) -> dict:
+    """
+    自查詢參數或 JSON 取得記錄篩選條件（參數同 /api/search，另支援 record_ids）
+    
+    Raises:
+        ValueError: 日期範圍只提供一端、record_ids 格式不正確
+    """
+    filters = {}
+    for key in ('sn', 'sn_match', 'test_date', 'test_type', 'fixture'):
+        value = str(source.get(key) or '').strip()
+        if value and value != 'all':
+            filters[key] = value
+    
+    start_date = str(source.get('start_date') or '').strip()
+    end_date = str(source.get('end_date') or '').strip()
+    if start_date and end_date:
+        filters['date_range'] = (start_date, end_date)
+    elif start_date or end_date:
+        # 只給一端時不可忽略日期條件（刪除會擴大到所有日期）
+        raise ValueError('start_date 與 end_date 需同時提供')
+    
+    record_ids = _parse_record_ids(source)
+    if record_ids:
+        filters['record_ids'] = record_ids
+    return filters
+
+def _parse_record_ids(source) -> list:
+    """
+    取得 record_ids：JSON 為整數列表，查詢參數為逗號分隔字串（可重複指定）
+    
+    Raises:
+        ValueError: 格式不正確（非列表、含非整數的 ID）
+    """
+    if hasattr(source, 'getlist'):
+        values = [part for value in source.getlist('record_ids') for part in value.split(',')]
+    else:
+        values = source.get('record_ids') or []
+        if isinstance(values, str):
+            values = values.split(',')
+        elif not isinstance(values, list):
+            raise ValueError('record_ids 應為記錄 ID 列表')
+    
+    record_ids = []
+    for value in values:
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f'記錄 ID 格式錯誤：{value}')
+        try:
+            record_ids.append(int(value))
+        except ValueError:
+            raise ValueError(f'記錄 ID 格式錯誤：{value}')
+    return record_ids
+
 @app.route('/api/batch/delete', methods=['POST'])
 def api_batch_delete():
-    """批次刪除記錄 API"""
+    """
+    批次刪除記錄 API
+    請求 JSON：{"record_ids": [...]} 或篩選條件（同 /api/search，另支援 import_id）；
+    sn 預設完全相符，部分比對需明確指定 sn_match
+    """
     try:
-        data = request.get_json()
-        record_ids = data.get('record_ids', [])
+        data = request.get_json(silent=True) or {}
+        filters = _parse_record_filters(data)
+        if data.get('import_id') is not None:
+            filters['import_log_id'] = int(data['import_id'])
         
-        if not record_ids:
-            return jsonify({'success': False, 'message': '未提供要刪除的記錄 ID'}), 400
+        if not filters:
+            return jsonify({'success': False, 'message': '未提供要刪除的記錄 ID 或篩選條件'}), 400
         
-        # 這裡需要實作批次刪除邏輯
-        # deleted_count = database_service.batch_delete_records(record_ids)
+        outcome = database_service.delete_records(**filters)
         
-        # 暫時返回模擬結果
         return jsonify({
             'success': True,
-            'message': f'成功刪除 {len(record_ids)} 筆記錄',
-            'deleted_count': len(record_ids)
+            'message': f'成功刪除 {outcome["deleted"]} 筆記錄',
+            'deleted_count': outcome['deleted'],
+            'affected_sns': outcome['sns']
         })
         
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"批次刪除錯誤：{str(e)}")
         return jsonify({'success': False, 'message': f'批次刪除失敗：{str(e)}'}), 500
 
+def _export_response(filters: dict, export_format: str):
+    """以分塊傳輸串流回傳匯出檔案"""
+    try:
+        export_format = export_service.normalize_format(export_format)
+        content = export_service.stream(export_format, **filters)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    filename = f'export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+    return Response(content, mimetype=export_service.MIME_TYPES[export_format], headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Accel-Buffering': 'no'  # 反向代理不緩衝，讓前幾筆資料立即送達
+    })
+
 @app.route('/api/batch/export', methods=['POST'])
 def api_batch_export():
-    """批次匯出記錄 API"""
+    """
+    批次匯出記錄 API
+    請求 JSON：{"record_ids": [...]} 或篩選條件（同 /api/search），"format": csv / jsonl / xlsx
+    """
     try:
-        data = request.get_json()
-        record_ids = data.get('record_ids', [])
-        export_format = data.get('format', 'csv')  # csv, excel, json
-        
-        if not record_ids:
-            return jsonify({'success': False, 'message': '未提供要匯出的記錄 ID'}), 400
+        data = request.get_json(silent=True) or {}
+        filters = _parse_record_filters(data)
         
-        # 這裡需要實作批次匯出邏輯
-        # export_file = database_service.batch_export_records(record_ids, export_format)
+        if not filters:
+            return jsonify({'success': False, 'message': '未提供要匯出的記錄 ID 或篩選條件'}), 400
         
-        # 暫時返回模擬結果
-        return jsonify({
-            'success': True,
-            'message': f'成功匯出 {len(record_ids)} 筆記錄',
-            'download_url': f'/download/export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
-        })
+        return _export_response(filters, data.get('format', 'csv'))
         
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"批次匯出錯誤：{str(e)}")
         return jsonify({'success': False, 'message': f'批次匯出失敗：{str(e)}'}), 500
 
+@app.route('/api/export')
+def api_export():
+    """匯出符合搜尋條件的所有記錄（查詢參數同 /api/search，另加 format）"""
+    try:
+        return _export_response(_parse_record_filters(request.args), request.args.get('format', 'csv'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"匯出錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'匯出失敗：{str(e)}'}), 500
+
 # ==================== 錯誤處理 ====================
 
 @app.errorhandler(404)
@@ -528,11 +969,14 @@ def dev_database_info():
     config_class = get_config()
     if getattr(config_class, 'DEBUG', False):
         try:
+            from models import db_manager
             stats = database_service.get_sn_statistics()
             return jsonify({
                 'success': True,
                 'database_url': config_class.DATABASE_URL,
                 'statistics': stats,
+                'statistics_cache': statistics_cache.get_stats(),
+                'connection_pools': db_manager.get_pool_stats(),
                 'table_info': {
                     'test_records': stats.get('total_records', 0),
                     'unique_sns': stats.get('total_sns', 0),
@@ -551,7 +995,8 @@ def dev_database_info():
 def health_check():
     """系統健康檢查"""
     try:
-        # 檢查資料庫連接
+        # 檢查資料庫連接（記錄總數取自統計快取）
+        database_service.ping()
         stats = database_service.get_sn_statistics()
         
         return jsonify({
@@ -569,6 +1014,28 @@ def health_check():
             'error': str(e)
         }), 503
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus 指標（文字格式）：路由延遲、每個請求的 SQL 次數與耗時、匯入各階段耗時"""
+    return Response(instrumentation.metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/metrics/pool')
+def api_pool_metrics():
+    """
+    連線池指標 API：各連線池（write / read）的取用、等待時間、溢出與失效次數，以及目前狀態
+    參數：reset=true 取得後清除累計指標
+    """
+    try:
+        from models import db_manager
+        stats = db_manager.get_pool_stats()
+        if request.args.get('reset', '').lower() == 'true':
+            for metrics in db_manager.pool_metrics.values():
+                metrics.reset()
+        return jsonify({'success': True, 'data': stats})
+    except Exception as e:
+        logger.error(f"連線池指標查詢錯誤：{str(e)}")
+        return jsonify({'success': False, 'message': f'連線池指標查詢失敗：{str(e)}'}), 500
+
 @app.route('/version')
 def version_info():
     """版本資訊"""
@@ -630,7 +1097,7 @@ def inject_global_vars():
         'current_year': datetime.now().year,
         'fixture_types': ['治具1', '治具2'],
         'test_types': ['left', 'right', 'rec1', 'rec2'],
-        'supported_frequencies': ['100', '125', '160', '200', '250', '315', '400', '500', '630', '800', '1000', '1250', '1600', '2000']
+        'supported_frequencies': Config.FREQUENCY_BANDS
     }
 
 # ==================== 應用啟動 ====================
@@ -24,6 +24,26 @@ class Config:
     
     # 資料庫配置
     DATABASE_URL = os.environ.get('DATABASE_URL') or f'sqlite:///{BASE_DIR}/data/test_records.db'
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))  # 主庫連線池常駐連線數
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))  # 連線池滿時可額外建立的連線數
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))  # 等待取得連線的秒數
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # 連線使用超過此秒數後重建（-1 表示不重建）
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'false').lower() == 'true'  # 每次取用前檢查連線（多一次來回）
+    DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL')  # 唯讀副本（未設定時讀寫皆使用 DATABASE_URL）
+    READ_POOL_SIZE = int(os.environ.get('READ_POOL_SIZE', 10))  # 副本連線池大小
+    READ_MAX_OVERFLOW = int(os.environ.get('READ_MAX_OVERFLOW', 10))  # 副本連線池可額外建立的連線數
+    READ_AFTER_WRITE_SECONDS = float(os.environ.get('READ_AFTER_WRITE_SECONDS', 5))  # 主庫寫入後此秒數內的唯讀查詢仍用主庫（避開副本延遲）
+    
+    # SQLite 效能設定（檔案資料庫；記憶體資料庫不適用）
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'true').lower() == 'true'  # 啟用 PRAGMA 設定與讀寫連線分離
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')  # WAL 模式下讀取不會被寫入阻擋
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # WAL 下 NORMAL 只在 checkpoint 時 fsync
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -65536))  # 頁面快取（負值為 KiB，預設 64MB）
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # 記憶體映射讀取上限（位元組）
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')  # 暫存表與排序使用記憶體
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 30000))  # 遇到鎖定時等待的毫秒數
+    SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE', 5))  # 讀取連線池大小
+    SQLITE_WRITE_WAIT_TIMEOUT = float(os.environ.get('SQLITE_WRITE_WAIT_TIMEOUT', 60))  # 等待取得連線的秒數
     
     # 檔案上傳配置
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or str(BASE_DIR / 'uploads')
@@ -33,6 +53,53 @@ class Config:
     # 分頁與查詢配置
     RECORDS_PER_PAGE = int(os.environ.get('RECORDS_PER_PAGE', 20))
     MAX_RECORDS_PER_PAGE = int(os.environ.get('MAX_RECORDS_PER_PAGE', 100))
+    SEARCH_COUNT_MODES = ('exact', 'cached', 'none')  # 搜尋總筆數：精確計算/快取結果/不計算
+    SEARCH_COUNT_MODE = os.environ.get('SEARCH_COUNT_MODE', 'exact')  # 預設總筆數模式
+    SN_MATCH_MODES = ('exact', 'prefix', 'contains')  # SN 搜尋方式：完全相同/開頭相符/包含
+    SN_MATCH_MODE = os.environ.get('SN_MATCH_MODE', 'contains')  # 預設 SN 搜尋方式
+    ANALYSIS_BATCH_MAX_SNS = int(os.environ.get('ANALYSIS_BATCH_MAX_SNS', 1000))  # 批次分析單次請求的 SN 上限
+    OUTLIER_METHOD = os.environ.get('OUTLIER_METHOD', 'zscore')  # 母體離群值判定方式：zscore / mad
+    OUTLIER_THRESHOLDS = {'zscore': 3.0, 'mad': 3.5}  # 各判定方式的預設門檻（分數絕對值大於門檻為離群）
+    POPULATION_MAX_SNS = int(os.environ.get('POPULATION_MAX_SNS', 500))  # 母體分析回傳的離群/不合格 SN 上限
+    
+    # 刪除配置
+    DELETE_BATCH_SIZE = int(os.environ.get('DELETE_BATCH_SIZE', 500))  # 每個刪除交易的記錄數（交易越短，SQLite 寫入鎖持有越短）
+    
+    # 匯出配置
+    EXPORT_FORMATS = ('csv', 'jsonl', 'xlsx')
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))  # 匯出時每次自資料庫讀取/送出的記錄數
+    
+    # 匯入配置
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))  # 每個交易批次寫入筆數
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 50000))  # 串流匯入每次讀取的 CSV 行數
+    IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))  # 匯入結果保留的錯誤明細上限
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 2))  # 背景匯入同時執行的工作數
+    PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', 1))  # 平行解析行程數（1 表示於匯入執行緒內解析）
+    IMPORT_MODES = ('skip', 'overwrite', 'keep_latest')  # 已存在記錄的處理方式：跳過/覆蓋/保留最新匯入
+    IMPORT_MODE = os.environ.get('IMPORT_MODE', 'skip')  # 預設匯入模式
+    
+    # 快取配置
+    STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', 300))  # 統計結果快取秒數（0 表示停用）
+    STATS_CACHE_MAX_ENTRIES = int(os.environ.get('STATS_CACHE_MAX_ENTRIES', 256))  # 統計結果快取項目上限（超過時移除最久未使用）
+    
+    # 界線判定配置（黃金曲線）
+    LIMIT_EVALUATION_BATCH_SIZE = int(os.environ.get('LIMIT_EVALUATION_BATCH_SIZE', 5000))  # 重新判定時每個交易的記錄數
+    LIMIT_RESULTS_MAX = int(os.environ.get('LIMIT_RESULTS_MAX', 1000))  # 判定結果查詢單次回傳上限
+    
+    # 分析快照配置（Parquet，需安裝 pyarrow）
+    SNAPSHOT_ENABLED = os.environ.get('SNAPSHOT_ENABLED', 'true').lower() == 'true'  # 匯入/刪除後是否於背景刷新快照
+    SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR') or str(BASE_DIR / 'data' / 'snapshot')
+    SNAPSHOT_PARTITION_BATCH = int(os.environ.get('SNAPSHOT_PARTITION_BATCH', 200))  # 刷新時每次自資料庫讀取的分區數
+    
+    # 目錄監看配置
+    WATCH_SETTLE_SECONDS = float(os.environ.get('WATCH_SETTLE_SECONDS', 2))  # 檔案最後一次變動後等待寫入完成的秒數
+    WATCH_BATCH_SIZE = int(os.environ.get('WATCH_BATCH_SIZE', 100))  # 每批送入匯入佇列的檔案數上限
+    WATCH_POLL_INTERVAL = float(os.environ.get('WATCH_POLL_INTERVAL', 1))  # 檢查待匯入檔案的間隔秒數
+    
+    # 效能量測配置（/metrics 與 profile=1）
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'  # 允許以 ?profile=1 分析單一請求
+    PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.001))  # 取樣間隔秒數（pyinstrument）
+    PROFILE_TOP_FUNCTIONS = int(os.environ.get('PROFILE_TOP_FUNCTIONS', 50))  # cProfile 報表列出的函數數
     
     # 日誌配置
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
@@ -41,13 +108,19 @@ class Config:
     # 業務配置
     VALID_TEST_TYPES = ['left', 'right', 'rec1', 'rec2']
     
-    SUPPORTED_FREQUENCIES = {
-        '100': 'freq_100', '125': 'freq_125', '160': 'freq_160',
-        '200': 'freq_200', '250': 'freq_250', '315': 'freq_315',
-        '400': 'freq_400', '500': 'freq_500', '630': 'freq_630',
-        '800': 'freq_800', '1000': 'freq_1000', '1250': 'freq_1250',
-        '1600': 'freq_1600', '2000': 'freq_2000'
-    }
+    # 頻帶註冊表（1/3 倍頻程標稱頻率，Hz）
+    # 量測值連同頻率編碼於 test_records.measurement_data，新增頻帶只需擴充此列表，不需變更資料表結構
+    # 環境變數以逗號分隔，忽略空白與空項目，頻率統一為整數字串（"100, 125," 與 "100,125" 相同）
+    FREQUENCY_BANDS = [
+        str(int(band)) for band in os.environ.get(
+            'FREQUENCY_BANDS',
+            '100,125,160,200,250,315,400,500,630,800,1000,1250,1600,2000,'
+            '2500,3150,4000,5000,6300,8000,10000,12500,16000,20000'
+        ).split(',') if band.strip()
+    ]
+    
+    # 頻率 -> API 欄位名稱（沿用舊版寬欄位名稱 freq_XXX）
+    SUPPORTED_FREQUENCIES = {freq: f'freq_{freq}' for freq in FREQUENCY_BANDS}
     
     @staticmethod
     def init_app(app):
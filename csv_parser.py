@@ -5,12 +5,17 @@ CSV 解析模組
 """
 
 import pandas as pd
+import numpy as np
+import os
 import re
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterator
 from dataclasses import dataclass
 from datetime import datetime
 import logging
 
+from config import Config
+from instrumentation import stage
+
 # 設定日誌
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,6 +39,7 @@ class ParsedRecord:
     original_row_index: int
     is_valid: bool
     error_message: Optional[str] = None
+    validated: bool = False  # 是否已通過 DataValidator 驗證（平行解析時由 worker 完成）
 
 class FilenameParser:
     """
@@ -126,24 +132,14 @@ class CSVDataParser:
     負責解析 CSV 檔案內容，提取測試數據
     """
     
-    # 標準頻率欄位映射 - 支援多種可能的欄位名稱
+    # 標準頻率欄位映射 - 支援多種可能的欄位名稱（頻帶來自 Config.FREQUENCY_BANDS）
     FREQUENCY_MAPPINGS = {
-        '100': ['100', 'freq_100', 'F100'],
-        '125': ['125', 'freq_125', 'F125'],
-        '160': ['160', 'freq_160', 'F160'],
-        '200': ['200', 'freq_200', 'F200'],
-        '250': ['250', 'freq_250', 'F250'],
-        '315': ['315', 'freq_315', 'F315'],
-        '400': ['400', 'freq_400', 'F400'],
-        '500': ['500', 'freq_500', 'F500'],
-        '630': ['630', 'freq_630', 'F630'],
-        '800': ['800', 'freq_800', 'F800'],
-        '1000': ['1000', 'freq_1000', 'F1000'],
-        '1250': ['1250', 'freq_1250', 'F1250'],
-        '1600': ['1600', 'freq_1600', 'F1600'],
-        '2000': ['2000', 'freq_2000', 'F2000'],
+        freq: [freq, f'freq_{freq}', f'F{freq}'] for freq in Config.FREQUENCY_BANDS
     }
     
+    # 串流解析預設每次讀取的行數
+    DEFAULT_CHUNK_SIZE = 50000
+    
     def __init__(self):
         self.reset_statistics()
     
@@ -154,16 +150,20 @@ class CSVDataParser:
             'valid_records': 0,
             'invalid_filenames': 0,
             'invalid_data': 0,
-            'duplicate_records': 0
+            'duplicate_records': 0,
+            'bytes_read': 0,
+            'timings': {}  # 各階段耗時 {read_csv / filename_parse / parse / validate: 秒數}
         }
     
-    def parse_csv_file(self, file_path: str, encoding: str = 'utf-8') -> Tuple[List[ParsedRecord], Dict]:
+    def parse_csv_file(self, file_path: str, encoding: str = 'utf-8',
+                       vectorized: bool = True) -> Tuple[List[ParsedRecord], Dict]:
         """
         解析 CSV 檔案
         
         Args:
             file_path: CSV 檔案路徑
             encoding: 檔案編碼
+            vectorized: 是否使用向量化解析（False 則逐行解析）
             
         Returns:
             Tuple[List[ParsedRecord], Dict]: (解析記錄列表, 統計資訊)
@@ -173,8 +173,10 @@ class CSVDataParser:
         
         try:
             # 讀取 CSV 檔案
-            df = pd.read_csv(file_path, encoding=encoding)
+            with stage('read_csv', self.stats['timings']):
+                df = pd.read_csv(file_path, encoding=encoding)
             self.stats['total_rows'] = len(df)
+            self.stats['bytes_read'] = os.path.getsize(file_path)
             
             # 確認第一欄是檔案名稱
             if len(df.columns) == 0:
@@ -189,36 +191,11 @@ class CSVDataParser:
             logger.info(f"總行數：{len(df)}")
             logger.info(f"找到頻率欄位：{list(frequency_columns.keys())}")
             
-            # 逐行解析
-            for index, row in df.iterrows():
-                try:
-                    parsed_record = self._parse_row(row, filename_col, frequency_columns, index)
-                    parsed_records.append(parsed_record)
-                    
-                    if parsed_record.is_valid:
-                        self.stats['valid_records'] += 1
-                    else:
-                        if not parsed_record.parsed_filename.is_valid:
-                            self.stats['invalid_filenames'] += 1
-                        else:
-                            self.stats['invalid_data'] += 1
-                            
-                except Exception as e:
-                    logger.error(f"解析第 {index + 1} 行時發生錯誤：{str(e)}")
-                    # 創建錯誤記錄
-                    error_record = ParsedRecord(
-                        parsed_filename=ParsedFilename(
-                            sn="", test_date="", test_time="", test_type="",
-                            original_filename="", is_valid=False,
-                            error_message=f"行解析錯誤：{str(e)}"
-                        ),
-                        frequency_data={},
-                        original_row_index=index,
-                        is_valid=False,
-                        error_message=f"行解析錯誤：{str(e)}"
-                    )
-                    parsed_records.append(error_record)
-                    self.stats['invalid_data'] += 1
+            with stage('parse', self.stats['timings']):
+                if vectorized:
+                    parsed_records = self._parse_dataframe(df, filename_col, frequency_columns)
+                else:
+                    parsed_records = self._parse_rows(df, filename_col, frequency_columns)
             
         except Exception as e:
             logger.error(f"讀取 CSV 檔案失敗：{str(e)}")
@@ -226,6 +203,291 @@ class CSVDataParser:
         
         return parsed_records, self.stats
     
+    def iter_parse_csv_file(self, file_path: str, encoding: str = 'utf-8',
+                            chunk_size: Optional[int] = None) -> Iterator[List[ParsedRecord]]:
+        """
+        串流解析 CSV 檔案
+        以 chunksize 分塊讀取，每次產出一個分塊的解析記錄，記憶體用量與檔案大小無關；
+        self.stats 隨每個分塊累加
+        
+        Args:
+            file_path: CSV 檔案路徑
+            encoding: 檔案編碼
+            chunk_size: 每個分塊的行數（預設 DEFAULT_CHUNK_SIZE）
+            
+        Yields:
+            List[ParsedRecord]: 單一分塊的解析記錄
+        """
+        self.reset_statistics()
+        for df, filename_col, frequency_columns in self.iter_csv_chunks(file_path, encoding, chunk_size):
+            with stage('parse', self.stats['timings']):
+                records = self._parse_dataframe(df, filename_col, frequency_columns)
+            yield records
+    
+    def iter_csv_chunks(self, file_path: str, encoding: str = 'utf-8',
+                        chunk_size: Optional[int] = None) -> Iterator[Tuple[pd.DataFrame, str, Dict[str, str]]]:
+        """
+        分塊讀取 CSV 檔案（不解析），累加 total_rows 與 bytes_read，讀取失敗時記錄 file_read_error
+        
+        Yields:
+            Tuple[pd.DataFrame, str, Dict[str, str]]: (分塊資料, 檔名欄位, 頻率欄位映射)
+        """
+        chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        
+        try:
+            # 先讀取標題列，檔名欄固定以字串讀取，避免各分塊推斷出不同型別
+            columns = pd.read_csv(file_path, encoding=encoding, nrows=0).columns
+            if len(columns) == 0:
+                raise ValueError("CSV 檔案為空或格式錯誤")
+            
+            filename_col = columns[0]
+            frequency_columns = self._map_frequency_columns(columns)
+            # 自行開啟檔案，以檔案位置計算已讀取的位元組數
+            handle = open(file_path, 'rb')
+            try:
+                reader = pd.read_csv(handle, encoding=encoding, chunksize=chunk_size,
+                                     dtype={filename_col: str})
+            except Exception:
+                handle.close()
+                raise
+        except Exception as e:
+            logger.error(f"讀取 CSV 檔案失敗：{str(e)}")
+            self.stats['file_read_error'] = str(e)
+            return
+        
+        logger.info(f"開始串流解析 CSV 檔案：{file_path}（每塊 {chunk_size} 行）")
+        logger.info(f"找到頻率欄位：{list(frequency_columns.keys())}")
+        
+        with handle, reader:
+            while True:
+                try:
+                    with stage('read_csv', self.stats['timings']):
+                        df = next(reader)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    logger.error(f"讀取 CSV 檔案失敗：{str(e)}")
+                    self.stats['file_read_error'] = str(e)
+                    break
+                
+                self.stats['total_rows'] += len(df)
+                self.stats['bytes_read'] = handle.tell()
+                yield df, filename_col, frequency_columns
+    
+    def merge_statistics(self, stats: Dict):
+        """累加其他解析器（例如平行解析的 worker）的計數統計與各階段耗時"""
+        for key, value in stats.items():
+            if key not in ('total_rows', 'bytes_read') and isinstance(value, int):
+                self.stats[key] = self.stats.get(key, 0) + value
+        for name, seconds in stats.get('timings', {}).items():
+            self.stats['timings'][name] = self.stats['timings'].get(name, 0.0) + seconds
+    
+    def _parse_rows(self, df: pd.DataFrame, filename_col: str,
+                    frequency_columns: Dict[str, str]) -> List[ParsedRecord]:
+        """逐行解析數據"""
+        parsed_records = []
+        
+        for index, row in df.iterrows():
+            try:
+                parsed_record = self._parse_row(row, filename_col, frequency_columns, index)
+                parsed_records.append(parsed_record)
+        
+                if parsed_record.is_valid:
+                    self.stats['valid_records'] += 1
+                else:
+                    if not parsed_record.parsed_filename.is_valid:
+                        self.stats['invalid_filenames'] += 1
+                    else:
+                        self.stats['invalid_data'] += 1
+        
+            except Exception as e:
+                logger.error(f"解析第 {index + 1} 行時發生錯誤：{str(e)}")
+                # 創建錯誤記錄
+                error_record = ParsedRecord(
+                    parsed_filename=ParsedFilename(
+                        sn="", test_date="", test_time="", test_type="",
+                        original_filename="", is_valid=False,
+                        error_message=f"行解析錯誤：{str(e)}"
+                    ),
+                    frequency_data={},
+                    original_row_index=index,
+                    is_valid=False,
+                    error_message=f"行解析錯誤：{str(e)}"
+                )
+                parsed_records.append(error_record)
+                self.stats['invalid_data'] += 1
+        
+        return parsed_records
+    
+    # 檔名解析結果代碼（_parse_columns 的 status 欄）
+    FILENAME_OK, FILENAME_UNMATCHED, FILENAME_BAD_DATE, FILENAME_BAD_TIME = range(4)
+    
+    def _parse_dataframe(self, df: pd.DataFrame, filename_col: str,
+                         frequency_columns: Dict[str, str]) -> List[ParsedRecord]:
+        """
+        向量化解析數據
+        以欄為單位完成檔名拆解、日期時間驗證與數值轉換，結果與逐行解析相同
+        """
+        return self.build_records(self._parse_columns(df, filename_col, frequency_columns))
+    
+    def _parse_columns(self, df: pd.DataFrame, filename_col: str,
+                       frequency_columns: Dict[str, str]) -> Dict:
+        """
+        向量化解析為欄式結果（不建立 ParsedRecord），並累加統計
+        平行解析時由 worker 回傳此結果，寫入端再以 build_records 組裝記錄
+        
+        Returns:
+            Dict: row_indexes / filenames / sn / test_date / test_time / test_type / status 為各行的陣列，
+                  values 與 present 為 (行數, 頻率數) 的數值與是否有值，frequencies 為頻率順序，
+                  errors 為 DataValidator 判定無效的 {行位置: 錯誤訊息}（validated 為 True 時才有意義）
+        """
+        row_count = len(df)
+        frequencies = list(frequency_columns.keys())
+        
+        with stage('filename_parse', self.stats['timings']):
+            # 解析檔案名稱
+            raw_names = df[filename_col]
+            filenames = raw_names.where(raw_names.notna(), '').astype(str)
+            base_names = filenames.str.split('.', n=1).str[0]
+            parts = base_names.str.extract(FilenameParser.FILENAME_PATTERN.pattern)
+            parts.columns = ['sn', 'test_date', 'test_time', 'test_type']
+            matched = parts['sn'].notna()
+            
+            # 驗證日期與時間
+            date_ok = self._validate_datetime_column(parts['test_date'], matched, '%Y%m%d',
+                                                     FilenameParser._validate_date)
+            time_ok = self._validate_datetime_column(parts['test_time'], matched, '%H%M%S',
+                                                     FilenameParser._validate_time)
+            # pandas 接受第 60、61 秒，strptime 不接受
+            time_ok &= parts['test_time'].fillna('').str[4:6] < '60'
+        
+        # 轉換頻率數據
+        row_indexes = df.index.tolist()
+        values = np.full((row_count, len(frequencies)), np.nan)
+        present = np.zeros((row_count, len(frequencies)), dtype=bool)
+        for position, (freq, col_name) in enumerate(frequency_columns.items()):
+            raw = df[col_name]
+            numeric = pd.to_numeric(raw, errors='coerce')
+            values[:, position] = numeric.to_numpy(dtype=float, na_value=np.nan)
+            present[:, position] = numeric.notna().to_numpy()
+            
+            # pandas 無法轉換的值改用 float() 再試一次，保持與逐行解析一致
+            for row_position in np.flatnonzero((raw.notna() & numeric.isna()).to_numpy()):
+                value = raw.iat[row_position]
+                try:
+                    values[row_position, position] = float(value)
+                    present[row_position, position] = True
+                except (ValueError, TypeError):
+                    logger.warning(f"行 {row_indexes[row_position] + 1}，頻率 {freq} 數據轉換失敗：{value}")
+        
+        matched = matched.to_numpy()
+        date_ok = date_ok.to_numpy()
+        time_ok = time_ok.to_numpy()
+        status = np.select(
+            [~matched, ~date_ok, ~time_ok],
+            [self.FILENAME_UNMATCHED, self.FILENAME_BAD_DATE, self.FILENAME_BAD_TIME],
+            self.FILENAME_OK
+        ).astype(np.int8)
+        
+        # 以欄為單位計算統計
+        filename_valid = status == self.FILENAME_OK
+        has_frequency_data = present.any(axis=1)
+        self.stats['valid_records'] += int((filename_valid & has_frequency_data).sum())
+        self.stats['invalid_filenames'] += int((~filename_valid).sum())
+        self.stats['invalid_data'] += int((filename_valid & ~has_frequency_data).sum())
+        
+        return {
+            'row_indexes': np.asarray(row_indexes, dtype=np.int64),
+            'filenames': filenames.to_numpy(dtype=object),
+            'sn': parts['sn'].to_numpy(dtype=object),
+            'test_date': parts['test_date'].to_numpy(dtype=object),
+            'test_time': parts['test_time'].to_numpy(dtype=object),
+            'test_type': parts['test_type'].to_numpy(dtype=object),
+            'status': status,
+            'frequencies': frequencies,
+            'values': values,
+            'present': present,
+            'validated': False,
+            'errors': {}
+        }
+    
+    @classmethod
+    def build_records(cls, columns: Dict) -> List[ParsedRecord]:
+        """依 _parse_columns 的欄式結果組裝解析記錄"""
+        frequencies = columns['frequencies']
+        validated = columns['validated']
+        errors = columns['errors']
+        
+        parsed_records = []
+        rows = zip(
+            columns['row_indexes'].tolist(), columns['filenames'].tolist(), columns['sn'].tolist(),
+            columns['test_date'].tolist(), columns['test_time'].tolist(), columns['test_type'].tolist(),
+            columns['status'].tolist(), columns['values'].tolist(), columns['present'].tolist()
+        )
+        for position, (row_index, filename, sn, test_date, test_time, test_type,
+                       status, row_values, row_present) in enumerate(rows):
+            if status == cls.FILENAME_UNMATCHED:
+                parsed_filename = ParsedFilename(
+                    sn="", test_date="", test_time="", test_type="",
+                    original_filename=filename, is_valid=False,
+                    error_message="檔案名稱格式不符合規範，應為：SN_YYYYMMDD_HHMMSS_(left/right/rec1/rec2)"
+                )
+            elif status == cls.FILENAME_BAD_DATE:
+                parsed_filename = ParsedFilename(
+                    sn=sn, test_date=test_date, test_time=test_time, test_type=test_type,
+                    original_filename=filename, is_valid=False,
+                    error_message=f"日期格式錯誤：{test_date}，應為有效的 YYYYMMDD 格式"
+                )
+            elif status == cls.FILENAME_BAD_TIME:
+                parsed_filename = ParsedFilename(
+                    sn=sn, test_date=test_date, test_time=test_time, test_type=test_type,
+                    original_filename=filename, is_valid=False,
+                    error_message=f"時間格式錯誤：{test_time}，應為有效的 HHMMSS 格式"
+                )
+            else:
+                parsed_filename = ParsedFilename(
+                    sn=sn, test_date=test_date, test_time=test_time, test_type=test_type,
+                    original_filename=filename, is_valid=True
+                )
+            
+            frequency_data = {
+                freq: value
+                for freq, value, is_present in zip(frequencies, row_values, row_present)
+                if is_present
+            }
+            
+            error_message = None
+            if not parsed_filename.is_valid:
+                error_message = parsed_filename.error_message
+            elif not frequency_data:
+                error_message = "未找到有效的頻率測試數據"
+            elif position in errors:
+                error_message = f"數據驗證失敗：{errors[position]}"
+            
+            parsed_records.append(ParsedRecord(
+                parsed_filename=parsed_filename,
+                frequency_data=frequency_data,
+                original_row_index=row_index,
+                is_valid=error_message is None,
+                error_message=error_message,
+                validated=validated
+            ))
+        
+        return parsed_records
+    
+    @staticmethod
+    def _validate_datetime_column(values: pd.Series, matched: pd.Series, fmt: str,
+                                  validator) -> pd.Series:
+        """
+        以 pd.to_datetime 向量化驗證日期/時間欄位
+        pandas 判定無效者（如超出 Timestamp 範圍的年份）再以 strptime 確認
+        """
+        is_ok = pd.to_datetime(values, format=fmt, errors='coerce').notna().to_numpy(copy=True)
+        recheck = matched.to_numpy() & ~is_ok
+        if recheck.any():
+            is_ok[recheck] = [validator(value) for value in values[recheck]]
+        return pd.Series(is_ok, index=values.index)
+    
     def _parse_row(self, row: pd.Series, filename_col: str, frequency_columns: Dict[str, str], 
                    row_index: int) -> ParsedRecord:
         """解析單行數據"""
@@ -275,24 +537,26 @@ class CSVDataParser:
             Dict[str, str]: {頻率: 欄位名稱}
         """
         frequency_columns = {}
+        used_columns = set()
         
+        # 精確匹配優先
         for freq, possible_names in self.FREQUENCY_MAPPINGS.items():
             for col_name in columns:
-                # 精確匹配或包含匹配
-                if col_name in possible_names or any(name in col_name for name in possible_names):
+                if col_name not in used_columns and col_name.strip() in possible_names:
                     frequency_columns[freq] = col_name
+                    used_columns.add(col_name)
                     break
         
-        # 嘗試數字欄位匹配
-        for col_name in columns:
-            try:
-                # 檢查是否為純數字欄位
-                if col_name.isdigit():
-                    freq = col_name
-                    if freq in self.FREQUENCY_MAPPINGS and freq not in frequency_columns:
-                        frequency_columns[freq] = col_name
-            except:
+        # 包含匹配（如 "1000Hz"）；頻率前後不可緊接數字，避免 100 誤配 1000 或 12500 誤配 125
+        for freq, possible_names in self.FREQUENCY_MAPPINGS.items():
+            if freq in frequency_columns:
                 continue
+            patterns = [re.compile(rf'(?<!\d){re.escape(name)}(?!\d)') for name in possible_names]
+            for col_name in columns:
+                if col_name not in used_columns and any(pattern.search(col_name) for pattern in patterns):
+                    frequency_columns[freq] = col_name
+                    used_columns.add(col_name)
+                    break
         
         return frequency_columns
 
@@ -339,12 +603,37 @@ class DataValidator:
                 return False, f"頻率 {freq} 的數據 {value} 超出合理範圍"
         
         return True, None
+    
+    @classmethod
+    def validate_columns(cls, columns: Dict) -> Dict:
+        """
+        以欄為單位驗證 CSVDataParser._parse_columns 的結果（規則與 validate_parsed_record 相同）
+        未通過驗證的行寫入 columns['errors']，並標記為已驗證
+        """
+        values = columns['values']
+        present = columns['present']
+        candidates = (columns['status'] == CSVDataParser.FILENAME_OK) & present.any(axis=1)
+        # NaN 不在合理範圍內
+        out_of_range = present & ~((values >= -200) & (values <= 50))
+        
+        errors = columns['errors']
+        for position in np.flatnonzero(candidates).tolist():
+            sn = columns['sn'][position]
+            if not cls.validate_sn_format(sn):
+                errors[position] = f"SN 格式不正確：{sn}"
+            elif out_of_range[position].any():
+                freq_position = int(out_of_range[position].argmax())
+                errors[position] = (f"頻率 {columns['frequencies'][freq_position]} 的數據 "
+                                    f"{float(values[position, freq_position])} 超出合理範圍")
+        columns['validated'] = True
+        return columns
 
 # 便利函數
-def parse_csv_file(file_path: str, encoding: str = 'utf-8') -> Tuple[List[ParsedRecord], Dict]:
+def parse_csv_file(file_path: str, encoding: str = 'utf-8',
+                   vectorized: bool = True) -> Tuple[List[ParsedRecord], Dict]:
     """解析 CSV 檔案的便利函數"""
     parser = CSVDataParser()
-    return parser.parse_csv_file(file_path, encoding)
+    return parser.parse_csv_file(file_path, encoding, vectorized)
 
 if __name__ == "__main__":
     # 測試解析功能
@@ -4,32 +4,76 @@
 負責：數據庫操作、業務邏輯處理、數據匯入/查詢
 """
 
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, NamedTuple, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
+from sqlalchemy import and_, or_, func, desc, select, insert, update, delete, text, tuple_
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 import logging
+import base64
+import hashlib
+import os
+import shutil
+import time
+import zipfile
+import numpy as np
+from pathlib import Path
 from contextlib import contextmanager
 
-from models import TestRecord, ImportLog, db_manager
-from csv_parser import ParsedRecord, parse_csv_file, DataValidator
+from models import TestRecord, ImportLog, UPSERT_DIALECTS, supports_upsert_returning, db_manager
+from measurement_codec import pack_measurements, unpack_measurements
+from csv_parser import ParsedRecord, CSVDataParser, parse_csv_file, DataValidator
+from config import Config
+from import_queue import import_queue
+from parallel_parser import ParallelCSVParser
+from instrumentation import stage
+from result_cache import statistics_cache
+from summary_service import summary_service
+from sn_search import sn_search
+from limit_service import limit_service
+from analytics_snapshot import analytics_snapshot
+import population_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class TrendPoint(NamedTuple):
+    """趨勢數據點：記錄欄位與指定頻率的測試值"""
+    test_date: str
+    test_time: str
+    test_type: str
+    fixture: Optional[str]
+    value: float
+
 class DatabaseService:
     """
     資料庫服務類
     提供高層次的資料庫操作接口
     """
     
+    # 支援 INSERT ... ON CONFLICT 的資料庫方言
+    UPSERT_DIALECTS = UPSERT_DIALECTS
+    
+    # 唯一鍵欄位（uq_sn_datetime_type），覆蓋時不更新
+    RECORD_KEY_COLUMNS = ('sn', 'test_date', 'test_time', 'test_type')
+    
+    # 不支援 RETURNING 的寫入路徑中，分塊與併發匯入衝突時重新查詢並重試的次數
+    WRITE_CONFLICT_RETRIES = 3
+    
     def __init__(self):
         self.db_manager = db_manager
+        summary_service.ensure_initialized()
+        sn_search.ensure_initialized()
     
     @contextmanager
-    def get_session(self):
-        """獲取資料庫會話的上下文管理器"""
-        session = self.db_manager.get_session()
+    def get_session(self, read_only: bool = False):
+        """
+        獲取資料庫會話的上下文管理器
+        
+        Args:
+            read_only: 只執行查詢時設為 True，使用讀取連線池（SQLite 匯入寫入時仍可查詢）
+        """
+        session = self.db_manager.get_read_session() if read_only else self.db_manager.get_session()
         try:
             yield session
         except Exception as e:
@@ -40,7 +84,8 @@ class DatabaseService:
             session.close()
     
     def create_test_record(self, parsed_record: ParsedRecord, filename: str, 
-                          fixture: str = "治具1", session: Optional[Session] = None) -> Tuple[bool, str]:
+                          fixture: str = "治具1", session: Optional[Session] = None,
+                          import_log_id: Optional[int] = None) -> Tuple[bool, str]:
         """
         創建測試記錄
         
@@ -49,6 +94,7 @@ class DatabaseService:
             filename: 原始檔案名稱
             fixture: 治具類型
             session: 資料庫會話（可選）
+            import_log_id: 匯入記錄 ID（可選）
             
         Returns:
             Tuple[bool, str]: (是否成功, 訊息)
@@ -75,30 +121,13 @@ class DatabaseService:
                 return False, f"記錄已存在：SN={pf.sn}, 時間={pf.test_date}_{pf.test_time}, 類型={pf.test_type}"
             
             # 創建新記錄
-            test_record = TestRecord(
-                sn=pf.sn,
-                test_date=pf.test_date,
-                test_time=pf.test_time,
-                test_type=pf.test_type,
-                fixture=fixture,  # 新增治具資訊
-                filename=filename
-            )
-            
-            # 設定頻率數據
-            frequency_mapping = {
-                '100': 'freq_100', '125': 'freq_125', '160': 'freq_160',
-                '200': 'freq_200', '250': 'freq_250', '315': 'freq_315',
-                '400': 'freq_400', '500': 'freq_500', '630': 'freq_630',
-                '800': 'freq_800', '1000': 'freq_1000', '1250': 'freq_1250',
-                '1600': 'freq_1600', '2000': 'freq_2000'
-            }
-            
-            for freq, value in parsed_record.frequency_data.items():
-                if freq in frequency_mapping:
-                    setattr(test_record, frequency_mapping[freq], value)
+            test_record = TestRecord(**self._build_record_values(parsed_record, filename, fixture,
+                                                                 import_log_id=import_log_id))
             
             db_session.add(test_record)
-            db_session.commit()
+            db_session.flush()
+            self._update_summaries(db_session, {self._record_key(parsed_record): test_record.id})
+            self._commit_writes(db_session)
             
             return True, f"記錄創建成功：ID={test_record.id}"
         
@@ -108,12 +137,280 @@ class DatabaseService:
             with self.get_session() as db_session:
                 return _create_record(db_session)
     
+    def bulk_create_test_records(self, parsed_records: List[ParsedRecord], filename: str,
+                                 fixture: str = "治具1", session: Optional[Session] = None,
+                                 batch_size: Optional[int] = None, mode: Optional[str] = None,
+                                 import_time: Optional[datetime] = None,
+                                 import_log_id: Optional[int] = None) -> Dict:
+        """
+        批次創建測試記錄
+        先驗證整批數據，再依匯入模式處理與既有記錄（uq_sn_datetime_type）的衝突：
+        - skip：已存在的記錄跳過
+        - overwrite：以新數據覆蓋已存在的記錄
+        - keep_latest：僅在新數據的 import_time 不早於既有記錄時覆蓋
+        SQLite / PostgreSQL 以 INSERT ... ON CONFLICT 集合式寫入，每個分塊一個交易；
+        其他資料庫先以集合查詢找出既有記錄再分別寫入
+        
+        Args:
+            parsed_records: 解析後的記錄列表（含解析失敗的記錄）
+            filename: 原始檔案名稱
+            fixture: 治具類型
+            session: 資料庫會話（可選）
+            batch_size: 每個交易寫入筆數（預設 Config.IMPORT_BATCH_SIZE）
+            mode: 匯入模式（預設 Config.IMPORT_MODE）
+            import_time: 寫入記錄的匯入時間（keep_latest 依此比較，預設為目前時間）
+            import_log_id: 匯入記錄 ID（寫入 test_records.import_log_id，可依匯入刪除記錄）
+            
+        Returns:
+            Dict: {'successful', 'failed', 'duplicates', 'errors', 'timings'}，errors 為 [{'row', 'error'}]；
+            未寫入的已存在記錄計入 duplicates；timings 為各階段耗時 {validate / dedup / insert: 秒數}
+        """
+        batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+        mode = mode or Config.IMPORT_MODE
+        if mode not in Config.IMPORT_MODES:
+            raise ValueError(f"不支援的匯入模式：{mode}")
+        import_time = import_time or datetime.utcnow()
+        
+        def _bulk_create(db_session):
+            outcome = {'successful': 0, 'failed': 0, 'duplicates': 0, 'errors': [], 'timings': {}}
+            
+            def _add_error(record, message):
+                outcome['failed'] += 1
+                outcome['errors'].append({
+                    'row': record.original_row_index + 1,
+                    'error': message
+                })
+            
+            # 驗證整批數據，並排除同一批次內的重複記錄（skip 保留第一筆，其他模式保留最後一筆）
+            candidates = {}
+            with stage('validate', outcome['timings']):
+                for parsed_record in parsed_records:
+                    if not parsed_record.is_valid:
+                        _add_error(parsed_record, parsed_record.error_message)
+                        continue
+                    
+                    if not parsed_record.validated:
+                        is_valid, error_msg = DataValidator.validate_parsed_record(parsed_record)
+                        if not is_valid:
+                            _add_error(parsed_record, f"數據驗證失敗：{error_msg}")
+                            continue
+                    
+                    key = self._record_key(parsed_record)
+                    if key in candidates:
+                        outcome['duplicates'] += 1
+                        if mode == 'skip':
+                            continue
+                    candidates[key] = parsed_record
+            
+            values = {
+                key: self._build_record_values(record, filename, fixture, import_time, import_log_id)
+                for key, record in candidates.items()
+            }
+            
+            # 不支援 RETURNING（SQLite 3.35 以前）時改走下方先查詢再寫入的路徑
+            if supports_upsert_returning(db_session.get_bind()):
+                keys = list(values.keys())
+                with stage('insert', outcome['timings']):
+                    for start in range(0, len(keys), batch_size):
+                        chunk = keys[start:start + batch_size]
+                        record_ids = self._upsert_records(db_session, [values[key] for key in chunk], mode)
+                        self._update_summaries(db_session, record_ids, refresh=mode != 'skip')
+                        self._commit_writes(db_session, len(record_ids))
+                        outcome['successful'] += len(record_ids)
+                        outcome['duplicates'] += len(chunk) - len(record_ids)
+                return outcome
+            
+            def _write_chunk(chunk_keys, existing):
+                """寫入一個分塊：依匯入模式覆蓋已存在的記錄、新增其餘記錄，於同一交易提交"""
+                inserts, updates, duplicates = [], {}, 0
+                for key in chunk_keys:
+                    if key not in existing:
+                        inserts.append(key)
+                        continue
+                    record_id, existing_import_time = existing[key]
+                    if mode == 'overwrite' or (
+                            mode == 'keep_latest' and
+                            (existing_import_time is None or existing_import_time <= import_time)):
+                        updates[key] = record_id
+                    else:
+                        duplicates += 1
+                
+                if updates:
+                    # 依主鍵批次更新已存在的記錄
+                    updated_at = datetime.utcnow()
+                    db_session.execute(update(TestRecord), [
+                        dict(values[key], id=record_id, updated_at=updated_at) for key, record_id in updates.items()
+                    ])
+                    self._update_summaries(db_session, updates, refresh=True)
+                if inserts:
+                    db_session.execute(insert(TestRecord), [values[key] for key in inserts])
+                    record_ids = {key: record_id for key, (record_id, _) in
+                                  self._find_existing_keys(db_session, inserts).items()}
+                    self._update_summaries(db_session, record_ids)
+                self._commit_writes(db_session, len(updates) + len(inserts))
+                outcome['successful'] += len(updates) + len(inserts)
+                outcome['duplicates'] += duplicates
+            
+            # 集合式重複檢查（對應 uq_sn_datetime_type）
+            with stage('dedup', outcome['timings']):
+                existing = self._find_existing_keys(db_session, candidates.keys())
+            
+            keys = list(values.keys())
+            with stage('insert', outcome['timings']):
+                for start in range(0, len(keys), batch_size):
+                    chunk = keys[start:start + batch_size]
+                    for attempt in range(self.WRITE_CONFLICT_RETRIES + 1):
+                        try:
+                            _write_chunk(chunk, existing if attempt == 0 else
+                                         self._find_existing_keys(db_session, chunk))
+                            break
+                        except IntegrityError as e:
+                            # 查詢後才出現的記錄（例如併發匯入），重新查詢此分塊的既有記錄後依同一匯入模式重試
+                            db_session.rollback()
+                            logger.warning(f"批次寫入發生衝突（第 {attempt + 1} 次），重新查詢既有記錄後重試："
+                                           f"{str(e.orig)}")
+                    else:
+                        for key in chunk:
+                            _add_error(candidates[key], "寫入衝突：重試後仍與其他匯入衝突")
+            
+            return outcome
+        
+        if session:
+            return _bulk_create(session)
+        else:
+            with self.get_session() as db_session:
+                return _bulk_create(db_session)
+    
+    @staticmethod
+    def _update_summaries(session: Session, record_ids: Dict, refresh: bool = False):
+        """
+        於寫入交易內更新統計摘要表、SN 搜尋索引與黃金曲線判定結果
+        
+        Args:
+            record_ids: 已寫入的記錄 {唯一鍵: 記錄 ID}
+            refresh: 是否可能覆蓋既有記錄（是則以受影響 SN 重新計算，否則累加）
+        """
+        if not record_ids:
+            return
+        new_sns = sn_search.register_sns(session, {key[0] for key in record_ids})
+        if refresh:
+            summary_service.refresh_sns(session, {key[0] for key in record_ids})
+        else:
+            summary_service.add_records(session, record_ids.values(), len(new_sns))
+        limit_service.evaluate_records(session, record_ids.values())
+    
+    @staticmethod
+    def _commit_writes(session: Session, written: int = 1):
+        """提交寫入交易；有資料寫入時使統計快取失效"""
+        session.commit()
+        if written:
+            statistics_cache.invalidate()
+    
+    def _upsert_records(self, session: Session, rows: List[Dict], mode: str) -> Dict:
+        """
+        以單一 INSERT ... ON CONFLICT 敘述寫入一個分塊
+        
+        Returns:
+            Dict: 實際新增或覆蓋的記錄 {唯一鍵: 記錄 ID}（透過 RETURNING 取得，未寫入者為重複）
+        """
+        if not rows:
+            return {}
+        
+        # 使用 Core 資料表（非 ORM 批次路徑），RETURNING 才能以多列 VALUES 一次寫入
+        table = TestRecord.__table__
+        stmt = self.UPSERT_DIALECTS[session.get_bind().dialect.name](table)
+        if mode == 'skip':
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(self.RECORD_KEY_COLUMNS))
+        else:
+            update_values = {
+                column: stmt.excluded[column]
+                for column in rows[0] if column not in self.RECORD_KEY_COLUMNS
+            }
+            update_values['updated_at'] = datetime.utcnow()
+            where = None
+            if mode == 'keep_latest':
+                where = or_(table.c.import_time.is_(None),
+                            table.c.import_time <= stmt.excluded.import_time)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(self.RECORD_KEY_COLUMNS),
+                set_=update_values,
+                where=where
+            )
+        
+        key_columns = [table.c[column] for column in self.RECORD_KEY_COLUMNS]
+        result = session.execute(stmt.returning(table.c.id, *key_columns), rows)
+        return {tuple(row[1:]): row[0] for row in result}
+    
+    @staticmethod
+    def _record_key(parsed_record: ParsedRecord) -> Tuple[str, str, str, str]:
+        """記錄唯一鍵：SN + 測試日期 + 測試時間 + 測試項目"""
+        pf = parsed_record.parsed_filename
+        return pf.sn, pf.test_date, pf.test_time, pf.test_type
+    
+    @staticmethod
+    def _find_existing_keys(session: Session, keys, sn_chunk_size: int = 500) -> Dict:
+        """
+        以 SN 分組的集合查詢找出資料庫中已存在的唯一鍵
+        
+        Returns:
+            Dict: {唯一鍵: (記錄 ID, 匯入時間)}
+        """
+        keys = set(keys)
+        if not keys:
+            return {}
+        
+        sns = sorted({key[0] for key in keys})
+        dates = [key[1] for key in keys]
+        min_date, max_date = min(dates), max(dates)
+        
+        existing = {}
+        for start in range(0, len(sns), sn_chunk_size):
+            rows = session.query(
+                TestRecord.sn, TestRecord.test_date, TestRecord.test_time, TestRecord.test_type,
+                TestRecord.id, TestRecord.import_time
+            ).filter(
+                TestRecord.sn.in_(sns[start:start + sn_chunk_size]),
+                TestRecord.test_date >= min_date,
+                TestRecord.test_date <= max_date
+            ).all()
+            for row in rows:
+                key = tuple(row[:4])
+                if key in keys:
+                    existing[key] = (row.id, row.import_time)
+        
+        return existing
+    
+    @staticmethod
+    def _build_record_values(parsed_record: ParsedRecord, filename: str, fixture: str,
+                             import_time: Optional[datetime] = None,
+                             import_log_id: Optional[int] = None) -> Dict:
+        """將解析記錄轉換為 test_records 欄位值"""
+        pf = parsed_record.parsed_filename
+        return {
+            'sn': pf.sn,
+            'test_date': pf.test_date,
+            'test_time': pf.test_time,
+            'test_type': pf.test_type,
+            'fixture': fixture,
+            'filename': filename,
+            'import_time': import_time or datetime.utcnow(),
+            'import_log_id': import_log_id,
+            # 僅保存 Config.FREQUENCY_BANDS 中的頻帶
+            'measurement_data': pack_measurements({
+                int(freq): value
+                for freq, value in parsed_record.frequency_data.items()
+                if freq in Config.SUPPORTED_FREQUENCIES
+            })
+        }
+    
     def query_records(self, sn: Optional[str] = None, test_date: Optional[str] = None,
                      test_type: Optional[str] = None, fixture: Optional[str] = None,
                      date_range: Optional[Tuple[str, str]] = None,
-                     limit: int = 100, offset: int = 0) -> Tuple[List[TestRecord], int]:
+                     limit: int = 100, offset: int = 0, cursor: Optional[str] = None,
+                     count_mode: Optional[str] = None,
+                     sn_match: Optional[str] = None) -> Tuple[List[TestRecord], Optional[int], Optional[str]]:
         """
-        查詢測試記錄
+        查詢測試記錄（依匯入時間由新到舊排序）
         
         Args:
             sn: 設備序號（可選）
@@ -122,92 +419,230 @@ class DatabaseService:
             fixture: 治具類型（可選）
             date_range: 日期範圍 (start_date, end_date)（可選）
             limit: 限制返回筆數
-            offset: 偏移量
+            offset: 偏移量（未提供 cursor 時使用）
+            cursor: 上一頁返回的 next_cursor，以 (import_time, id) keyset 接續查詢，不需掃過前面的記錄
+            count_mode: 總筆數計算方式 exact/cached/none（預設 Config.SEARCH_COUNT_MODE）
+            sn_match: SN 搜尋方式 exact/prefix/contains（預設 Config.SN_MATCH_MODE）
             
         Returns:
-            Tuple[List[TestRecord], int]: (記錄列表, 總筆數)
+            Tuple[List[TestRecord], Optional[int], Optional[str]]:
+                (記錄列表, 總筆數（none 模式為 None）, 下一頁 cursor（已無下一頁為 None）)
         """
-        with self.get_session() as session:
+        count_mode = count_mode or Config.SEARCH_COUNT_MODE
+        if count_mode not in Config.SEARCH_COUNT_MODES:
+            raise ValueError(f"不支援的總筆數模式：{count_mode}")
+        
+        filters = self.build_record_filters(sn=sn, test_date=test_date, test_type=test_type,
+                                            fixture=fixture, date_range=date_range, sn_match=sn_match)
+        
+        with self.get_session(read_only=True) as session:
             query = session.query(TestRecord)
+            if filters:
+                query = query.filter(and_(*filters))
             
-            # 建立過濾條件
-            filters = []
+            # 獲取總筆數
+            filter_key = (sn, (sn_match or Config.SN_MATCH_MODE) if sn else None, test_date, test_type, fixture,
+                          tuple(date_range) if date_range else None)
+            total_count = self._count_records(session, query, filter_key, count_mode)
             
-            if sn:
-                filters.append(TestRecord.sn.like(f'%{sn}%'))
+            # 應用分頁和排序（多取一筆判斷是否有下一頁）；import_time 為 NULL 的舊記錄一律排在最後
+            order = (desc(TestRecord.import_time).nulls_last(), desc(TestRecord.id))
+            if cursor:
+                last_import_time, last_id = self._decode_cursor(cursor)
+                records = []
+                if last_import_time is not None:
+                    # 以 row value 比較，資料庫可直接在 idx_import_time_id 上做範圍搜尋（NULL 不會符合）
+                    records = query.filter(
+                        tuple_(TestRecord.import_time, TestRecord.id) < tuple_(last_import_time, last_id)
+                    ).order_by(*order).limit(limit + 1).all()
+                    last_id = None
+                if len(records) <= limit:
+                    # 有時間的記錄已取完，接續 import_time 為 NULL 的記錄
+                    null_query = query.filter(TestRecord.import_time.is_(None))
+                    if last_id is not None:
+                        null_query = null_query.filter(TestRecord.id < last_id)
+                    records += null_query.order_by(desc(TestRecord.id)).limit(limit + 1 - len(records)).all()
+            else:
+                records = query.order_by(*order).offset(offset or None).limit(limit + 1).all()
             
-            if test_date:
-                filters.append(TestRecord.test_date == test_date)
+            next_cursor = None
+            if len(records) > limit:
+                records = records[:limit]
+                next_cursor = self._encode_cursor(records[-1])
             
+            return records, total_count, next_cursor
+    
+    @staticmethod
+    def build_record_filters(sn: Optional[str] = None, test_date: Optional[str] = None,
+                             test_type: Optional[str] = None, fixture: Optional[str] = None,
+                             date_range: Optional[Tuple[str, str]] = None, sn_match: Optional[str] = None,
+                             record_ids: Optional[List[int]] = None,
+                             import_log_id: Optional[int] = None) -> List:
+        """
+        建立 test_records 的過濾條件（搜尋、匯出、刪除共用）
+        
+        Returns:
+            List: SQL 條件運算式列表（空列表表示不篩選）
+        """
+        filters = []
+        
+        if record_ids is not None:
+            filters.append(TestRecord.id.in_(record_ids))
+        
+        if import_log_id is not None:
+            filters.append(TestRecord.import_log_id == import_log_id)
+        
+        if sn:
+            filters.append(sn_search.build_filter(sn, sn_match))
+        
+        if test_date:
+            filters.append(TestRecord.test_date == test_date)
+        
+        if test_type:
+            filters.append(TestRecord.test_type == test_type)
+        
+        if fixture:
+            filters.append(TestRecord.fixture == fixture)
+        
+        if date_range:
+            start_date, end_date = date_range
+            filters.append(TestRecord.test_date >= start_date)
+            filters.append(TestRecord.test_date <= end_date)
+        
+        return filters
+    
+    @staticmethod
+    def _count_records(session: Session, query, filter_key: Tuple, count_mode: str) -> Optional[int]:
+        """
+        計算搜尋總筆數
+        無條件或僅篩選治具/測試類型時直接讀取摘要計數；其他條件依 count_mode
+        以 COUNT(*) 計算，cached 模式將結果存入統計快取（匯入寫入後失效）
+        """
+        if count_mode == 'none':
+            return None
+        
+        sn, _, test_date, test_type, fixture, date_range = filter_key
+        if not (sn or test_date or date_range) and not (test_type and fixture):
             if test_type:
-                filters.append(TestRecord.test_type == test_type)
-            
+                return summary_service.get_count(session, 'test_type', test_type)
             if fixture:
-                filters.append(TestRecord.fixture == fixture)
-            
-            if date_range:
-                start_date, end_date = date_range
-                filters.append(TestRecord.test_date >= start_date)
-                filters.append(TestRecord.test_date <= end_date)
-            
-            if filters:
-                query = query.filter(and_(*filters))
+                return summary_service.get_count(session, 'fixture', fixture)
+            return summary_service.get_count(session)
+        
+        if count_mode == 'cached':
+            return statistics_cache.get_or_compute(('search_count',) + filter_key, query.count)
+        return query.count()
+    
+    @staticmethod
+    def _encode_cursor(record: TestRecord) -> str:
+        """將記錄的 (import_time, id) 編碼為不透明的分頁 cursor"""
+        import_time = record.import_time.isoformat() if record.import_time else ''
+        payload = f"{import_time}|{record.id}".encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+        """解析分頁 cursor（import_time 為 NULL 的記錄返回 None），格式錯誤時拋出 ValueError"""
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+            import_time, record_id = payload.split('|')
+            return datetime.fromisoformat(import_time) if import_time else None, int(record_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"無效的分頁 cursor：{cursor}") from e
+    
+    def delete_records(self, record_ids: Optional[List[int]] = None, batch_size: Optional[int] = None,
+                       **filters) -> Dict:
+        """
+        批次刪除記錄
+        每個分塊（最多 batch_size 筆）一個短交易：以 DELETE ... WHERE id IN (...) 刪除記錄（含量測值），
+        並重新計算受影響 SN 的摘要；分塊之間釋放寫入鎖，匯入等其他寫入可穿插執行
+        
+        Args:
+            record_ids: 要刪除的記錄 ID（可與其他條件併用）
+            batch_size: 每個交易刪除的記錄數（預設 Config.DELETE_BATCH_SIZE）
+            **filters: 篩選條件，參數同 build_record_filters（sn、date_range、fixture、import_log_id 等）；
+                       刪除時 sn 預設完全相符，需以 sn_match 明確指定 prefix / contains
             
-            # 獲取總筆數
-            total_count = query.count()
+        Returns:
+            Dict: {'deleted': 刪除筆數, 'sns': 受影響 SN 數, 'chunks': 交易數}
+        """
+        batch_size = batch_size or Config.DELETE_BATCH_SIZE
+        if filters.get('sn'):
+            # 不套用搜尋的預設比對方式（Config.SN_MATCH_MODE），避免刪除 SN 時連帶刪除包含該字串的其他 SN
+            filters['sn_match'] = filters.get('sn_match') or 'exact'
+        conditions = self.build_record_filters(**filters)
+        if record_ids is None and not conditions:
+            raise ValueError("未提供要刪除的記錄 ID 或篩選條件")
+        
+        outcome = {'deleted': 0, 'sns': 0, 'chunks': 0}
+        affected_sns = set()
+        
+        def _delete_chunk(session: Session, chunk_conditions: List) -> int:
+            rows = session.execute(
+                select(TestRecord.id, TestRecord.sn).where(*chunk_conditions)
+                .order_by(TestRecord.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return 0
             
-            # 應用分頁和排序
-            records = query.order_by(desc(TestRecord.import_time))\
-                          .offset(offset)\
-                          .limit(limit)\
-                          .all()
+            ids = [row.id for row in rows]
+            sns = {row.sn for row in rows}
+            session.execute(delete(TestRecord).where(TestRecord.id.in_(ids)))
+            limit_service.remove_records(session, ids)
+            summary_service.refresh_sns(session, sns)
+            sn_search.prune_sns(session, sns)
+            self._commit_writes(session, len(ids))
             
-            return records, total_count
-    
-    def get_sn_statistics(self) -> Dict[str, any]:
-        """獲取 SN 統計資訊"""
+            outcome['deleted'] += len(ids)
+            outcome['chunks'] += 1
+            affected_sns.update(sns)
+            return ids[-1]
+        
         with self.get_session() as session:
-            # SN 總數
-            total_sns = session.query(func.count(func.distinct(TestRecord.sn))).scalar()
-            
-            # 記錄總數
-            total_records = session.query(func.count(TestRecord.id)).scalar()
-            
-            # 最新記錄日期
-            latest_date = session.query(func.max(TestRecord.test_date)).scalar()
-            
-            # 各測試類型統計
-            test_type_stats = session.query(
-                TestRecord.test_type,
-                func.count(TestRecord.id)
-            ).group_by(TestRecord.test_type).all()
-            
-            # 治具統計
-            fixture_stats = session.query(
-                TestRecord.fixture,
-                func.count(TestRecord.id)
-            ).group_by(TestRecord.fixture).all()
-            
-            # SN 出現次數統計（前20名）
-            sn_counts = session.query(
-                TestRecord.sn,
-                func.count(TestRecord.id).label('count')
-            ).group_by(TestRecord.sn)\
-             .order_by(desc('count'))\
-             .limit(20).all()
-            
-            return {
-                'total_sns': total_sns,
-                'total_records': total_records,
-                'latest_date': latest_date,
-                'test_type_stats': dict(test_type_stats),
-                'fixture_stats': dict(fixture_stats),  # 新增治具統計
-                'top_sns': [{'sn': sn, 'count': count} for sn, count in sn_counts]
-            }
+            if record_ids is not None:
+                record_ids = sorted(set(record_ids))
+                for start in range(0, len(record_ids), batch_size):
+                    _delete_chunk(session, conditions + [
+                        TestRecord.id.in_(record_ids[start:start + batch_size])
+                    ])
+            else:
+                # 依 ID 由小到大分塊，以上一塊最後的 ID 接續查詢，不重複掃描已刪除的範圍
+                last_id = 0
+                while last_id is not None:
+                    last_id = _delete_chunk(session, conditions + [TestRecord.id > last_id]) or None
+        
+        outcome['sns'] = len(affected_sns)
+        if outcome['deleted']:
+            analytics_snapshot.schedule_refresh()
+        logger.info(f"刪除記錄完成：{outcome}")
+        return outcome
+    
+    def ping(self) -> bool:
+        """檢查資料庫連線（健康檢查用，不執行統計查詢）"""
+        with self.get_session(read_only=True) as session:
+            session.execute(text('SELECT 1'))
+        return True
+    
+    def get_sn_statistics(self, use_cache: bool = True) -> Dict[str, any]:
+        """
+        獲取 SN 統計資訊
+        結果快取 Config.STATS_CACHE_TTL 秒，匯入寫入新資料時立即失效
+        
+        Args:
+            use_cache: 是否使用快取（False 則直接查詢資料庫並更新快取）
+        """
+        if not use_cache:
+            statistics_cache.invalidate('sn_statistics')
+        return statistics_cache.get_or_compute('sn_statistics', self._query_sn_statistics)
+    
+    def _query_sn_statistics(self) -> Dict[str, any]:
+        """自統計摘要表查詢 SN 統計資訊"""
+        with self.get_session(read_only=True) as session:
+            return summary_service.get_statistics(session)
     
     def get_records_by_sn(self, sn: str, fixture: Optional[str] = None) -> List[TestRecord]:
         """根據 SN 獲取所有相關記錄"""
-        with self.get_session() as session:
+        with self.get_session(read_only=True) as session:
             query = session.query(TestRecord).filter(TestRecord.sn == sn)
             
             if fixture:
@@ -225,45 +660,42 @@ class ImportService:
         self.db_service = DatabaseService()
     
     def import_csv_file(self, file_path: str, filename: str, 
-                       fixture: str = "治具1", encoding: str = 'utf-8') -> Tuple[bool, Dict]:
+                       fixture: str = "治具1", encoding: str = 'utf-8',
+                       bulk: bool = True, chunk_size: Optional[int] = None,
+                       import_log_id: Optional[int] = None, mode: Optional[str] = None) -> Tuple[bool, Dict]:
         """
         匯入 CSV 檔案
+        批次模式下以串流方式分塊解析並直接寫入，每個分塊完成後更新 ImportLog 進度
         
         Args:
             file_path: 檔案路徑
             filename: 檔案名稱
             fixture: 治具類型
             encoding: 檔案編碼
+            bulk: 是否使用批次寫入模式（False 則整檔解析後逐筆檢查並寫入）
+            chunk_size: 串流解析每塊行數（預設 Config.IMPORT_CHUNK_SIZE）
+            import_log_id: 既有的匯入記錄 ID（背景工作使用，未提供則新建）
+            mode: 匯入模式 skip/overwrite/keep_latest（僅批次寫入模式支援，預設 Config.IMPORT_MODE）
             
         Returns:
             Tuple[bool, Dict]: (是否成功, 詳細結果)
         """
-        import_start_time = datetime.utcnow()
+        if bulk:
+            import_log_ids = [import_log_id] if import_log_id is not None else None
+            _, report = self.import_batch([(file_path, filename)], fixture, encoding,
+                                          chunk_size, import_log_ids, mode)
+            file_result = report['files'][0]
+            return file_result['success'], file_result
         
-        # 創建匯入記錄
-        import_log = ImportLog(
-            filename=filename,
-            fixture=fixture,  # 記錄治具資訊
-            import_status='processing',
-            import_time=import_start_time
-        )
-        
-        result = {
-            'success': False,
-            'message': '',
-            'statistics': {
-                'total_rows': 0,
-                'successful_imports': 0,
-                'failed_imports': 0,
-                'duplicate_skips': 0
-            },
-            'errors': []
-        }
+        result = self._new_result(filename)
+        import_log = None
         
         try:
             with self.db_service.get_session() as session:
-                session.add(import_log)
+                import_log = self._begin_import_log(session, filename, fixture, import_log_id)
                 session.commit()
+                result['import_id'] = import_log.id
+                started = time.perf_counter()
                 
                 # 解析 CSV 檔案
                 logger.info(f"開始解析檔案：{filename}，治具：{fixture}")
@@ -272,73 +704,549 @@ class ImportService:
                 import_log.total_rows = parse_stats['total_rows']
                 result['statistics']['total_rows'] = parse_stats['total_rows']
                 
-                # 批次匯入記錄
-                for parsed_record in parsed_records:
-                    try:
-                        if parsed_record.is_valid:
-                            success, message = self.db_service.create_test_record(
-                                parsed_record, filename, fixture, session
-                            )
-                            
-                            if success:
-                                import_log.successful_imports += 1
-                                result['statistics']['successful_imports'] += 1
-                            else:
-                                if "已存在" in message:
-                                    import_log.duplicate_skips += 1
-                                    result['statistics']['duplicate_skips'] += 1
-                                else:
-                                    import_log.failed_imports += 1
-                                    result['statistics']['failed_imports'] += 1
-                                    result['errors'].append({
-                                        'row': parsed_record.original_row_index + 1,
-                                        'error': message
-                                    })
-                        else:
-                            import_log.failed_imports += 1
-                            result['statistics']['failed_imports'] += 1
-                            result['errors'].append({
-                                'row': parsed_record.original_row_index + 1,
-                                'error': parsed_record.error_message
-                            })
-                            
-                    except Exception as e:
-                        import_log.failed_imports += 1
-                        result['statistics']['failed_imports'] += 1
-                        result['errors'].append({
-                            'row': parsed_record.original_row_index + 1,
-                            'error': f"匯入錯誤：{str(e)}"
-                        })
-                        logger.error(f"匯入記錄失敗：{str(e)}")
+                write_timings = {}
+                with stage('insert', write_timings):
+                    self._import_records_one_by_one(session, import_log, parsed_records,
+                                                    filename, fixture, result)
+                
+                self._record_performance(import_log, result, parse_stats, write_timings,
+                                         time.perf_counter() - started)
+                self._complete_import_log(session, import_log, result, fixture)
                 
-                # 更新匯入記錄狀態
-                import_log.import_status = 'completed'
-                import_log.completed_time = datetime.utcnow()
+        except Exception as e:
+            self._fail_import_log(import_log, result, e)
+        
+        self._schedule_snapshot_refresh([result])
+        return result['success'], result
+    
+    def import_batch(self, files: List[Tuple[str, str]], fixture: str = "治具1",
+                     encoding: str = 'utf-8', chunk_size: Optional[int] = None,
+                     import_log_ids: Optional[List[int]] = None,
+                     mode: Optional[str] = None) -> Tuple[bool, Dict]:
+        """
+        批次匯入多個 CSV 檔案
+        所有檔案共用同一個資料庫會話，解析（PARSE_WORKERS > 1 時跨檔案平行）與寫入以管線方式進行；
+        每個檔案各自記錄 ImportLog
+        
+        Args:
+            files: [(檔案路徑, 檔案名稱)]
+            fixture: 治具類型
+            encoding: 檔案編碼
+            chunk_size: 串流解析每塊行數（預設 Config.IMPORT_CHUNK_SIZE）
+            import_log_ids: 與 files 對應的既有匯入記錄 ID（背景工作使用，未提供則新建）
+            mode: 已存在記錄的處理方式 skip/overwrite/keep_latest（預設 Config.IMPORT_MODE）；
+                  keep_latest 以各檔案 ImportLog 的匯入時間比較
+            
+        Returns:
+            Tuple[bool, Dict]: (是否全部成功, 彙總報告)，彙總報告的 files 為各檔案的詳細結果
+        """
+        chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+        mode = mode or Config.IMPORT_MODE
+        if mode not in Config.IMPORT_MODES:
+            raise ValueError(f"不支援的匯入模式：{mode}")
+        file_results = [self._new_result(filename) for _, filename in files]
+        import_logs = [None] * len(files)
+        
+        try:
+            with self.db_service.get_session() as session:
+                for index, (file_path, filename) in enumerate(files):
+                    import_log_id = import_log_ids[index] if import_log_ids else None
+                    import_logs[index] = self._begin_import_log(session, filename, fixture,
+                                                                import_log_id, file_path)
                 session.commit()
+                for index, import_log in enumerate(import_logs):
+                    file_results[index]['import_id'] = import_log.id
+                
+                logger.info(f"開始批次匯入 {len(files)} 個檔案，治具：{fixture}")
                 
-                result['success'] = True
-                result['message'] = f"匯入完成 ({fixture})：成功 {result['statistics']['successful_imports']} 筆，" \
-                                  f"失敗 {result['statistics']['failed_imports']} 筆，" \
-                                  f"重複跳過 {result['statistics']['duplicate_skips']} 筆"
+                # 檔案依序完成，每個檔案的處理時間自前一個檔案完成起算
+                write_timings = [{} for _ in files]
+                file_started = time.perf_counter()
                 
-                logger.info(result['message'])
+                file_paths = [file_path for file_path, _ in files]
+                for index, parsed_records, parse_stats in self._iter_parsed_chunks(file_paths, encoding, chunk_size):
+                    import_log = import_logs[index]
+                    result = file_results[index]
+                    if import_log.import_status == 'failed':
+                        continue
+                    
+                    try:
+                        import_log.total_rows = parse_stats['total_rows']
+                        result['statistics']['total_rows'] = parse_stats['total_rows']
+                        
+                        if parsed_records is None:
+                            # 檔案解析結束
+                            finished = time.perf_counter()
+                            self._record_performance(import_log, result, parse_stats, write_timings[index],
+                                                     finished - file_started)
+                            file_started = finished
+                            self._complete_import_log(session, import_log, result, fixture)
+                            continue
+                        
+                        outcome = self.db_service.bulk_create_test_records(
+                            parsed_records, files[index][1], fixture, session,
+                            mode=mode, import_time=import_log.import_time, import_log_id=import_log.id
+                        )
+                        self._apply_outcome(import_log, result, outcome)
+                        for name, seconds in outcome['timings'].items():
+                            write_timings[index][name] = write_timings[index].get(name, 0.0) + seconds
+                        session.commit()
+                    except Exception as e:
+                        session.rollback()
+                        self._fail_import_log(import_log, result, e, session)
                 
         except Exception as e:
-            # 更新匯入記錄為失敗狀態
-            try:
-                with self.db_service.get_session() as session:
+            for import_log, result in zip(import_logs, file_results):
+                if not result['success'] and not result['message']:
+                    self._fail_import_log(import_log, result, e)
+        
+        self._schedule_snapshot_refresh(file_results)
+        return self._build_batch_report(file_results, fixture)
+    
+    def _iter_parsed_chunks(self, file_paths: List[str], encoding: str, chunk_size: int):
+        """
+        依序產出各檔案的解析分塊
+        
+        Yields:
+            Tuple[int, Optional[List[ParsedRecord]], Dict]: (檔案索引, 分塊解析記錄, 該檔案解析統計)；
+            檔案結束時分塊為 None
+        """
+        parser = self._create_parser()
+        
+        if isinstance(parser, ParallelCSVParser):
+            files = [(file_path, encoding) for file_path in file_paths]
+            for index, parsed_records in parser.iter_parse_csv_files(files, chunk_size):
+                yield index, parsed_records, parser.file_stats[index]
+            return
+        
+        for index, file_path in enumerate(file_paths):
+            for parsed_records in parser.iter_parse_csv_file(file_path, encoding, chunk_size):
+                yield index, parsed_records, parser.stats
+            yield index, None, parser.stats
+    
+    @staticmethod
+    def _build_batch_report(file_results: List[Dict], fixture: str) -> Tuple[bool, Dict]:
+        """彙總各檔案匯入結果"""
+        statistics = {
+            'total_files': len(file_results),
+            'completed_files': sum(1 for result in file_results if result['success']),
+            'failed_files': sum(1 for result in file_results if not result['success']),
+            'total_rows': 0,
+            'successful_imports': 0,
+            'failed_imports': 0,
+            'duplicate_skips': 0
+        }
+        for result in file_results:
+            for key in ('total_rows', 'successful_imports', 'failed_imports', 'duplicate_skips'):
+                statistics[key] += result['statistics'][key]
+        
+        success = statistics['failed_files'] == 0
+        message = f"批次匯入完成 ({fixture})：{statistics['completed_files']}/{statistics['total_files']} 個檔案成功，" \
+                  f"成功 {statistics['successful_imports']} 筆，" \
+                  f"失敗 {statistics['failed_imports']} 筆，" \
+                  f"重複跳過 {statistics['duplicate_skips']} 筆"
+        
+        return success, {
+            'success': success,
+            'message': message,
+            'statistics': statistics,
+            'files': file_results
+        }
+    
+    @staticmethod
+    def _new_result(filename: str) -> Dict:
+        """建立單一檔案的匯入結果"""
+        return {
+            'success': False,
+            'message': '',
+            'filename': filename,
+            'import_id': None,
+            'statistics': {
+                'total_rows': 0,
+                'successful_imports': 0,
+                'failed_imports': 0,
+                'duplicate_skips': 0
+            },
+            'errors': []
+        }
+    
+    @staticmethod
+    def _begin_import_log(session: Session, filename: str, fixture: str,
+                          import_log_id: Optional[int] = None,
+                          file_path: Optional[str] = None) -> ImportLog:
+        """建立匯入記錄（背景工作則沿用排隊時建立的記錄），狀態設為處理中"""
+        if import_log_id is None:
+            import_log = ImportLog(
+                filename=filename,
+                fixture=fixture,  # 記錄治具資訊
+                file_size=os.path.getsize(file_path) if file_path else None,
+                file_hash=ImportService.compute_file_hash(file_path) if file_path else None,
+                import_status='processing',
+                import_time=datetime.utcnow()
+            )
+            session.add(import_log)
+            return import_log
+        
+        import_log = session.get(ImportLog, import_log_id)
+        if import_log is None:
+            raise ValueError(f"找不到匯入記錄：ID={import_log_id}")
+        import_log.import_status = 'processing'
+        return import_log
+    
+    @staticmethod
+    def _record_performance(import_log: ImportLog, result: Dict, parse_stats: Dict,
+                            write_timings: Dict[str, float], elapsed: float):
+        """
+        將單一檔案的效能統計寫入 ImportLog 與匯入結果
+        
+        Args:
+            parse_stats: 該檔案的解析統計（含 bytes_read 與解析端各階段耗時）
+            write_timings: 寫入端各階段耗時 {validate / dedup / insert: 秒數}
+            elapsed: 處理時間（秒）；平行解析時 parse / validate 為各 worker 耗時合計，可能大於此值
+        """
+        timings = dict(parse_stats.get('timings', {}))
+        for name, seconds in write_timings.items():
+            timings[name] = timings.get(name, 0.0) + seconds
+        
+        import_log.bytes_read = parse_stats.get('bytes_read') or None
+        import_log.processing_seconds = round(elapsed, 4)
+        import_log.rows_per_second = round(parse_stats['total_rows'] / elapsed, 1) if elapsed > 0 else None
+        for name in ImportLog.PERFORMANCE_STAGES:
+            seconds = timings.get(name)
+            setattr(import_log, f'{name}_seconds', round(seconds, 4) if seconds is not None else None)
+        result['performance'] = import_log.get_performance()
+    
+    @staticmethod
+    def _complete_import_log(session: Session, import_log: ImportLog, result: Dict, fixture: str):
+        """更新匯入記錄為完成狀態"""
+        import_log.import_status = 'completed'
+        import_log.completed_time = datetime.utcnow()
+        session.commit()
+        
+        result['success'] = True
+        result['message'] = f"匯入完成 ({fixture})：成功 {result['statistics']['successful_imports']} 筆，" \
+                          f"失敗 {result['statistics']['failed_imports']} 筆，" \
+                          f"重複跳過 {result['statistics']['duplicate_skips']} 筆"
+        
+        logger.info(result['message'])
+    
+    def _fail_import_log(self, import_log: Optional[ImportLog], result: Dict, error: Exception,
+                         session: Optional[Session] = None):
+        """更新匯入記錄為失敗狀態"""
+        try:
+            if import_log is not None:
+                if session is not None:
                     import_log.import_status = 'failed'
-                    import_log.error_message = str(e)
+                    import_log.error_message = str(error)
                     import_log.completed_time = datetime.utcnow()
-                    session.merge(import_log)
                     session.commit()
-            except:
-                pass
+                else:
+                    with self.db_service.get_session() as new_session:
+                        import_log.import_status = 'failed'
+                        import_log.error_message = str(error)
+                        import_log.completed_time = datetime.utcnow()
+                        new_session.merge(import_log)
+                        new_session.commit()
+        except:
+            pass
+        
+        result['success'] = False
+        result['message'] = f"匯入失敗：{str(error)}"
+        logger.error(result['message'])
+    
+    @staticmethod
+    def _create_parser():
+        """依 Config.PARSE_WORKERS 建立串流解析器（多於 1 則使用多行程平行解析）"""
+        if Config.PARSE_WORKERS > 1:
+            return ParallelCSVParser(Config.PARSE_WORKERS)
+        return CSVDataParser()
+    
+    def create_import_log(self, filename: str, fixture: str = "治具1",
+                          file_size: Optional[int] = None, status: str = 'queued',
+                          file_hash: Optional[str] = None) -> int:
+        """建立匯入記錄，返回 ImportLog ID"""
+        with self.db_service.get_session() as session:
+            import_log = ImportLog(
+                filename=filename,
+                fixture=fixture,
+                file_size=file_size,
+                file_hash=file_hash,
+                import_status=status,
+                import_time=datetime.utcnow()
+            )
+            session.add(import_log)
+            session.commit()
+            return import_log.id
+    
+    def enqueue_import(self, file_path: str, filename: str, fixture: str = "治具1",
+                       encoding: str = 'utf-8', remove_file: bool = True,
+                       mode: Optional[str] = None) -> int:
+        """
+        將 CSV 匯入排入背景佇列
+        
+        Args:
+            file_path: 檔案路徑
+            filename: 檔案名稱
+            fixture: 治具類型
+            encoding: 檔案編碼
+            remove_file: 匯入結束後是否刪除檔案
+            mode: 匯入模式 skip/overwrite/keep_latest
             
-            result['message'] = f"匯入失敗：{str(e)}"
-            logger.error(result['message'])
+        Returns:
+            int: ImportLog ID，可用於查詢匯入進度
+        """
+        return self.enqueue_batch([(file_path, filename)], fixture, encoding, remove_file, mode=mode)[0]
+    
+    def enqueue_batch(self, files: List[Tuple[str, str]], fixture: str = "治具1",
+                      encoding: str = 'utf-8', remove_files: bool = True,
+                      file_hashes: Optional[List[str]] = None,
+                      mode: Optional[str] = None) -> List[int]:
+        """
+        將多個 CSV 檔案排入背景佇列，以單一批次工作匯入
         
-        return result['success'], result
+        Args:
+            files: [(檔案路徑, 檔案名稱)]
+            fixture: 治具類型
+            encoding: 檔案編碼
+            remove_files: 匯入結束後是否刪除檔案
+            file_hashes: 與 files 對應的內容雜湊（已計算過時傳入，避免重複讀檔）
+            mode: 匯入模式 skip/overwrite/keep_latest
+            
+        Returns:
+            List[int]: 各檔案的 ImportLog ID
+        """
+        mode = mode or Config.IMPORT_MODE
+        if mode not in Config.IMPORT_MODES:
+            raise ValueError(f"不支援的匯入模式：{mode}")
+        
+        if file_hashes is None:
+            file_hashes = [self.compute_file_hash(file_path) for file_path, _ in files]
+        import_ids = [
+            self.create_import_log(filename, fixture, os.path.getsize(file_path), file_hash=file_hash)
+            for (file_path, filename), file_hash in zip(files, file_hashes)
+        ]
+        import_queue.submit(import_ids, self._run_queued_batch, files, fixture,
+                            encoding, import_ids, remove_files, mode)
+        return import_ids
+    
+    def _run_queued_batch(self, files: List[Tuple[str, str]], fixture: str, encoding: str,
+                          import_ids: List[int], remove_files: bool,
+                          mode: Optional[str] = None) -> Tuple[bool, Dict]:
+        """背景工作：執行批次匯入並清理暫存檔案"""
+        try:
+            return self.import_batch(files, fixture, encoding, import_log_ids=import_ids, mode=mode)
+        finally:
+            if remove_files:
+                for file_path, _ in files:
+                    try:
+                        os.remove(file_path)
+                    except OSError:
+                        pass
+    
+    @staticmethod
+    def compute_file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+        """計算檔案內容的 SHA-256（分塊讀取，不將整個檔案載入記憶體）"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def find_imported_hashes(self, file_hashes: List[str]) -> set:
+        """
+        找出已匯入（或排隊、處理中）的檔案內容雜湊
+        匯入失敗的檔案不列入，內容相同時仍可重新匯入；
+        排隊/處理中的記錄須仍在本行程的匯入佇列中才列入，
+        行程重新啟動前未完成的匯入（記錄停在 queued/processing）不會讓檔案永遠被跳過
+        """
+        if not file_hashes:
+            return set()
+        
+        with self.db_service.get_session() as session:
+            rows = session.query(ImportLog.id, ImportLog.file_hash, ImportLog.import_status).filter(
+                ImportLog.file_hash.in_(set(file_hashes)),
+                ImportLog.import_status.in_(('queued', 'processing', 'completed'))
+            ).all()
+            return {file_hash for import_id, file_hash, status in rows
+                    if status == 'completed' or import_queue.is_active(import_id)}
+    
+    @staticmethod
+    def find_csv_files(directory: str, recursive: bool = False) -> List[Tuple[str, str]]:
+        """列出目錄中的 CSV 檔案，返回 [(檔案路徑, 檔案名稱)]（依檔名排序）"""
+        pattern = '**/*.csv' if recursive else '*.csv'
+        paths = sorted(Path(directory).glob(pattern))
+        return [(str(path), path.name) for path in paths if path.is_file()]
+    
+    @staticmethod
+    def extract_zip_csv_files(zip_path: str, target_dir: str, prefix: str = '') -> List[Tuple[str, str]]:
+        """
+        解壓縮 ZIP 中的 CSV 檔案（忽略子目錄結構，防止路徑穿越）
+        
+        Args:
+            zip_path: ZIP 檔案路徑
+            target_dir: 解壓目錄
+            prefix: 解壓後檔名前綴（避免與其他上傳檔案衝突）
+            
+        Returns:
+            List[Tuple[str, str]]: [(解壓後路徑, 檔案名稱)]
+        """
+        os.makedirs(target_dir, exist_ok=True)
+        extracted = []
+        with zipfile.ZipFile(zip_path) as archive:
+            for member in archive.infolist():
+                filename = os.path.basename(member.filename)
+                if member.is_dir() or not filename.lower().endswith('.csv') or filename.startswith('.'):
+                    continue
+                
+                file_path = os.path.join(target_dir, f"{prefix}{len(extracted):05d}_{filename}")
+                with archive.open(member) as source, open(file_path, 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                extracted.append((file_path, filename))
+        
+        return extracted
+    
+    def get_import_status(self, import_id: int) -> Optional[Dict]:
+        """
+        查詢匯入進度
+        
+        Returns:
+            Optional[Dict]: 匯入狀態與計數，找不到記錄時返回 None
+        """
+        with self.db_service.get_session() as session:
+            import_log = session.get(ImportLog, import_id)
+            if import_log is None:
+                return None
+            
+            successful = import_log.successful_imports or 0
+            failed = import_log.failed_imports or 0
+            duplicates = import_log.duplicate_skips or 0
+            status = {
+                'id': import_log.id,
+                'filename': import_log.filename,
+                'fixture': import_log.fixture,
+                'file_size': import_log.file_size,
+                'import_status': import_log.import_status,
+                'is_active': import_queue.is_active(import_id),
+                'statistics': {
+                    'total_rows': import_log.total_rows or 0,
+                    'processed_rows': successful + failed + duplicates,
+                    'successful_imports': successful,
+                    'failed_imports': failed,
+                    'duplicate_skips': duplicates
+                },
+                'import_time': import_log.import_time.isoformat() if import_log.import_time else None,
+                'completed_time': import_log.completed_time.isoformat() if import_log.completed_time else None,
+                'error_message': import_log.error_message,
+                'performance': import_log.get_performance()
+            }
+        
+        # 本行程執行的工作可附上完成訊息與錯誤明細
+        job_result = import_queue.get_result(import_id)
+        if job_result:
+            for file_result in job_result.get('files', [job_result]):
+                if file_result.get('import_id') == import_id:
+                    status['message'] = file_result.get('message')
+                    status['errors'] = file_result.get('errors', [])[:10]
+        
+        return status
+    
+    def get_batch_status(self, import_ids: List[int]) -> Optional[Dict]:
+        """
+        查詢批次匯入進度（彙總多個匯入記錄）
+        
+        Returns:
+            Optional[Dict]: 彙總狀態與各檔案狀態，全部找不到時返回 None
+        """
+        file_statuses = [status for status in map(self.get_import_status, import_ids) if status]
+        if not file_statuses:
+            return None
+        
+        statistics = {key: 0 for key in ('total_rows', 'processed_rows', 'successful_imports',
+                                         'failed_imports', 'duplicate_skips')}
+        for status in file_statuses:
+            for key in statistics:
+                statistics[key] += status['statistics'][key]
+        
+        states = {status['import_status'] for status in file_statuses}
+        if states <= {'completed'}:
+            batch_status = 'completed'
+        elif states <= {'completed', 'failed'}:
+            batch_status = 'failed'
+        elif states <= {'queued'}:
+            batch_status = 'queued'
+        else:
+            batch_status = 'processing'
+        
+        return {
+            'import_status': batch_status,
+            'total_files': len(file_statuses),
+            'completed_files': sum(1 for status in file_statuses if status['import_status'] == 'completed'),
+            'failed_files': sum(1 for status in file_statuses if status['import_status'] == 'failed'),
+            'statistics': statistics,
+            'files': file_statuses
+        }
+    
+    @staticmethod
+    def _schedule_snapshot_refresh(file_results: List[Dict]):
+        """有記錄寫入時於背景增量刷新分析快照"""
+        if any(result['statistics']['successful_imports'] for result in file_results):
+            analytics_snapshot.schedule_refresh()
+    
+    @staticmethod
+    def _apply_outcome(import_log: ImportLog, result: Dict, outcome: Dict):
+        """將批次寫入結果累加到 ImportLog 與匯入結果（錯誤明細最多保留 Config.IMPORT_MAX_ERRORS 筆）"""
+        import_log.successful_imports += outcome['successful']
+        import_log.failed_imports += outcome['failed']
+        import_log.duplicate_skips += outcome['duplicates']
+        result['statistics']['successful_imports'] += outcome['successful']
+        result['statistics']['failed_imports'] += outcome['failed']
+        result['statistics']['duplicate_skips'] += outcome['duplicates']
+        
+        remaining = Config.IMPORT_MAX_ERRORS - len(result['errors'])
+        if remaining > 0:
+            result['errors'].extend(outcome['errors'][:remaining])
+    
+    def _import_records_one_by_one(self, session: Session, import_log: ImportLog,
+                                   parsed_records: List[ParsedRecord], filename: str,
+                                   fixture: str, result: Dict):
+        """逐筆匯入記錄（每筆各自檢查重複並提交）"""
+        for parsed_record in parsed_records:
+            try:
+                if parsed_record.is_valid:
+                    success, message = self.db_service.create_test_record(
+                        parsed_record, filename, fixture, session, import_log.id
+                    )
+
+                    if success:
+                        import_log.successful_imports += 1
+                        result['statistics']['successful_imports'] += 1
+                    else:
+                        if "已存在" in message:
+                            import_log.duplicate_skips += 1
+                            result['statistics']['duplicate_skips'] += 1
+                        else:
+                            import_log.failed_imports += 1
+                            result['statistics']['failed_imports'] += 1
+                            result['errors'].append({
+                                'row': parsed_record.original_row_index + 1,
+                                'error': message
+                            })
+                else:
+                    import_log.failed_imports += 1
+                    result['statistics']['failed_imports'] += 1
+                    result['errors'].append({
+                        'row': parsed_record.original_row_index + 1,
+                        'error': parsed_record.error_message
+                    })
+
+            except Exception as e:
+                import_log.failed_imports += 1
+                result['statistics']['failed_imports'] += 1
+                result['errors'].append({
+                    'row': parsed_record.original_row_index + 1,
+                    'error': f"匯入錯誤：{str(e)}"
+                })
+                logger.error(f"匯入記錄失敗：{str(e)}")
     
     def get_import_history(self, limit: int = 50) -> List[ImportLog]:
         """獲取匯入歷史記錄"""
@@ -354,17 +1262,39 @@ class QueryService:
     提供複雜的數據查詢和分析功能
     """
     
+    # 整體母體統計可用的分組欄位
+    BAND_STATISTICS_GROUPS = (None, 'fixture', 'test_type')
+    
+    # 母體分析自資料庫讀取時每批的列數
+    BAND_MATRIX_FETCH_SIZE = 20000
+    
     def __init__(self):
         self.db_service = DatabaseService()
     
-    def search_records(self, **kwargs) -> Tuple[List[Dict], int]:
+    def search_records(self, **kwargs) -> Tuple[List[Dict], Optional[int], Optional[str]]:
         """
         搜尋記錄（返回字典格式，便於 JSON 序列化）
+        
+        Returns:
+            Tuple: (記錄字典列表, 總筆數, 下一頁 cursor)，參數與返回值說明見 DatabaseService.query_records
         """
-        records, total = self.db_service.query_records(**kwargs)
-        return [record.to_dict() for record in records], total
+        records, total, next_cursor = self.db_service.query_records(**kwargs)
+        return [record.to_dict() for record in records], total, next_cursor
     
-    def get_frequency_analysis(self, sn: str, frequency: str, fixture: Optional[str] = None) -> Dict:
+    def search_sns(self, sn: str, match: Optional[str] = None, limit: int = 20) -> List[str]:
+        """
+        搜尋符合的 SN 清單（不讀取測試記錄，供輸入提示使用）
+        
+        Args:
+            sn: 搜尋字串
+            match: exact / prefix / contains（預設 Config.SN_MATCH_MODE）
+            limit: 最多返回的 SN 數
+        """
+        with self.db_service.get_session(read_only=True) as session:
+            return sn_search.search_sns(session, sn, match, limit)
+    
+    def get_frequency_analysis(self, sn: str, frequency: str, fixture: Optional[str] = None,
+                               date_range: Optional[Tuple[str, str]] = None) -> Dict:
         """
         獲取指定 SN 和頻率的數據分析
         
@@ -372,56 +1302,432 @@ class QueryService:
             sn: 設備序號
             frequency: 頻率（如 '1000'）
             fixture: 治具類型（可選）
+            date_range: 測試日期範圍 (start_date, end_date)（可選，YYYYMMDD）
             
         Returns:
             Dict: 分析結果
         """
-        with self.db_service.get_session() as session:
-            freq_column = getattr(TestRecord, f'freq_{frequency}', None)
-            if not freq_column:
-                return {'error': f'不支援的頻率：{frequency}'}
-            
-            query = session.query(TestRecord)\
-                          .filter(TestRecord.sn == sn)\
-                          .filter(freq_column.isnot(None))
+        if frequency not in Config.SUPPORTED_FREQUENCIES:
+            return {'error': f'不支援的頻率：{frequency}'}
+        
+        fixtures = [fixture] if fixture else None
+        with self.db_service.get_session(read_only=True) as session:
+            # 統計值讀取頻率摘要表（指定日期範圍時以 SQL 彙總每日摘要），只有趨勢數據讀取記錄
+            summary = summary_service.get_frequency_summary(session, sn, int(frequency), fixture, date_range)
+            rows = self._query_trend(session, sn, int(frequency), fixtures, date_range) if summary is not None else []
+        
+        if summary is None:
+            fixture_text = f" (治具: {fixture})" if fixture else ""
+            return {'error': f'未找到 SN {sn} 在頻率 {frequency}{fixture_text} 的數據'}
+        return self._build_analysis(sn, frequency, fixture, summary, rows)
+    
+    @staticmethod
+    def _query_trend(session: Session, sn: str, frequency: int, fixtures: Optional[List[str]] = None,
+                     date_range: Optional[Tuple[str, str]] = None) -> List[TrendPoint]:
+        """
+        查詢 SN 各記錄在指定頻率的測試值，依測試時間排序（沒有此頻率數據的記錄不列出）
+        趨勢數據本身即逐筆記錄，只讀取此 SN 範圍內記錄的量測值；統計值不由此計算
+        """
+        query = session.query(
+            TestRecord.test_date, TestRecord.test_time, TestRecord.test_type,
+            TestRecord.fixture, TestRecord.measurement_data
+        ).filter(TestRecord.sn == sn)
+        
+        if fixtures is not None:
+            query = query.filter(TestRecord.fixture.in_(fixtures))
+        if date_range:
+            query = query.filter(TestRecord.test_date.between(*date_range))
+        
+        records = query.order_by(TestRecord.test_date, TestRecord.test_time).all()
+        positions, frequencies, values = unpack_measurements([record.measurement_data for record in records])
+        selected = frequencies == frequency
+        return [
+            TrendPoint(*records[position][:4], value)
+            for position, value in zip(positions[selected].tolist(), values[selected].tolist())
+        ]
+    
+    @staticmethod
+    def _build_analysis(sn: str, frequency: str, fixture: Optional[str], summary: Dict, rows: List) -> Dict:
+        """組合頻率分析結果"""
+        return {
+            'sn': sn,
+            'frequency': frequency,
+            'fixture': fixture,
+            'count': summary['count'],
+            'min_value': summary['min_value'],
+            'max_value': summary['max_value'],
+            'avg_value': summary['avg_value'],
+            'latest_value': rows[-1].value if rows else None,
+            'trend_data': [
+                {
+                    'date': row.test_date,
+                    'time': row.test_time,
+                    'type': row.test_type,
+                    'fixture': row.fixture,
+                    'value': row.value
+                }
+                for row in rows
+            ]
+        }
+    
+    def get_frequency_summary(self, sn: str, frequency: str, fixture: Optional[str] = None) -> Dict:
+        """
+        獲取指定 SN 和頻率的統計值（僅讀取頻率摘要表，不含趨勢數據）
+        
+        Returns:
+            Dict: count/min_value/max_value/avg_value/std_value，無數據時含 error
+        """
+        if frequency not in Config.SUPPORTED_FREQUENCIES:
+            return {'error': f'不支援的頻率：{frequency}'}
+        
+        with self.db_service.get_session(read_only=True) as session:
+            summary = summary_service.get_frequency_summary(session, sn, int(frequency), fixture)
+        
+        if summary is None:
+            fixture_text = f" (治具: {fixture})" if fixture else ""
+            return {'error': f'未找到 SN {sn} 在頻率 {frequency}{fixture_text} 的數據'}
+        
+        return dict(summary, sn=sn, frequency=frequency, fixture=fixture)
+    
+    def batch_frequency_analysis(self, sns: List[str], frequencies: Optional[List[str]] = None,
+                                 fixtures: Optional[List[str]] = None, by_fixture: bool = False,
+                                 date_range: Optional[Tuple[str, str]] = None) -> Dict:
+        """
+        批次分析多個 SN x 頻率（x 治具）的統計值，以單一分組查詢取得
+        
+        Args:
+            sns: 設備序號列表
+            frequencies: 頻率列表（預設全部頻帶）
+            fixtures: 只統計這些治具（預設全部）
+            by_fixture: 是否依治具分開統計
+            date_range: 測試日期範圍 (start_date, end_date)（可選，指定時彙總每日摘要）
             
-            if fixture:
-                query = query.filter(TestRecord.fixture == fixture)
+        Returns:
+            Dict: 欄式結果 {'columns': [...], 'data': {欄位: [值...]}, 'rows': 列數, 'missing_sns': [...]}，
+                  無效參數時含 error
+        """
+        sns = list(dict.fromkeys(sn for sn in sns if sn))
+        frequencies = [str(frequency) for frequency in (frequencies or Config.FREQUENCY_BANDS)]
+        
+        if not sns:
+            return {'error': '請提供至少一個 SN'}
+        if len(sns) > Config.ANALYSIS_BATCH_MAX_SNS:
+            return {'error': f'單次最多分析 {Config.ANALYSIS_BATCH_MAX_SNS} 個 SN'}
+        unsupported = [frequency for frequency in frequencies if frequency not in Config.SUPPORTED_FREQUENCIES]
+        if unsupported:
+            return {'error': f'不支援的頻率：{", ".join(unsupported)}'}
+        
+        frequency_values = [int(frequency) for frequency in frequencies]
+        with self.db_service.get_session(read_only=True) as session:
+            rows = summary_service.get_frequency_summaries(session, sns, frequency_values, fixtures,
+                                                           by_fixture, date_range)
+        
+        columns = ['sn'] + (['fixture'] if by_fixture else []) + [
+            'frequency', 'count', 'min_value', 'max_value', 'avg_value', 'std_value'
+        ]
+        found = {row['sn'] for row in rows}
+        return {
+            'columns': columns,
+            'data': {column: [row[column] for row in rows] for column in columns},
+            'rows': len(rows),
+            'missing_sns': [sn for sn in sns if sn not in found]
+        }
+    
+    def get_band_statistics(self, frequencies: Optional[List[str]] = None,
+                            fixtures: Optional[List[str]] = None, test_types: Optional[List[str]] = None,
+                            date_range: Optional[Tuple[str, str]] = None,
+                            group_by: Optional[str] = None) -> Dict:
+        """
+        整體母體各頻帶統計（筆數、平均、標準差、最小/最大值、百分位數）
+        自 Parquet 分析快照讀取所需欄位後以 NumPy 向量化計算，不經由 ORM 逐列讀取
+        
+        Args:
+            frequencies: 頻率列表（預設全部頻帶）
+            fixtures: 只統計這些治具（預設全部）
+            test_types: 只統計這些測試項目（預設全部）
+            date_range: 測試日期範圍 (start_date, end_date)
+            group_by: 分組欄位 fixture / test_type（預設不分組）
             
-            records = query.order_by(TestRecord.test_date, TestRecord.test_time).all()
+        Returns:
+            Dict: 欄式結果 {'columns': [...], 'data': {欄位: [值...]}, 'rows': 列數, 'records': 掃描記錄數}，
+                  無效參數或快照無法使用時含 error
+        """
+        frequencies = [str(frequency) for frequency in (frequencies or Config.FREQUENCY_BANDS)]
+        unsupported = [frequency for frequency in frequencies if frequency not in Config.SUPPORTED_FREQUENCIES]
+        if unsupported:
+            return {'error': f'不支援的頻率：{", ".join(unsupported)}'}
+        if group_by not in self.BAND_STATISTICS_GROUPS:
+            return {'error': f'不支援的分組欄位：{group_by}'}
+        if not analytics_snapshot.available:
+            return {'error': '分析快照無法使用（需安裝 pyarrow 並啟用 SNAPSHOT_ENABLED）'}
+        
+        if not analytics_snapshot.ready:
+            return {'error': '分析快照尚未建立，請稍後再試或執行 python run.py snapshot'}
+        
+        # 快照由許多小分區檔案組成，結果存入統計快取（快照刷新後失效）
+        cache_key = ('band_statistics', tuple(frequencies), tuple(fixtures or ()) or None,
+                     tuple(test_types or ()) or None, tuple(date_range or ()) or None, group_by)
+        return statistics_cache.get_or_compute(cache_key, lambda: self._compute_band_statistics(
+            frequencies, fixtures, test_types, date_range, group_by
+        ))
+    
+    @staticmethod
+    def _compute_band_statistics(frequencies: List[str], fixtures: Optional[List[str]],
+                                 test_types: Optional[List[str]], date_range: Optional[Tuple[str, str]],
+                                 group_by: Optional[str]) -> Dict:
+        """讀取快照欄位並以 NumPy 計算各頻帶統計（格式見 get_band_statistics）"""
+        band_columns = [Config.SUPPORTED_FREQUENCIES[frequency] for frequency in frequencies]
+        table = analytics_snapshot.read(band_columns + ([group_by] if group_by else []),
+                                        fixtures, test_types, date_range)
+        
+        values = np.column_stack([
+            table.column(column).to_numpy(zero_copy_only=False) for column in band_columns
+        ]) if table.num_rows else np.empty((0, len(band_columns)))
+        if group_by:
+            encoded = table.column(group_by).combine_chunks().dictionary_encode()
+            codes = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            labels = encoded.dictionary.to_pylist()
+            groups = [(labels[index], codes == index) for index in sorted(range(len(labels)), key=labels.__getitem__)]
+            if (codes == -1).any():
+                groups.append((None, codes == -1))
+        else:
+            groups = [(None, slice(None))]
+        
+        columns = ([group_by] if group_by else []) + [
+            'frequency', 'count', 'mean', 'std', 'min', 'max', 'p5', 'p50', 'p95'
+        ]
+        data = {column: [] for column in columns}
+        for group, rows in groups:
+            stats = population_stats.band_statistics(values[rows], (5, 50, 95))
+            # 整欄無值的頻帶不輸出
+            for index, frequency in enumerate(frequencies):
+                if not stats['count'][index]:
+                    continue
+                if group_by:
+                    data[group_by].append(group)
+                data['frequency'].append(int(frequency))
+                data['count'].append(int(stats['count'][index]))
+                for column in columns[-7:]:
+                    data[column].append(float(stats[column][index]))
+        
+        return {
+            'columns': columns,
+            'data': data,
+            'rows': len(data['frequency']),
+            'records': table.num_rows
+        }
+    
+    def get_population_analysis(self, frequencies: Optional[List[str]] = None,
+                                fixtures: Optional[List[str]] = None, test_types: Optional[List[str]] = None,
+                                date_range: Optional[Tuple[str, str]] = None, method: Optional[str] = None,
+                                threshold: Optional[float] = None,
+                                limits: Optional[Dict[str, Dict[str, float]]] = None) -> Dict:
+        """
+        母體分析：各頻帶母體統計、各 SN 離群值（z-score / MAD）與規格界線判定
+        篩選範圍內的記錄一次載入為 (記錄數 x 頻帶數) 矩陣（分析快照已建立時自 Parquet 讀取，否則自資料庫批次讀取），
+        之後全部以 NumPy 向量化計算
+        
+        Args:
+            frequencies: 頻率列表（預設全部頻帶）
+            fixtures: 只分析這些治具（預設全部）
+            test_types: 只分析這些測試項目（預設全部）
+            date_range: 測試日期範圍 (start_date, end_date)
+            method: 離群值判定方式 zscore / mad（預設 Config.OUTLIER_METHOD）
+            threshold: 離群分數門檻（預設 Config.OUTLIER_THRESHOLDS[method]）
+            limits: 規格界線 {頻率: {'lower': 下限, 'upper': 上限}}（可只設其一；未提供則不判定）
             
-            if not records:
-                fixture_text = f" (治具: {fixture})" if fixture else ""
-                return {'error': f'未找到 SN {sn} 在頻率 {frequency}{fixture_text} 的數據'}
+        Returns:
+            Dict: {'source', 'records', 'sns', 'method', 'threshold',
+                   'bands': 各頻帶統計（欄式）, 'outliers': 離群或不合格的 SN（欄式）, 'limits': 界線判定彙總}，
+                  無效參數時含 error
+        """
+        frequencies = [str(frequency) for frequency in (frequencies or Config.FREQUENCY_BANDS)]
+        unsupported = [frequency for frequency in frequencies if frequency not in Config.SUPPORTED_FREQUENCIES]
+        if unsupported:
+            return {'error': f'不支援的頻率：{", ".join(unsupported)}'}
+        method = method or Config.OUTLIER_METHOD
+        if method not in population_stats.OUTLIER_METHODS:
+            return {'error': f'不支援的離群值判定方式：{method}'}
+        threshold = float(threshold) if threshold is not None else Config.OUTLIER_THRESHOLDS[method]
+        
+        lower = np.full(len(frequencies), np.nan)
+        upper = np.full(len(frequencies), np.nan)
+        for frequency, limit in (limits or {}).items():
+            if str(frequency) not in frequencies:
+                return {'error': f'界線頻率不在分析範圍內：{frequency}'}
+            index = frequencies.index(str(frequency))
+            try:
+                if limit.get('lower') is not None:
+                    lower[index] = float(limit['lower'])
+                if limit.get('upper') is not None:
+                    upper[index] = float(limit['upper'])
+            except (AttributeError, TypeError, ValueError):
+                return {'error': f'頻率 {frequency} 的界線格式錯誤，應為 {{"lower": 下限, "upper": 上限}}'}
+        has_limits = bool(np.any(~np.isnan(lower) | ~np.isnan(upper)))
+        
+        sns, values, source = self._load_band_matrix(frequencies, fixtures, test_types, date_range)
+        codes, unique_sns = population_stats.group_codes(sns)
+        sn_count = len(unique_sns)
+        
+        # 母體統計與離群分數
+        stats = population_stats.band_statistics(values)
+        scores = population_stats.outlier_scores(values, stats, method)
+        flags = scores > threshold
+        record_outliers = flags.any(axis=1)
+        band_columns = ['frequency', 'count', 'mean', 'std', 'min', 'max', 'median', 'mad'] + [
+            f'p{percentile}' for percentile in population_stats.PERCENTILES
+        ] + ['outliers']
+        bands = {'frequency': [int(frequency) for frequency in frequencies],
+                 'count': stats['count'].tolist(), 'outliers': flags.sum(axis=0).tolist()}
+        bands.update({column: population_stats.to_list(stats[column]) for column in band_columns
+                      if column not in bands})
+        
+        # 各 SN 彙總
+        sn_records = np.bincount(codes, minlength=sn_count)
+        sn_outlier_records = np.bincount(codes, weights=record_outliers, minlength=sn_count).astype(int)
+        sn_max_scores = population_stats.group_reduce(
+            np.maximum, codes, population_stats.nan_reduce(np.nanmax, scores, axis=1), sn_count
+        )
+        # 各 SN 出現離群值的頻帶：(SN 編號, 頻帶) 配對去重後排序，供之後依 SN 取出
+        outlier_rows, outlier_bands = np.nonzero(flags)
+        outlier_pairs = np.unique(codes[outlier_rows] * len(frequencies) + outlier_bands)
+        pair_codes, pair_bands = np.divmod(outlier_pairs, len(frequencies))
+        
+        outlier_columns = ['sn', 'records', 'outlier_records', 'outlier_frequencies', 'max_score']
+        selected = sn_outlier_records > 0
+        sort_keys = [-np.nan_to_num(sn_max_scores)]
+        limit_summary = None
+        if has_limits:
+            margins = population_stats.limit_margins(values, lower, upper)
+            band_failures = margins < 0
+            record_failures = band_failures.any(axis=1)
+            record_margins = population_stats.nan_reduce(np.nanmin, margins, axis=1)
+            sn_failed_records = np.bincount(codes, weights=record_failures, minlength=sn_count).astype(int)
+            sn_worst_margins = population_stats.group_reduce(np.minimum, codes, record_margins, sn_count)
+            selected |= sn_failed_records > 0
+            sort_keys.append(-sn_failed_records)
+            outlier_columns += ['failed_records', 'worst_margin']
             
-            values = [getattr(record, f'freq_{frequency}') for record in records]
+            band_columns += ['lower', 'upper', 'failures', 'min_margin']
+            bands.update({
+                'lower': population_stats.to_list(lower),
+                'upper': population_stats.to_list(upper),
+                'failures': band_failures.sum(axis=0).tolist(),
+                'min_margin': population_stats.to_list(population_stats.nan_reduce(np.nanmin, margins, axis=0))
+            })
             
-            return {
-                'sn': sn,
-                'frequency': frequency,
-                'fixture': fixture,
-                'count': len(values),
-                'min_value': min(values),
-                'max_value': max(values),
-                'avg_value': sum(values) / len(values),
-                'latest_value': values[-1] if values else None,
-                'trend_data': [
-                    {
-                        'date': record.test_date,
-                        'time': record.test_time,
-                        'type': record.test_type,
-                        'fixture': record.fixture,
-                        'value': getattr(record, f'freq_{frequency}')
-                    }
-                    for record in records
-                ]
+            evaluated = int(np.count_nonzero(~np.isnan(record_margins)))
+            failed = int(record_failures.sum())
+            limit_summary = {
+                'evaluated_records': evaluated,
+                'failed_records': failed,
+                'failed_sns': int(np.count_nonzero(sn_failed_records)),
+                'yield': (evaluated - failed) / evaluated if evaluated else None
             }
+        
+        # 不合格者優先，其次依離群分數由高至低
+        order = np.flatnonzero(selected)
+        order = order[np.lexsort([key[order] for key in sort_keys])][:Config.POPULATION_MAX_SNS]
+        
+        outliers = {
+            'sn': unique_sns[order].tolist(),
+            'records': sn_records[order].tolist(),
+            'outlier_records': sn_outlier_records[order].tolist(),
+            'outlier_frequencies': [
+                [int(frequencies[index]) for index in pair_bands[
+                    np.searchsorted(pair_codes, code):np.searchsorted(pair_codes, code, side='right')
+                ]] for code in order
+            ],
+            'max_score': population_stats.to_list(sn_max_scores[order])
+        }
+        if has_limits:
+            outliers['failed_records'] = sn_failed_records[order].tolist()
+            outliers['worst_margin'] = population_stats.to_list(sn_worst_margins[order])
+        
+        return {
+            'source': source,
+            'records': len(values),
+            'sns': sn_count,
+            'method': method,
+            'threshold': threshold,
+            'bands': {'columns': band_columns, 'data': bands, 'rows': len(frequencies)},
+            'outliers': {'columns': outlier_columns, 'data': outliers, 'rows': len(order),
+                         'total': int(selected.sum())},
+            'limits': limit_summary
+        }
+    
+    def _load_band_matrix(self, frequencies: List[str], fixtures: Optional[List[str]],
+                          test_types: Optional[List[str]],
+                          date_range: Optional[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray, str]:
+        """
+        載入篩選範圍內各記錄的 SN 與頻帶矩陣
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray, str]: (各列 SN, (記錄數 x 頻帶數) 矩陣, 資料來源 snapshot/database)
+        """
+        band_columns = [Config.SUPPORTED_FREQUENCIES[frequency] for frequency in frequencies]
+        if analytics_snapshot.available and analytics_snapshot.ready:
+            table = analytics_snapshot.read(['sn'] + band_columns, fixtures, test_types, date_range)
+            if table is not None:
+                values = np.column_stack([
+                    table.column(column).to_numpy(zero_copy_only=False) for column in band_columns
+                ]) if table.num_rows else np.empty((0, len(band_columns)))
+                return table.column('sn').to_numpy(zero_copy_only=False), values, 'snapshot'
+        
+        conditions = []
+        if fixtures is not None:
+            conditions.append(TestRecord.fixture.in_(fixtures))
+        if test_types is not None:
+            conditions.append(TestRecord.test_type.in_(test_types))
+        if date_range:
+            conditions.append(TestRecord.test_date.between(*date_range))
+        
+        # 以連線層級執行（Core 結果列，不經過 ORM 結果處理），依筆數預先配置陣列，
+        # 記錄以 yield_per 分批讀取並逐批解碼填入，不同時保留所有結果列
+        with self.db_service.get_session(read_only=True) as session:
+            connection = session.connection().execution_options(yield_per=self.BAND_MATRIX_FETCH_SIZE)
+            total = connection.execute(
+                select(func.count(TestRecord.id)).where(*conditions)
+            ).scalar()
+            sns = np.empty(total, dtype=object)
+            values = np.full((total, len(frequencies)), np.nan)
+            
+            loaded = 0
+            result = connection.execute(
+                select(TestRecord.sn, TestRecord.measurement_data).where(*conditions).order_by(TestRecord.id)
+            )
+            for partition in result.partitions():
+                # 計數後才寫入的記錄（ID 較大、排在最後）不列入
+                partition = partition[:total - loaded]
+                if not partition:
+                    break
+                partition_sns, blobs = zip(*partition)
+                sns[loaded:loaded + len(partition)] = partition_sns
+                population_stats.pivot_measurements(blobs, frequencies, out=values, row_offset=loaded)
+                loaded += len(partition)
+            result.close()
+            sns, values = sns[:loaded], values[:loaded]
+        
+        return sns, values, 'database'
     
     def compare_sn_performance(self, sn1: str, sn2: str, frequency: str, 
                              fixture: Optional[str] = None) -> Dict:
-        """比較兩個 SN 在指定頻率下的表現"""
-        analysis1 = self.get_frequency_analysis(sn1, frequency, fixture)
-        analysis2 = self.get_frequency_analysis(sn2, frequency, fixture)
+        """比較兩個 SN 在指定頻率下的表現（兩個 SN 的統計值以同一查詢取得）"""
+        if frequency not in Config.SUPPORTED_FREQUENCIES:
+            return {'error': f'不支援的頻率：{frequency}'}
+        
+        with self.db_service.get_session(read_only=True) as session:
+            summaries = {
+                row['sn']: row for row in summary_service.get_frequency_summaries(
+                    session, [sn1, sn2], [int(frequency)], [fixture] if fixture else None
+                )
+            }
+        
+        fixture_text = f" (治具: {fixture})" if fixture else ""
+        analysis1, analysis2 = (
+            summaries.get(sn) or {'error': f'未找到 SN {sn} 在頻率 {frequency}{fixture_text} 的數據'}
+            for sn in (sn1, sn2)
+        )
         
         if 'error' in analysis1 or 'error' in analysis2:
             return {
@@ -454,9 +1760,31 @@ class QueryService:
         }
     
     def compare_fixture_performance(self, sn: str, frequency: str) -> Dict:
-        """比較同一 SN 在不同治具下的表現"""
-        fixture1_analysis = self.get_frequency_analysis(sn, frequency, "治具1")
-        fixture2_analysis = self.get_frequency_analysis(sn, frequency, "治具2")
+        """比較同一 SN 在不同治具下的表現（兩個治具的趨勢數據以同一查詢取得）"""
+        if frequency not in Config.SUPPORTED_FREQUENCIES:
+            return {'error': f'不支援的頻率：{frequency}'}
+        
+        fixtures = ("治具1", "治具2")
+        with self.db_service.get_session(read_only=True) as session:
+            summaries = {
+                row['fixture']: row for row in summary_service.get_frequency_summaries(
+                    session, [sn], [int(frequency)], fixtures, by_fixture=True
+                )
+            }
+            if not summaries:
+                return {'error': f'SN {sn} 在兩個治具都沒有頻率 {frequency} 的數據'}
+            rows = self._query_trend(session, sn, int(frequency), list(summaries))
+        
+        analyses = {}
+        for fixture in fixtures:
+            if fixture not in summaries:
+                analyses[fixture] = {'error': f'未找到 SN {sn} 在頻率 {frequency} (治具: {fixture}) 的數據'}
+            else:
+                analyses[fixture] = self._build_analysis(
+                    sn, frequency, fixture, summaries[fixture],
+                    [row for row in rows if row.fixture == fixture]
+                )
+        fixture1_analysis, fixture2_analysis = analyses["治具1"], analyses["治具2"]
         
         if 'error' in fixture1_analysis and 'error' in fixture2_analysis:
             return {'error': f'SN {sn} 在兩個治具都沒有頻率 {frequency} 的數據'}
@@ -492,5 +1820,5 @@ if __name__ == "__main__":
     print(f"資料庫統計：{stats}")
     
     # 測試查詢
-    records, total = query_service.search_records(limit=5)
+    records, total, _ = query_service.search_records(limit=5)
     print(f"查詢到 {total} 筆記錄，顯示前 {len(records)} 筆")
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+目錄監看匯入模組
+專案：CSV 數據分析與管理系統
+負責：監看共用目錄的新增/變更 CSV 檔案，以內容雜湊避免重複匯入，分批送入匯入佇列
+"""
+
+import os
+import time
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+from config import Config
+from data_service import import_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class CSVFileEventHandler(FileSystemEventHandler):
+    """將檔案系統事件轉交給 DirectoryWatcher"""
+
+    def __init__(self, watcher: 'DirectoryWatcher'):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
+
+class DirectoryWatcher:
+    """
+    目錄監看匯入服務
+    檔案在最後一次變動後靜置 WATCH_SETTLE_SECONDS 秒才視為寫入完成；
+    已處理檔案以 (大小, 修改時間) 記錄於記憶體，未變動的檔案不會重新讀取，
+    變動過的檔案再以 SHA-256 比對 ImportLog.file_hash，內容已匯入者直接跳過
+    """
+
+    def __init__(self, directory: str, fixture: str = "治具1", encoding: str = 'utf-8',
+                 recursive: bool = True, settle_seconds: Optional[float] = None,
+                 batch_size: Optional[int] = None, poll_interval: Optional[float] = None,
+                 mode: Optional[str] = None):
+        self.directory = os.path.abspath(directory)
+        self.fixture = fixture
+        self.encoding = encoding
+        self.mode = mode
+        self.recursive = recursive
+        self.settle_seconds = Config.WATCH_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        self.batch_size = batch_size or Config.WATCH_BATCH_SIZE
+        self.poll_interval = poll_interval or Config.WATCH_POLL_INTERVAL
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, float] = {}
+        self._known: Dict[str, Tuple[int, int]] = {}
+        self._observer = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self.stats = {
+            'queued_files': 0,
+            'skipped_files': 0,
+            'import_ids': []
+        }
+
+    @staticmethod
+    def _is_csv(path: str) -> bool:
+        filename = os.path.basename(path)
+        return filename.lower().endswith('.csv') and not filename.startswith('.')
+
+    def notify(self, path: str):
+        """記錄檔案變動，等待靜置後再處理"""
+        if not self._is_csv(path):
+            return
+        with self._lock:
+            self._pending[os.path.abspath(path)] = time.monotonic()
+
+    def scan(self):
+        """掃描目錄中既有的 CSV 檔案（啟動時補上監看前已存在的檔案）"""
+        for file_path, _ in import_service.find_csv_files(self.directory, self.recursive):
+            self.notify(file_path)
+
+    def process_pending(self, force: bool = False) -> List[int]:
+        """
+        處理已靜置的待匯入檔案
+
+        Args:
+            force: 忽略靜置時間，立即處理所有待處理檔案
+
+        Returns:
+            List[int]: 本次排入佇列的 ImportLog ID
+        """
+        now = time.monotonic()
+        with self._lock:
+            ready = [path for path, last_event in self._pending.items()
+                     if force or now - last_event >= self.settle_seconds]
+            for path in ready:
+                del self._pending[path]
+
+        candidates = []
+        for path in sorted(ready):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            # 輪詢掃描不會有事件時間，改以修改時間判斷是否仍在寫入
+            if not force and time.time() - stat.st_mtime < self.settle_seconds:
+                self.notify(path)
+                continue
+
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if stat.st_size == 0 or self._known.get(path) == signature:
+                continue
+
+            # 讀取失敗的檔案不記錄，下次變動或掃描時重試
+            try:
+                candidates.append((path, signature, import_service.compute_file_hash(path)))
+            except OSError as e:
+                logger.warning(f"無法讀取檔案 {path}：{str(e)}")
+
+        if not candidates:
+            return []
+
+        imported_hashes = import_service.find_imported_hashes([file_hash for _, _, file_hash in candidates])
+        files, file_hashes, signatures = [], [], []
+        for path, signature, file_hash in candidates:
+            if file_hash in imported_hashes:
+                self._known[path] = signature
+                self.stats['skipped_files'] += 1
+                logger.info(f"內容已匯入，跳過：{path}")
+                continue
+            # 同一批中內容相同的檔案只匯入一次
+            imported_hashes.add(file_hash)
+            files.append((path, os.path.basename(path)))
+            file_hashes.append(file_hash)
+            signatures.append(signature)
+
+        import_ids = []
+        for start in range(0, len(files), self.batch_size):
+            batch_ids = import_service.enqueue_batch(
+                files[start:start + self.batch_size], self.fixture, self.encoding,
+                remove_files=False, file_hashes=file_hashes[start:start + self.batch_size],
+                mode=self.mode
+            )
+            import_ids.extend(batch_ids)
+            # 排入佇列後才記錄為已處理
+            for (path, _), signature in zip(files[start:start + self.batch_size],
+                                            signatures[start:start + self.batch_size]):
+                self._known[path] = signature
+
+        if import_ids:
+            self.stats['queued_files'] += len(import_ids)
+            self.stats['import_ids'].extend(import_ids)
+            logger.info(f"監看目錄新增 {len(import_ids)} 個檔案至匯入佇列")
+
+        return import_ids
+
+    def _run(self):
+        """背景執行緒：定期處理待匯入檔案"""
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.process_pending()
+            except Exception as e:
+                logger.error(f"監看匯入處理失敗：{str(e)}")
+
+    def start(self):
+        """開始監看目錄"""
+        if not os.path.isdir(self.directory):
+            raise ValueError(f"目錄不存在：{self.directory}")
+
+        self._stop_event.clear()
+        self.scan()
+
+        self._observer = Observer()
+        self._observer.schedule(CSVFileEventHandler(self), self.directory, recursive=self.recursive)
+        self._observer.start()
+
+        self._thread = threading.Thread(target=self._run, name='directory-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f"開始監看目錄：{self.directory}，治具：{self.fixture}")
+
+    def stop(self):
+        """停止監看目錄"""
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        logger.info(f"停止監看目錄：{self.directory}")
+
+    def run_forever(self):
+        """前景執行監看，直到 Ctrl+C"""
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
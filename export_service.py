@@ -0,0 +1,174 @@
+"""
+資料匯出服務
+專案：CSV 數據分析與管理系統
+負責：以串流方式將測試記錄匯出為 CSV / JSON Lines / Excel
+"""
+
+import io
+import os
+import csv
+import json
+import tempfile
+import logging
+from typing import Dict, Iterator, List
+
+from sqlalchemy import select, and_
+
+from config import Config
+from models import TestRecord
+from measurement_codec import unpack_measurements
+from data_service import database_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ExportService:
+    """
+    資料匯出服務
+    以伺服器端游標（yield_per）逐批讀取記錄（含量測值欄位），不建立 ORM 物件；
+    CSV / JSON Lines 每 EXPORT_CHUNK_SIZE 筆送出一次，標題列立即送出。
+    Excel 以 openpyxl write-only 模式寫入暫存檔（記憶體用量固定），完成後再分塊送出
+    """
+
+    # 格式別名（相容舊版 API 的 excel / json）
+    FORMAT_ALIASES = {'excel': 'xlsx', 'json': 'jsonl'}
+
+    MIME_TYPES = {
+        'csv': 'text/csv; charset=utf-8',
+        'jsonl': 'application/x-ndjson; charset=utf-8',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    }
+
+    RECORD_COLUMNS = ['id', 'sn', 'test_date', 'test_time', 'test_type', 'fixture']
+    META_COLUMNS = ['filename', 'import_time']
+
+    # 暫存檔分塊送出的大小
+    FILE_CHUNK_BYTES = 64 * 1024
+
+    def __init__(self):
+        self.db_service = database_service
+
+    @classmethod
+    def normalize_format(cls, export_format: str) -> str:
+        """
+        檢查並正規化匯出格式
+
+        Raises:
+            ValueError: 不支援的格式
+        """
+        export_format = cls.FORMAT_ALIASES.get(export_format, export_format)
+        if export_format not in Config.EXPORT_FORMATS:
+            raise ValueError(f"不支援的匯出格式：{export_format}（可用：{', '.join(Config.EXPORT_FORMATS)}）")
+        return export_format
+
+    @property
+    def columns(self) -> List[str]:
+        """匯出欄位（頻率沿用 freq_XXX 欄位名稱）"""
+        frequency_columns = [f'freq_{freq}' for freq in Config.FREQUENCY_BANDS]
+        return self.RECORD_COLUMNS + frequency_columns + self.META_COLUMNS
+
+    def stream(self, export_format: str, **filters) -> Iterator[bytes]:
+        """
+        產生匯出內容
+
+        Args:
+            export_format: csv / jsonl / xlsx
+            **filters: 過濾條件，參數同 DatabaseService.build_record_filters
+
+        Yields:
+            bytes: 匯出內容片段
+        """
+        export_format = self.normalize_format(export_format)
+        conditions = self.db_service.build_record_filters(**filters)
+
+        if export_format == 'csv':
+            return self._stream_csv(conditions)
+        if export_format == 'jsonl':
+            return self._stream_jsonl(conditions)
+        return self._stream_xlsx(conditions)
+
+    def iter_records(self, conditions: List) -> Iterator[Dict]:
+        """
+        逐筆產生記錄字典（含 freq_XXX），依記錄 ID 排序串流讀取，量測值每批一次解碼
+        """
+        record_columns = [getattr(TestRecord, column) for column in self.RECORD_COLUMNS + self.META_COLUMNS]
+        stmt = select(*record_columns, TestRecord.measurement_data).order_by(TestRecord.id)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+
+        record_width = len(self.RECORD_COLUMNS)
+        empty_frequencies = {f'freq_{freq}': None for freq in Config.FREQUENCY_BANDS}
+
+        with self.db_service.get_session(read_only=True) as session:
+            result = session.execute(stmt.execution_options(yield_per=Config.EXPORT_CHUNK_SIZE))
+            for partition in result.partitions():
+                records = []
+                for row in partition:
+                    record = dict(zip(self.RECORD_COLUMNS, row[:record_width]))
+                    record.update(empty_frequencies)
+                    record.update(zip(self.META_COLUMNS, row[record_width:-1]))
+                    if record['import_time'] is not None:
+                        record['import_time'] = record['import_time'].isoformat()
+                    records.append(record)
+
+                positions, frequencies, values = unpack_measurements([row[-1] for row in partition])
+                for position, frequency, value in zip(positions.tolist(), frequencies.tolist(), values.tolist()):
+                    records[position][f'freq_{frequency}'] = value
+                yield from records
+
+    def _iter_chunks(self, conditions: List) -> Iterator[List[Dict]]:
+        """每 EXPORT_CHUNK_SIZE 筆記錄為一組"""
+        chunk = []
+        for record in self.iter_records(conditions):
+            chunk.append(record)
+            if len(chunk) >= Config.EXPORT_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _stream_csv(self, conditions: List) -> Iterator[bytes]:
+        columns = self.columns
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+
+        # UTF-8 BOM 讓 Excel 正確辨識中文；標題列立即送出
+        writer.writeheader()
+        yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+
+        for chunk in self._iter_chunks(conditions):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(chunk)
+            yield buffer.getvalue().encode('utf-8')
+
+    def _stream_jsonl(self, conditions: List) -> Iterator[bytes]:
+        for chunk in self._iter_chunks(conditions):
+            yield ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in chunk).encode('utf-8')
+
+    def _stream_xlsx(self, conditions: List) -> Iterator[bytes]:
+        # xlsx 為 zip 格式，須寫完才能輸出；write-only 模式逐列寫入暫存檔，不在記憶體保留整份工作表
+        from openpyxl import Workbook
+
+        columns = self.columns
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('測試記錄')
+        worksheet.append(columns)
+        for record in self.iter_records(conditions):
+            worksheet.append([record.get(column) for column in columns])
+
+        file_descriptor, temp_path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(file_descriptor)
+        try:
+            workbook.save(temp_path)
+            with open(temp_path, 'rb') as f:
+                while True:
+                    data = f.read(self.FILE_CHUNK_BYTES)
+                    if not data:
+                        break
+                    yield data
+        finally:
+            os.remove(temp_path)
+
+# 全域匯出服務實例
+export_service = ExportService()
@@ -0,0 +1,103 @@
+"""
+背景匯入佇列
+專案：CSV 數據分析與管理系統
+負責：匯入工作排程、併發數控制、工作結果暫存
+"""
+
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ImportJobQueue:
+    """
+    匯入工作佇列
+    以執行緒池在背景執行匯入工作，同時執行的工作數由 Config.IMPORT_WORKERS 控制；
+    工作進度記錄在 ImportLog，完成結果（含錯誤明細）暫存於記憶體供狀態查詢
+    """
+
+    # 記憶體中保留的已完成工作結果數量
+    MAX_RESULTS = 200
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or Config.IMPORT_WORKERS
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = set()
+        self._results: 'OrderedDict[int, Dict]' = OrderedDict()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """延遲建立執行緒池，避免匯入模組時即啟動執行緒"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='import-worker'
+                )
+            return self._executor
+
+    def submit(self, import_ids: List[int], func: Callable, *args, **kwargs) -> Future:
+        """
+        提交匯入工作
+
+        Args:
+            import_ids: 此工作涵蓋的 ImportLog ID（批次匯入時為多個）
+            func: 工作函數，回傳值需為 (是否成功, 詳細結果)
+
+        Returns:
+            Future: 工作的 Future 物件
+        """
+        # 先登記再提交，避免工作在登記前就已完成
+        with self._lock:
+            self._active.update(import_ids)
+        future = self._get_executor().submit(self._run, import_ids, func, *args, **kwargs)
+        logger.info(f"匯入工作已排入佇列：ImportLog ID={import_ids}")
+        return future
+
+    def _run(self, import_ids: List[int], func: Callable, *args, **kwargs):
+        """執行工作並保存結果"""
+        try:
+            success, result = func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"背景匯入工作失敗：ImportLog ID={import_ids}，{str(e)}")
+            success, result = False, {'success': False, 'message': f"匯入失敗：{str(e)}", 'errors': []}
+
+        with self._lock:
+            for import_id in import_ids:
+                self._active.discard(import_id)
+                self._results[import_id] = result
+            while len(self._results) > self.MAX_RESULTS:
+                self._results.popitem(last=False)
+
+        return success, result
+
+    def is_active(self, import_id: int) -> bool:
+        """工作是否仍在佇列中或執行中"""
+        with self._lock:
+            return import_id in self._active
+
+    def get_result(self, import_id: int) -> Optional[Dict]:
+        """取得已完成工作的結果（僅限本行程執行且仍在暫存中的工作）"""
+        with self._lock:
+            return self._results.get(import_id)
+
+    def active_count(self) -> int:
+        """排隊中與執行中的匯入記錄數"""
+        with self._lock:
+            return len(self._active)
+
+    def shutdown(self, wait: bool = True):
+        """關閉執行緒池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+# 全域匯入佇列實例
+import_queue = ImportJobQueue()
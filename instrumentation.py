@@ -0,0 +1,262 @@
+"""
+效能量測模組
+專案：CSV 數據分析與管理系統
+負責：各路由延遲分布、每個請求的 SQL 次數與耗時、匯入各階段耗時，以 Prometheus 文字格式輸出；
+     單一請求的取樣分析（profile=1，需開啟 PROFILING_ENABLED）
+"""
+
+import bisect
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+from config import Config
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # pyinstrument 未安裝時改用 cProfile（決定性分析，額外負擔較大）
+    SamplingProfiler = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 延遲類指標的預設分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 每個請求 SQL 次數的分桶
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+class Histogram:
+    """累積分桶直方圖（Prometheus histogram），依標籤值分組"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # {標籤值: [各分桶次數..., 總和, 次數]}
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labelvalues, values in sorted(series.items()):
+            labels = list(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", _format_value(bound))])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", "+Inf")])} {values[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(values[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {values[-1]}')
+        return lines
+
+class Counter:
+    """遞增計數器（Prometheus counter），依標籤值分組"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._series[labelvalues] = self._series.get(labelvalues, 0) + amount
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = dict(self._series)
+        for labelvalues, value in sorted(series.items()):
+            labels = list(zip(self.labelnames, labelvalues))
+            lines.append(f'{self.name}{_format_labels(labels)} {_format_value(value)}')
+        return lines
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """指標登錄表（本行程），render() 輸出 Prometheus 文字格式"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# 全域指標登錄表與指標
+metrics = MetricsRegistry()
+
+REQUEST_LATENCY = metrics.histogram(
+    'http_request_duration_seconds', '請求處理時間', ('method', 'route', 'status'))
+REQUEST_SQL_STATEMENTS = metrics.histogram(
+    'http_request_sql_statements', '每個請求執行的 SQL 敘述數', ('route',), COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = metrics.histogram(
+    'http_request_sql_duration_seconds', '每個請求的 SQL 執行時間合計', ('route',))
+SQL_STATEMENTS = metrics.counter(
+    'db_statements_total', '執行的 SQL 敘述數（含背景匯入）', ('database',))
+SQL_SECONDS = metrics.counter(
+    'db_statement_duration_seconds_total', 'SQL 執行時間合計（含背景匯入）', ('database',))
+IMPORT_STAGE_SECONDS = metrics.histogram(
+    'import_stage_duration_seconds', '匯入各階段耗時（每個檔案或分塊一次）', ('stage',))
+
+# 目前請求的 SQL 統計 {'statements': 次數, 'seconds': 秒數}，請求以外（背景匯入）為 None
+_request_sql = contextvars.ContextVar('request_sql', default=None)
+
+# ==================== 匯入階段 ====================
+
+@contextmanager
+def stage(name: str, timings: Optional[Dict[str, float]] = None):
+    """
+    量測一個匯入階段（read_csv / parse / validate / insert 等）的耗時
+
+    Args:
+        name: 階段名稱
+        timings: 另外累加耗時的字典 {階段: 秒數}（例如單次匯入的統計）
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        IMPORT_STAGE_SECONDS.observe(elapsed, name)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+# ==================== SQL ====================
+
+_sqlalchemy_instrumented = False
+
+def instrument_sqlalchemy():
+    """於所有 SQLAlchemy 引擎註冊 before/after_cursor_execute 事件（重複呼叫不會重複註冊）"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _sqlalchemy_instrumented = True
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    database = conn.engine.dialect.name
+    SQL_STATEMENTS.inc(database)
+    SQL_SECONDS.inc(database, amount=elapsed)
+
+    request_sql = _request_sql.get()
+    if request_sql is not None:
+        request_sql['statements'] += 1
+        request_sql['seconds'] += elapsed
+
+# ==================== Flask ====================
+
+def init_app(app):
+    """註冊請求量測（延遲、SQL 次數與耗時、Server-Timing 標頭）與 profile=1 分析"""
+    from flask import g, request
+
+    instrument_sqlalchemy()
+
+    @app.before_request
+    def _start_request_metrics():
+        g.request_start_time = time.perf_counter()
+        g.request_sql_token = _request_sql.set({'statements': 0, 'seconds': 0.0})
+        if Config.PROFILING_ENABLED and request.args.get('profile') == '1':
+            g.request_profiler = _start_profiler()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start = g.pop('request_start_time', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        request_sql = _request_sql.get() or {'statements': 0, 'seconds': 0.0}
+
+        if request.endpoint != 'static':
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_LATENCY.observe(elapsed, request.method, route, str(response.status_code))
+            REQUEST_SQL_STATEMENTS.observe(request_sql['statements'], route)
+            REQUEST_SQL_SECONDS.observe(request_sql['seconds'], route)
+
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'sql;dur={request_sql["seconds"] * 1000:.1f};desc="{request_sql["statements"]} statements"'
+        )
+
+        profiler = g.pop('request_profiler', None)
+        if profiler is not None:
+            response = app.response_class(_stop_profiler(profiler), mimetype='text/plain; charset=utf-8')
+        return response
+
+    @app.teardown_request
+    def _reset_request_metrics(error=None):
+        token = g.pop('request_sql_token', None)
+        if token is not None:
+            _request_sql.reset(token)
+
+def _start_profiler():
+    if SamplingProfiler is not None:
+        profiler = SamplingProfiler(interval=Config.PROFILE_INTERVAL)
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+def _stop_profiler(profiler) -> str:
+    """停止分析並回傳文字報表（取代原本的回應內容）"""
+    if SamplingProfiler is not None:
+        profiler.stop()
+        return profiler.output_text(unicode=True, color=False)
+
+    profiler.disable()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(Config.PROFILE_TOP_FUNCTIONS)
+    return output.getvalue()
@@ -0,0 +1,313 @@
+"""
+界線判定服務
+專案：CSV 數據分析與管理系統
+負責：黃金曲線（各頻帶上下限）管理、測試記錄的界線判定與判定結果查詢
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.orm import Session
+
+from config import Config
+from models import TestRecord, GoldenCurve, GoldenCurvePoint, LimitResult, db_manager
+import population_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class LimitService:
+    """
+    界線判定服務
+    匯入時於寫入交易內判定新寫入/覆蓋的記錄；新增或修改黃金曲線時對該治具 + 測試項目的既有記錄重新判定。
+    同一分塊的記錄一次載入為 (記錄數 x 頻帶數) 矩陣，依曲線分組後以 NumPy 向量化計算餘裕
+    """
+
+    # IN 查詢每次的記錄 ID 數量上限
+    ID_CHUNK_SIZE = 500
+
+    RESULT_STATUSES = ('failed', 'passed', 'all')
+
+    def __init__(self):
+        self.db_manager = db_manager
+        self.bands = list(Config.FREQUENCY_BANDS)
+
+    # ==================== 黃金曲線 ====================
+
+    def list_curves(self) -> List[Dict]:
+        """列出所有黃金曲線"""
+        with self.db_manager.get_read_session() as session:
+            curves = session.query(GoldenCurve).order_by(GoldenCurve.fixture, GoldenCurve.test_type).all()
+            return [curve.to_dict() for curve in curves]
+
+    def save_curve(self, fixture: str, test_type: str, points: Dict[str, Dict[str, float]],
+                   name: Optional[str] = None) -> Dict:
+        """
+        新增或取代治具 + 測試項目的黃金曲線（不重新判定既有記錄，請接著呼叫 evaluate）
+
+        Args:
+            fixture: 測試治具
+            test_type: 測試項目
+            points: {頻率: {'target': 目標值, 'lower': 下限, 'upper': 上限, 'tolerance': 容許偏差}}；
+                    未提供 lower / upper 時以 target ± tolerance 計算，每個頻率至少需有一個界線
+            name: 曲線名稱
+
+        Returns:
+            Dict: 黃金曲線
+
+        Raises:
+            ValueError: 參數錯誤
+        """
+        if not fixture or not test_type:
+            raise ValueError("請提供治具與測試項目")
+        if test_type not in Config.VALID_TEST_TYPES:
+            raise ValueError(f"不支援的測試項目：{test_type}")
+        parsed_points = self._parse_points(points)
+
+        with self.db_manager.get_session() as session:
+            curve = session.query(GoldenCurve).filter_by(fixture=fixture, test_type=test_type).one_or_none()
+            if curve is None:
+                curve = GoldenCurve(fixture=fixture, test_type=test_type)
+                session.add(curve)
+            curve.name = name
+            curve.updated_at = datetime.utcnow()
+            curve.points = [GoldenCurvePoint(frequency=frequency, **limits)
+                            for frequency, limits in parsed_points.items()]
+            session.commit()
+            logger.info(f"黃金曲線已儲存：{fixture} / {test_type}（{len(parsed_points)} 個頻率）")
+            return curve.to_dict()
+
+    def _parse_points(self, points: Dict[str, Dict[str, float]]) -> Dict[int, Dict[str, Optional[float]]]:
+        if not isinstance(points, dict) or not points:
+            raise ValueError("請提供各頻率的界線 points")
+
+        parsed = {}
+        for frequency, point in points.items():
+            if str(frequency) not in Config.SUPPORTED_FREQUENCIES:
+                raise ValueError(f"不支援的頻率：{frequency}")
+            if not isinstance(point, dict):
+                raise ValueError(f"頻率 {frequency} 的界線格式錯誤")
+            try:
+                values = {key: float(point[key]) if point.get(key) is not None else None
+                          for key in ('target', 'lower', 'upper', 'tolerance')}
+            except (TypeError, ValueError):
+                raise ValueError(f"頻率 {frequency} 的界線應為數值")
+
+            tolerance = values.pop('tolerance')
+            if tolerance is not None and values['target'] is not None:
+                if values['lower'] is None:
+                    values['lower'] = values['target'] - tolerance
+                if values['upper'] is None:
+                    values['upper'] = values['target'] + tolerance
+            if values['lower'] is None and values['upper'] is None:
+                raise ValueError(f"頻率 {frequency} 至少需設定上限或下限（或目標值與容許偏差）")
+            if values['lower'] is not None and values['upper'] is not None and values['lower'] > values['upper']:
+                raise ValueError(f"頻率 {frequency} 的下限大於上限")
+            parsed[int(frequency)] = values
+        return parsed
+
+    def delete_curve(self, curve_id: int) -> bool:
+        """刪除黃金曲線與其判定結果"""
+        with self.db_manager.get_session() as session:
+            curve = session.get(GoldenCurve, curve_id)
+            if curve is None:
+                return False
+            session.execute(delete(LimitResult).where(LimitResult.curve_id == curve_id))
+            session.delete(curve)
+            session.commit()
+            logger.info(f"黃金曲線已刪除：{curve.fixture} / {curve.test_type}")
+            return True
+
+    def _load_curves(self, session: Session) -> Dict[Tuple[str, str], Tuple[int, np.ndarray, np.ndarray]]:
+        """
+        載入所有黃金曲線
+
+        Returns:
+            Dict: {(治具, 測試項目): (曲線 ID, 各頻帶下限, 各頻帶上限)}，未設界線的頻帶為 NaN
+        """
+        band_index = {int(band): index for index, band in enumerate(self.bands)}
+        curves = {}
+        rows = session.execute(
+            select(GoldenCurve.id, GoldenCurve.fixture, GoldenCurve.test_type,
+                   GoldenCurvePoint.frequency, GoldenCurvePoint.lower, GoldenCurvePoint.upper)
+            .join(GoldenCurvePoint, GoldenCurvePoint.curve_id == GoldenCurve.id)
+        )
+        for curve_id, fixture, test_type, frequency, lower, upper in rows:
+            if frequency not in band_index:
+                continue
+            key = (fixture, test_type)
+            if key not in curves:
+                curves[key] = (curve_id, np.full(len(self.bands), np.nan), np.full(len(self.bands), np.nan))
+            index = band_index[frequency]
+            curves[key][1][index] = np.nan if lower is None else lower
+            curves[key][2][index] = np.nan if upper is None else upper
+        return curves
+
+    # ==================== 判定 ====================
+
+    def evaluate_records(self, session: Session, record_ids: Iterable[int]) -> Dict:
+        """
+        於目前交易內判定指定記錄（匯入寫入後呼叫；既有結果一律重算，不再適用曲線的結果移除）
+
+        Returns:
+            Dict: {'evaluated': 判定筆數, 'failed': 不合格筆數}
+        """
+        outcome = {'evaluated': 0, 'failed': 0}
+        record_ids = sorted(set(record_ids))
+        if not record_ids:
+            return outcome
+        curves = self._load_curves(session)
+        if not curves:
+            # 沒有任何黃金曲線時也不會有判定結果
+            return outcome
+
+        for start in range(0, len(record_ids), self.ID_CHUNK_SIZE):
+            chunk = record_ids[start:start + self.ID_CHUNK_SIZE]
+            session.execute(delete(LimitResult).where(LimitResult.record_id.in_(chunk)))
+            rows = self._evaluate_chunk(session, chunk, curves)
+            if rows:
+                session.execute(insert(LimitResult), rows)
+            outcome['evaluated'] += len(rows)
+            outcome['failed'] += sum(1 for row in rows if not row['passed'])
+        return outcome
+
+    def _evaluate_chunk(self, session: Session, record_ids: List[int],
+                        curves: Dict[Tuple[str, str], Tuple[int, np.ndarray, np.ndarray]]) -> List[Dict]:
+        """載入一個分塊的記錄與量測值，依治具 + 測試項目套用曲線，回傳判定結果列"""
+        records = session.connection().execute(
+            select(TestRecord.id, TestRecord.sn, TestRecord.fixture, TestRecord.test_type, TestRecord.test_date,
+                   TestRecord.measurement_data)
+            .where(TestRecord.id.in_(record_ids)).order_by(TestRecord.id)
+        ).all()
+        records = [record for record in records if (record.fixture, record.test_type) in curves]
+        if not records:
+            return []
+
+        values = population_stats.pivot_measurements([record.measurement_data for record in records], self.bands)
+
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for index, record in enumerate(records):
+            groups.setdefault((record.fixture, record.test_type), []).append(index)
+
+        evaluated_at = datetime.utcnow()
+        rows = []
+        for key, indexes in groups.items():
+            curve_id, lower, upper = curves[key]
+            indexes = np.asarray(indexes)
+            margins = population_stats.limit_margins(values[indexes], lower, upper)
+            worst_margins = population_stats.nan_reduce(np.nanmin, margins, axis=1)
+            worst_bands = np.where(np.isnan(margins), np.inf, margins).argmin(axis=1)
+            failed_bands = np.count_nonzero(margins < 0, axis=1)
+
+            for position in np.flatnonzero(~np.isnan(worst_margins)):
+                record = records[indexes[position]]
+                rows.append({
+                    'record_id': record.id,
+                    'curve_id': curve_id,
+                    'sn': record.sn,
+                    'fixture': record.fixture,
+                    'test_type': record.test_type,
+                    'test_date': record.test_date,
+                    'passed': bool(worst_margins[position] >= 0),
+                    'worst_margin': float(worst_margins[position]),
+                    'worst_frequency': int(self.bands[worst_bands[position]]),
+                    'failed_bands': int(failed_bands[position]),
+                    'evaluated_at': evaluated_at
+                })
+        return rows
+
+    def evaluate(self, fixture: Optional[str] = None, test_type: Optional[str] = None,
+                 batch_size: Optional[int] = None) -> Dict:
+        """
+        重新判定既有記錄（新增或修改黃金曲線後呼叫）
+        依記錄 ID 分塊，每個分塊一個交易
+
+        Args:
+            fixture: 只判定此治具（預設所有有曲線的治具）
+            test_type: 只判定此測試項目
+            batch_size: 每個交易的記錄數（預設 Config.LIMIT_EVALUATION_BATCH_SIZE）
+
+        Returns:
+            Dict: {'evaluated': 判定筆數, 'failed': 不合格筆數, 'chunks': 交易數}
+        """
+        batch_size = batch_size or Config.LIMIT_EVALUATION_BATCH_SIZE
+        outcome = {'evaluated': 0, 'failed': 0, 'chunks': 0}
+        conditions = []
+        if fixture:
+            conditions.append(TestRecord.fixture == fixture)
+        if test_type:
+            conditions.append(TestRecord.test_type == test_type)
+
+        with self.db_manager.get_session() as session:
+            last_id = 0
+            while True:
+                record_ids = session.execute(
+                    select(TestRecord.id).where(*conditions, TestRecord.id > last_id)
+                    .order_by(TestRecord.id).limit(batch_size)
+                ).scalars().all()
+                if not record_ids:
+                    break
+                chunk_outcome = self.evaluate_records(session, record_ids)
+                session.commit()
+                outcome['evaluated'] += chunk_outcome['evaluated']
+                outcome['failed'] += chunk_outcome['failed']
+                outcome['chunks'] += 1
+                last_id = record_ids[-1]
+
+        logger.info(f"界線判定完成：{outcome}")
+        return outcome
+
+    def remove_records(self, session: Session, record_ids: Iterable[int]):
+        """刪除記錄時一併移除判定結果（於同一交易內）"""
+        record_ids = list(record_ids)
+        for start in range(0, len(record_ids), self.ID_CHUNK_SIZE):
+            session.execute(delete(LimitResult).where(
+                LimitResult.record_id.in_(record_ids[start:start + self.ID_CHUNK_SIZE])
+            ))
+
+    # ==================== 查詢 ====================
+
+    def query_results(self, status: str = 'failed', date_range: Optional[Tuple[str, str]] = None,
+                      fixture: Optional[str] = None, test_type: Optional[str] = None,
+                      sn: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        """
+        查詢判定結果（預設只查不合格），依測試日期由新至舊
+
+        Args:
+            status: failed / passed / all
+            date_range: 測試日期範圍 (start_date, end_date)
+            fixture / test_type / sn: 篩選條件
+            limit: 回傳筆數上限（預設且最多 Config.LIMIT_RESULTS_MAX）
+
+        Returns:
+            Tuple[List[Dict], int]: (判定結果, 符合條件總筆數)
+        """
+        if status not in self.RESULT_STATUSES:
+            raise ValueError(f"不支援的判定狀態：{status}")
+        limit = min(limit or Config.LIMIT_RESULTS_MAX, Config.LIMIT_RESULTS_MAX)
+
+        conditions = []
+        if status != 'all':
+            conditions.append(LimitResult.passed == (status == 'passed'))
+        if date_range:
+            conditions.append(LimitResult.test_date.between(*date_range))
+        if fixture:
+            conditions.append(LimitResult.fixture == fixture)
+        if test_type:
+            conditions.append(LimitResult.test_type == test_type)
+        if sn:
+            conditions.append(LimitResult.sn == sn)
+
+        with self.db_manager.get_read_session() as session:
+            total = session.scalar(select(func.count()).select_from(LimitResult).where(*conditions))
+            results = session.execute(
+                select(LimitResult).where(*conditions)
+                .order_by(LimitResult.test_date.desc(), LimitResult.record_id.desc()).limit(limit)
+            ).scalars().all()
+            return [result.to_dict() for result in results], total
+
+# 全域界線判定服務實例
+limit_service = LimitService()
@@ -0,0 +1,64 @@
+"""
+量測值編碼模組
+專案：CSV 數據分析與管理系統
+負責：將一筆記錄的各頻率測試值緊密編碼為 test_records.measurement_data（BLOB），以及批次解碼
+
+精度：測試值以 float32 保存，可保留 7 位有效數字（例如 -50.1、-75.25、-123.4567），
+解碼時四捨五入回 7 位有效數字。超過 7 位有效數字的輸入會被捨入（-50.123456789 讀回 -50.12346，
+相對誤差不超過 5e-7），自舊版 Float 欄位搬移時以 rounding_errors 統計並記錄警告
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 每個量測值 6 bytes：頻率 uint16（Hz）+ 測試值 float32，只存有值的頻率，依頻率排序
+# 頻率隨值一起存放，新增頻帶不需變更資料表結構，既有記錄也不需重新編碼
+MEASUREMENT_DTYPE = np.dtype([('frequency', '<u2'), ('value', '<f4')])
+
+# float32 可保留的十進位有效位數；解碼時四捨五入至此位數，-50.1 讀回仍為 -50.1 而非 -50.099998
+VALUE_DIGITS = 7
+
+def pack_measurements(frequency_data: Dict[int, float]) -> Optional[bytes]:
+    """
+    編碼 {頻率(Hz): 測試值}
+
+    Returns:
+        Optional[bytes]: 沒有量測值時為 None
+    """
+    if not frequency_data:
+        return None
+    packed = np.empty(len(frequency_data), dtype=MEASUREMENT_DTYPE)
+    packed['frequency'] = sorted(frequency_data)
+    packed['value'] = [frequency_data[frequency] for frequency in packed['frequency'].tolist()]
+    return packed.tobytes()
+
+def unpack_measurements(blobs: Sequence[Optional[bytes]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    批次解碼多筆記錄的量測值（串接後一次轉換，不逐筆建立陣列）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (所屬記錄在 blobs 中的位置, 頻率, 測試值 float64)
+    """
+    blobs = [blob or b'' for blob in blobs]
+    packed = np.frombuffer(b''.join(blobs), dtype=MEASUREMENT_DTYPE)
+    lengths = np.fromiter((len(blob) for blob in blobs), dtype=np.int64, count=len(blobs))
+    positions = np.repeat(np.arange(len(blobs)), lengths // MEASUREMENT_DTYPE.itemsize)
+    return positions, packed['frequency'].astype(np.int64), restore_values(packed['value'])
+
+def unpack_record(blob: Optional[bytes]) -> Dict[int, float]:
+    """解碼單筆記錄的量測值為 {頻率(Hz): 測試值}"""
+    _, frequencies, values = unpack_measurements([blob])
+    return dict(zip(frequencies.tolist(), values.tolist()))
+
+def rounding_errors(values: Sequence[float]) -> np.ndarray:
+    """各測試值編碼後再解碼與原值的絕對誤差（7 位有效數字以內的數值為 0）"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.abs(restore_values(values.astype(MEASUREMENT_DTYPE['value'])) - values)
+
+def restore_values(values: np.ndarray) -> np.ndarray:
+    """float32 測試值轉為 float64，並四捨五入至 VALUE_DIGITS 位有效數字，還原原始的十進位數值"""
+    values = values.astype(np.float64)
+    magnitude = np.floor(np.log10(np.abs(values), out=np.zeros_like(values), where=values != 0))
+    scale = 10.0 ** (VALUE_DIGITS - 1 - magnitude)
+    return np.round(values * scale) / scale
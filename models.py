@@ -3,14 +3,43 @@
 專案：CSV 數據分析與管理系統
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, UniqueConstraint, Index
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, BigInteger, String, Float, DateTime, Boolean, LargeBinary, UniqueConstraint, Index, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 from datetime import datetime
 import os
+import re
+import sqlite3
+import time
+import logging
+
+import numpy as np
+
+from config import Config
+from measurement_codec import VALUE_DIGITS, pack_measurements, rounding_errors, unpack_record
+from pool_metrics import PoolMetrics, TimedQueuePool
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# 支援 INSERT ... ON CONFLICT 的資料庫方言
+UPSERT_DIALECTS = {
+    'sqlite': sqlite_insert,
+    'postgresql': postgresql_insert
+}
+
+def supports_upsert_returning(bind) -> bool:
+    """
+    是否可用多列 INSERT ... ON CONFLICT ... RETURNING 取回實際寫入的列
+    SQLite 3.35 起才支援 RETURNING，較舊版本由 SQLAlchemy 方言關閉此能力
+    """
+    dialect = bind.dialect
+    return dialect.name in UPSERT_DIALECTS and dialect.insert_executemany_returning
+
 class TestRecord(Base):
     """
     測試記錄主表
@@ -27,27 +56,14 @@ class TestRecord(Base):
     # 新增治具欄位
     fixture = Column(String(20), nullable=True, default='治具1', comment='測試治具：治具1/治具2')
     
-    # 測試數據欄位 - 對應 [630, 800, 1000, 1250, 1600, 2000] 等頻率
-    freq_630 = Column(Float, comment='630Hz 測試值')
-    freq_800 = Column(Float, comment='800Hz 測試值')
-    freq_1000 = Column(Float, comment='1000Hz 測試值')
-    freq_1250 = Column(Float, comment='1250Hz 測試值')
-    freq_1600 = Column(Float, comment='1600Hz 測試值')
-    freq_2000 = Column(Float, comment='2000Hz 測試值')
-    
-    # 擴展欄位，支援更多頻率
-    freq_100 = Column(Float, comment='100Hz 測試值')
-    freq_125 = Column(Float, comment='125Hz 測試值')
-    freq_160 = Column(Float, comment='160Hz 測試值')
-    freq_200 = Column(Float, comment='200Hz 測試值')
-    freq_250 = Column(Float, comment='250Hz 測試值')
-    freq_315 = Column(Float, comment='315Hz 測試值')
-    freq_400 = Column(Float, comment='400Hz 測試值')
-    freq_500 = Column(Float, comment='500Hz 測試值')
+    # 測試數據 - 各頻率測試值緊密編碼於單一欄位（格式見 measurement_codec）
+    measurement_data = Column(LargeBinary, comment='量測值：每個頻率 uint16 頻率 + float32 測試值（7 位有效數字）')
     
     # 元數據
     filename = Column(String(255), comment='原始檔案名稱')
     import_time = Column(DateTime, default=datetime.utcnow, comment='資料匯入時間')
+    import_log_id = Column(Integer, ForeignKey('import_logs.id', ondelete='SET NULL'), index=True,
+                           comment='最後寫入此記錄的匯入 ID')
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -58,30 +74,221 @@ class TestRecord(Base):
         Index('idx_sn_date', 'sn', 'test_date'),
         Index('idx_test_type', 'test_type'),
         Index('idx_fixture', 'fixture'),  # 新增治具索引
-        Index('idx_import_time', 'import_time'),
+        Index('idx_import_time_id', 'import_time', 'id'),  # 搜尋結果排序與 keyset 分頁
     )
     
     def __repr__(self):
         return f"<TestRecord(sn='{self.sn}', date='{self.test_date}', time='{self.test_time}', type='{self.test_type}', fixture='{self.fixture}')>"
     
+    def get_frequency_data(self):
+        """取得 {頻率: 測試值}（頻率為字串，與 ParsedRecord.frequency_data 相同）"""
+        return {str(frequency): value for frequency, value in unpack_record(self.measurement_data).items()}
+    
     def to_dict(self):
-        """轉換為字典格式，便於 JSON 序列化"""
-        return {
+        """轉換為字典格式，便於 JSON 序列化（頻率數據沿用 freq_XXX 欄位名稱）"""
+        data = {
             'id': self.id,
             'sn': self.sn,
             'test_date': self.test_date,
             'test_time': self.test_time,
             'test_type': self.test_type,
             'fixture': self.fixture,  # 新增治具資訊
-            'freq_630': self.freq_630,
-            'freq_800': self.freq_800,
-            'freq_1000': self.freq_1000,
-            'freq_1250': self.freq_1250,
-            'freq_1600': self.freq_1600,
-            'freq_2000': self.freq_2000,
+        }
+        
+        frequency_data = self.get_frequency_data()
+        for freq in Config.FREQUENCY_BANDS:
+            data[f'freq_{freq}'] = frequency_data.pop(freq, None)
+        for freq, value in frequency_data.items():
+            data[f'freq_{freq}'] = value
+        
+        data.update({
             'filename': self.filename,
             'import_time': self.import_time.isoformat() if self.import_time else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
+        })
+        return data
+
+class SNSummary(Base):
+    """
+    SN 統計摘要表 - 每個 SN + 治具 + 測試項目的記錄數
+    匯入時於同一交易內增量維護，儀表板統計直接讀取此表（治具為空時以空字串表示）
+    """
+    __tablename__ = 'sn_summaries'
+    
+    sn = Column(String(50), primary_key=True, comment='設備序號')
+    fixture = Column(String(20), primary_key=True, comment='測試治具')
+    test_type = Column(String(10), primary_key=True, comment='測試項目')
+    record_count = Column(Integer, nullable=False, default=0, comment='記錄數')
+    latest_date = Column(String(8), comment='最新測試日期')
+    
+    __table_args__ = (
+        Index('idx_sn_summary_latest', 'latest_date'),
+    )
+    
+    def __repr__(self):
+        return f"<SNSummary(sn='{self.sn}', fixture='{self.fixture}', type='{self.test_type}', count={self.record_count})>"
+
+class FrequencySummary(Base):
+    """
+    頻率統計摘要表 - 每個 SN + 治具 + 頻率的量測值 count/min/max/sum/sum of squares
+    匯入時增量維護，頻率分析的統計欄位直接讀取此表
+    """
+    __tablename__ = 'sn_frequency_summaries'
+    
+    sn = Column(String(50), primary_key=True, comment='設備序號')
+    fixture = Column(String(20), primary_key=True, comment='測試治具')
+    frequency = Column(Integer, primary_key=True, comment='頻率（Hz）')
+    value_count = Column(Integer, nullable=False, default=0, comment='量測值筆數')
+    min_value = Column(Float, comment='最小值')
+    max_value = Column(Float, comment='最大值')
+    sum_value = Column(Float, comment='總和')
+    sum_squares = Column(Float, comment='平方和')
+    
+    def __repr__(self):
+        return f"<FrequencySummary(sn='{self.sn}', fixture='{self.fixture}', frequency={self.frequency}, count={self.value_count})>"
+
+class FrequencyDailySummary(Base):
+    """
+    每日頻率統計摘要表 - 每個 SN + 頻率 + 測試日期 + 治具的量測值 count/min/max/平均/離均差平方和
+    匯入時增量維護，指定日期範圍的頻率分析以 SQL 彙總此表，不需解碼記錄的量測值
+    """
+    __tablename__ = 'sn_frequency_daily_summaries'
+
+    sn = Column(String(50), primary_key=True, comment='設備序號')
+    frequency = Column(Integer, primary_key=True, comment='頻率（Hz）')
+    test_date = Column(String(8), primary_key=True, comment='測試日期 YYYYMMDD')
+    fixture = Column(String(20), primary_key=True, comment='測試治具')
+    value_count = Column(Integer, nullable=False, default=0, comment='量測值筆數')
+    min_value = Column(Float, comment='最小值')
+    max_value = Column(Float, comment='最大值')
+    mean_value = Column(Float, comment='平均值')
+    squared_deviations = Column(Float, comment='離均差平方和')
+
+    def __repr__(self):
+        return f"<FrequencyDailySummary(sn='{self.sn}', frequency={self.frequency}, date='{self.test_date}', fixture='{self.fixture}', count={self.value_count})>"
+
+class SummaryCount(Base):
+    """
+    全域計數表 - 記錄總數、SN 總數、各治具與各測試項目的記錄數
+    dimension：total（記錄總數）/ sn（SN 總數）/ fixture / test_type / version（摘要表結構版本，見 SummaryService）
+    """
+    __tablename__ = 'summary_counts'
+    
+    dimension = Column(String(20), primary_key=True, comment='統計維度')
+    key = Column(String(50), primary_key=True, comment='維度值')
+    count = Column(Integer, nullable=False, default=0, comment='計數')
+    
+    def __repr__(self):
+        return f"<SummaryCount(dimension='{self.dimension}', key='{self.key}', count={self.count})>"
+
+class SNLookup(Base):
+    """
+    SN 查詢表 - 每個 SN 一列
+    子字串搜尋索引（SQLite FTS5 trigram / PostgreSQL pg_trgm）建立於此表，由 sn_search 維護
+    """
+    __tablename__ = 'sn_lookup'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sn = Column(String(50), nullable=False, unique=True, comment='設備序號')
+    
+    def __repr__(self):
+        return f"<SNLookup(sn='{self.sn}')>"
+
+class GoldenCurve(Base):
+    """
+    黃金曲線表 - 每個治具 + 測試項目一條，各頻帶的目標值與上下限存於 golden_curve_points
+    """
+    __tablename__ = 'golden_curves'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fixture = Column(String(20), nullable=False, comment='測試治具')
+    test_type = Column(String(10), nullable=False, comment='測試項目')
+    name = Column(String(100), comment='曲線名稱')
+    points = relationship('GoldenCurvePoint', lazy='selectin', cascade='all, delete-orphan',
+                          order_by='GoldenCurvePoint.frequency')
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('fixture', 'test_type', name='uq_golden_curve_fixture_type'),
+    )
+    
+    def __repr__(self):
+        return f"<GoldenCurve(fixture='{self.fixture}', type='{self.test_type}', points={len(self.points)})>"
+    
+    def to_dict(self):
+        """轉換為字典格式"""
+        return {
+            'id': self.id,
+            'fixture': self.fixture,
+            'test_type': self.test_type,
+            'name': self.name,
+            'points': {
+                str(point.frequency): {'target': point.target, 'lower': point.lower, 'upper': point.upper}
+                for point in self.points
+            },
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class GoldenCurvePoint(Base):
+    """
+    黃金曲線頻帶表 - 每條曲線每個頻率一列，上下限可只設其一
+    """
+    __tablename__ = 'golden_curve_points'
+    
+    curve_id = Column(Integer, ForeignKey('golden_curves.id', ondelete='CASCADE'),
+                      primary_key=True, comment='黃金曲線 ID')
+    frequency = Column(Integer, primary_key=True, comment='頻率（Hz）')
+    target = Column(Float, comment='目標值')
+    lower = Column(Float, comment='下限')
+    upper = Column(Float, comment='上限')
+    
+    def __repr__(self):
+        return f"<GoldenCurvePoint(curve_id={self.curve_id}, frequency={self.frequency}, lower={self.lower}, upper={self.upper})>"
+
+class LimitResult(Base):
+    """
+    界線判定結果表 - 每筆測試記錄對其治具 + 測試項目黃金曲線的判定結果
+    匯入時於同一交易內計算；SN、治具、測試項目與測試日期隨結果保存，
+    「某段期間內不合格的記錄」可直接以 (passed, test_date) 索引查詢，不需掃描量測值
+    """
+    __tablename__ = 'limit_results'
+    
+    record_id = Column(Integer, ForeignKey('test_records.id', ondelete='CASCADE'),
+                       primary_key=True, comment='測試記錄 ID')
+    curve_id = Column(Integer, ForeignKey('golden_curves.id', ondelete='CASCADE'),
+                      nullable=False, index=True, comment='黃金曲線 ID')
+    sn = Column(String(50), nullable=False, index=True, comment='設備序號')
+    fixture = Column(String(20), nullable=False, comment='測試治具')
+    test_type = Column(String(10), nullable=False, comment='測試項目')
+    test_date = Column(String(8), nullable=False, comment='測試日期 YYYYMMDD')
+    passed = Column(Boolean, nullable=False, comment='是否所有頻帶都在上下限內')
+    worst_margin = Column(Float, nullable=False, comment='最小餘裕（負值為超出界線）')
+    worst_frequency = Column(Integer, comment='最小餘裕所在頻率')
+    failed_bands = Column(Integer, nullable=False, default=0, comment='超出界線的頻帶數')
+    evaluated_at = Column(DateTime, default=datetime.utcnow, comment='判定時間')
+    
+    __table_args__ = (
+        Index('idx_limit_result_status_date', 'passed', 'test_date'),
+    )
+    
+    def __repr__(self):
+        return f"<LimitResult(record_id={self.record_id}, passed={self.passed}, margin={self.worst_margin})>"
+    
+    def to_dict(self):
+        """轉換為字典格式"""
+        return {
+            'record_id': self.record_id,
+            'curve_id': self.curve_id,
+            'sn': self.sn,
+            'fixture': self.fixture,
+            'test_type': self.test_type,
+            'test_date': self.test_date,
+            'passed': self.passed,
+            'worst_margin': self.worst_margin,
+            'worst_frequency': self.worst_frequency,
+            'failed_bands': self.failed_bands,
+            'evaluated_at': self.evaluated_at.isoformat() if self.evaluated_at else None
         }
 
 class ImportLog(Base):
@@ -94,17 +301,41 @@ class ImportLog(Base):
     filename = Column(String(255), nullable=False, comment='匯入的檔案名稱')
     fixture = Column(String(20), nullable=True, comment='批次匯入的治具類型')  # 新增治具紀錄
     file_size = Column(Integer, comment='檔案大小（bytes）')
+    file_hash = Column(String(64), index=True, comment='檔案內容 SHA-256，用於避免重複匯入')
     total_rows = Column(Integer, comment='CSV 總行數')
     successful_imports = Column(Integer, default=0, comment='成功匯入筆數')
     failed_imports = Column(Integer, default=0, comment='失敗筆數')
     duplicate_skips = Column(Integer, default=0, comment='重複跳過筆數')
-    import_status = Column(String(20), default='processing', comment='匯入狀態：processing/completed/failed')
+    import_status = Column(String(20), default='processing', comment='匯入狀態：queued/processing/completed/failed')
     error_message = Column(String(1000), comment='錯誤訊息')
     import_time = Column(DateTime, default=datetime.utcnow, comment='匯入開始時間')
     completed_time = Column(DateTime, comment='匯入完成時間')
     
+    # 效能統計（匯入完成時寫入）
+    bytes_read = Column(BigInteger, comment='讀取的位元組數')
+    processing_seconds = Column(Float, comment='處理時間（秒，不含排隊）')
+    rows_per_second = Column(Float, comment='每秒處理行數')
+    read_csv_seconds = Column(Float, comment='讀取 CSV 耗時（秒）')
+    filename_parse_seconds = Column(Float, comment='檔名解析與日期時間驗證耗時（秒，含於 parse）')
+    parse_seconds = Column(Float, comment='解析耗時（秒）')
+    validate_seconds = Column(Float, comment='數據驗證耗時（秒）')
+    dedup_seconds = Column(Float, comment='既有記錄查詢耗時（秒）')
+    insert_seconds = Column(Float, comment='寫入耗時（秒）')
+    
+    # 記錄耗時的匯入階段（對應 {階段}_seconds 欄位）
+    PERFORMANCE_STAGES = ('read_csv', 'filename_parse', 'parse', 'validate', 'dedup', 'insert')
+    
     def __repr__(self):
         return f"<ImportLog(filename='{self.filename}', fixture='{self.fixture}', status='{self.import_status}')>"
+    
+    def get_performance(self):
+        """效能統計（尚未完成或舊版記錄各值為 None）"""
+        return {
+            'bytes_read': self.bytes_read,
+            'processing_seconds': self.processing_seconds,
+            'rows_per_second': self.rows_per_second,
+            'stages': {stage: getattr(self, f'{stage}_seconds') for stage in self.PERFORMANCE_STAGES}
+        }
 
 class DatabaseManager:
     """
@@ -114,7 +345,19 @@ class DatabaseManager:
     
     _instance = None
     _engine = None
+    _read_engine = None
     _SessionLocal = None
+    _ReadSessionLocal = None
+    pool_metrics = {}
+    
+    # 已由其他索引取代、升級時移除的舊索引 {資料表: [索引名稱]}
+    OBSOLETE_INDEXES = {
+        'test_records': ['idx_import_time'],  # 由 idx_import_time_id 取代
+    }
+    
+    # 舊版長格式量測值表（已改存於 test_records.measurement_data，升級時搬移後刪除）
+    LEGACY_MEASUREMENT_TABLE = 'test_measurements'
+    MIGRATION_CHUNK_SIZE = 5000
     
     def __new__(cls):
         if cls._instance is None:
@@ -125,6 +368,8 @@ class DatabaseManager:
         if not hasattr(self, 'initialized'):
             self.initialized = True
             self.database_url = self._get_database_url()
+            self.read_database_url = Config.DATABASE_READ_URL or None
+            self._last_write_time = None
             self._setup_database()
     
     def _get_database_url(self):
@@ -139,22 +384,241 @@ class DatabaseManager:
         return 'sqlite:///data/test_records.db'
     
     def _setup_database(self):
-        """設定資料庫連接和會話"""
-        self._engine = create_engine(
-            self.database_url,
-            echo=False,  # 生產環境設為 False
-            pool_pre_ping=True,  # 自動檢測連接有效性
-            connect_args={'check_same_thread': False} if 'sqlite' in self.database_url else {}
-        )
+        """
+        設定資料庫連接和會話
+        設定 DATABASE_READ_URL 時，唯讀查詢（get_read_session）改連副本資料庫，匯入與刪除仍使用主庫
+        SQLite 檔案資料庫啟用效能設定（Config.SQLITE_TUNING）：每個連線套用 WAL 等 PRAGMA，
+        寫入引擎只有一個連線（寫入依序進行，等待連線而非遇到 database is locked），
+        讀取另用連線池，WAL 模式下匯入進行中仍可查詢
+        """
+        is_sqlite = self.database_url.startswith('sqlite')
+        in_memory = is_sqlite and (':memory:' in self.database_url or self.database_url.rstrip('/') == 'sqlite:')
+        
+        if in_memory:
+            # 記憶體資料庫只存在於單一連線，讀寫共用
+            self._engine = create_engine(
+                self.database_url,
+                echo=False,
+                connect_args={'check_same_thread': False},
+                poolclass=StaticPool
+            )
+            self._read_engine = self._engine
+        elif is_sqlite and Config.SQLITE_TUNING:
+            connect_args = {'check_same_thread': False, 'timeout': Config.SQLITE_BUSY_TIMEOUT / 1000}
+            self._engine = create_engine(
+                self.database_url,
+                echo=False,
+                connect_args=connect_args,
+                **self._pool_options(1, 0, Config.SQLITE_WRITE_WAIT_TIMEOUT)
+            )
+            self._read_engine = create_engine(
+                self.database_url,
+                echo=False,
+                connect_args=connect_args,
+                **self._pool_options(Config.SQLITE_READ_POOL_SIZE, 0, Config.SQLITE_WRITE_WAIT_TIMEOUT)
+            )
+            event.listen(self._engine, 'connect', self._apply_sqlite_pragmas)
+            event.listen(self._read_engine, 'connect', self._apply_sqlite_pragmas)
+        else:
+            self._engine = create_engine(
+                self.database_url,
+                echo=False,  # 生產環境設為 False
+                connect_args={'check_same_thread': False} if is_sqlite else {},
+                **self._pool_options(Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW)
+            )
+            self._read_engine = self._create_replica_engine() if self.read_database_url else self._engine
+        
+        # 記錄主庫最後一次提交的時間，供副本延遲期間的唯讀查詢改用主庫
+        event.listen(self._engine, 'commit', self._on_primary_commit)
+        
+        self.pool_metrics = {'write': PoolMetrics('write').attach(self._engine)}
+        if self._read_engine is not self._engine:
+            self.pool_metrics['read'] = PoolMetrics('read').attach(self._read_engine)
         
         self._SessionLocal = sessionmaker(
             autocommit=False,
             autoflush=False,
             bind=self._engine
         )
+        self._ReadSessionLocal = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=self._read_engine
+        )
         
         # 創建資料表
         Base.metadata.create_all(bind=self._engine)
+        self.upgrade_schema()
+    
+    @staticmethod
+    def _pool_options(pool_size: int, max_overflow: int, timeout=None) -> dict:
+        """
+        連線池設定（Config.DB_POOL_*）
+        預設不做 pre-ping（每次取用省一次來回），改以 pool_recycle 定期更換連線，失效次數可由連線池指標觀察
+        """
+        return {
+            'poolclass': TimedQueuePool,
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_timeout': Config.DB_POOL_TIMEOUT if timeout is None else timeout,
+            'pool_recycle': Config.DB_POOL_RECYCLE,
+            'pool_pre_ping': Config.DB_POOL_PRE_PING
+        }
+    
+    def _create_replica_engine(self):
+        """
+        建立唯讀副本（DATABASE_READ_URL，例如 PostgreSQL streaming replica）的引擎
+        連線池大小獨立設定，分析查詢不與匯入爭用主庫連線；PostgreSQL 交易設為唯讀，誤寫入時直接報錯
+        """
+        execution_options = {}
+        if self.read_database_url.startswith('postgresql'):
+            execution_options['postgresql_readonly'] = True
+        
+        engine = create_engine(
+            self.read_database_url,
+            echo=False,
+            execution_options=execution_options,
+            **self._pool_options(Config.READ_POOL_SIZE, Config.READ_MAX_OVERFLOW)
+        )
+        logger.info(f"唯讀查詢使用副本資料庫：{engine.url.render_as_string(hide_password=True)}")
+        return engine
+    
+    def _on_primary_commit(self, connection):
+        self._last_write_time = time.monotonic()
+    
+    def _replica_may_lag(self) -> bool:
+        """本行程於 Config.READ_AFTER_WRITE_SECONDS 內曾在主庫提交交易（副本可能尚未同步）"""
+        if self._last_write_time is None:
+            return False
+        return time.monotonic() - self._last_write_time < Config.READ_AFTER_WRITE_SECONDS
+    
+    @staticmethod
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        """每個新建立的 SQLite 連線套用效能相關 PRAGMA（journal_mode 為資料庫層級，其餘為連線層級）"""
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f'PRAGMA journal_mode={Config.SQLITE_JOURNAL_MODE}')
+            cursor.execute(f'PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}')
+            cursor.execute(f'PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT)}')
+            cursor.execute(f'PRAGMA cache_size={int(Config.SQLITE_CACHE_SIZE)}')
+            cursor.execute(f'PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}')
+            cursor.execute(f'PRAGMA temp_store={Config.SQLITE_TEMP_STORE}')
+        finally:
+            cursor.close()
+    
+    def upgrade_schema(self):
+        """
+        補齊既有資料表缺少的欄位與索引
+        create_all 只會建立不存在的資料表，模型新增的可為空欄位與索引在此補上
+        結構查詢一律透過交易中的連線（SQLite 效能設定下寫入引擎只有一個連線，另取連線會等到逾時）
+        """
+        with self._engine.begin() as connection:
+            inspector = inspect(connection)
+            existing_tables = set(inspector.get_table_names())
+            for table in Base.metadata.sorted_tables:
+                if table.name not in existing_tables:
+                    continue
+                
+                existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing_columns:
+                        continue
+                    column_type = column.type.compile(dialect=self._engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    logger.info(f"資料表 {table.name} 新增欄位：{column.name}")
+                
+                existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in existing_indexes:
+                        index.create(bind=connection)
+                        logger.info(f"資料表 {table.name} 新增索引：{index.name}")
+                
+                for index_name in self.OBSOLETE_INDEXES.get(table.name, []):
+                    if index_name in existing_indexes:
+                        connection.execute(text(f'DROP INDEX {index_name}'))
+                        logger.info(f"資料表 {table.name} 移除舊索引：{index_name}")
+        
+        self.migrate_measurements()
+    
+    def migrate_measurements(self) -> int:
+        """
+        將舊版的量測值編碼至 test_records.measurement_data：
+        freq_XXX 寬欄位（完成後移除；不支援 DROP COLUMN 的 SQLite 版本改為清空）與
+        長格式 test_measurements 表（完成後刪除）。依記錄 ID 分塊讀取與回寫，全部在同一交易中完成。
+        新格式只保存 7 位有效數字（見 measurement_codec），被捨入的量測值筆數與最大誤差記錄為警告
+        
+        Returns:
+            int: 搬移的量測值筆數
+        """
+        can_drop = self._engine.dialect.name != 'sqlite' or sqlite3.sqlite_version_info >= (3, 35, 0)
+        migrated = 0
+        rounded, max_error = 0, 0.0
+        
+        with self._engine.begin() as connection:
+            inspector = inspect(connection)
+            tables = set(inspector.get_table_names())
+            if 'test_records' not in tables:
+                return 0
+            
+            has_long_table = self.LEGACY_MEASUREMENT_TABLE in tables
+            wide_columns = [column['name'] for column in inspector.get_columns('test_records')
+                            if re.fullmatch(r'freq_\d+', column['name'])]
+            if wide_columns and not can_drop and connection.execute(text(
+                    f"SELECT 1 FROM test_records WHERE {' OR '.join(f'{column} IS NOT NULL' for column in wide_columns)} "
+                    f"LIMIT 1")).first() is None:
+                wide_columns = []  # 先前已搬移並清空
+            if not wide_columns and not has_long_table:
+                return 0
+            
+            select_records = text(
+                f"SELECT {', '.join(['id'] + wide_columns)} FROM test_records "
+                f"WHERE id > :last_id ORDER BY id LIMIT {self.MIGRATION_CHUNK_SIZE}"
+            )
+            select_measurements = text(
+                f"SELECT record_id, frequency, value FROM {self.LEGACY_MEASUREMENT_TABLE} "
+                f"WHERE record_id > :first_id AND record_id <= :last_id"
+            )
+            update_record = text('UPDATE test_records SET measurement_data = :data WHERE id = :record_id')
+            
+            last_id = 0
+            while True:
+                rows = connection.execute(select_records, {'last_id': last_id}).all()
+                if not rows:
+                    break
+                
+                frequency_data = {
+                    row[0]: {int(column[5:]): value for column, value in zip(wide_columns, row[1:])
+                             if value is not None}
+                    for row in rows
+                }
+                if has_long_table:
+                    for record_id, frequency, value in connection.execute(
+                            select_measurements, {'first_id': last_id, 'last_id': rows[-1][0]}):
+                        if record_id in frequency_data and value is not None:
+                            frequency_data[record_id][int(frequency)] = value
+                
+                updates = [{'record_id': record_id, 'data': pack_measurements(values)}
+                           for record_id, values in frequency_data.items() if values]
+                if updates:
+                    connection.execute(update_record, updates)
+                    errors = rounding_errors([value for values in frequency_data.values() for value in values.values()])
+                    rounded += int(np.count_nonzero(errors))
+                    max_error = max(max_error, float(errors.max()))
+                migrated += sum(len(values) for values in frequency_data.values())
+                last_id = rows[-1][0]
+            
+            for column in wide_columns:
+                if can_drop:
+                    connection.execute(text(f'ALTER TABLE test_records DROP COLUMN {column}'))
+                else:
+                    connection.execute(text(f'UPDATE test_records SET {column} = NULL'))
+            if has_long_table:
+                connection.execute(text(f'DROP TABLE {self.LEGACY_MEASUREMENT_TABLE}'))
+        
+        logger.info(f"已將 {migrated} 筆量測值編碼至 test_records.measurement_data")
+        if rounded:
+            logger.warning(f"{rounded} 筆量測值超過 {VALUE_DIGITS} 位有效數字，搬移後已捨入（最大誤差 {max_error:.3g}）")
+        return migrated
     
     def get_session(self):
         """獲取資料庫會話"""
@@ -162,12 +626,37 @@ class DatabaseManager:
             raise Exception("資料庫未初始化")
         return self._SessionLocal()
     
+    def get_read_session(self, fresh: bool = False):
+        """
+        獲取唯讀查詢用的資料庫會話
+        SQLite 效能設定下使用讀取連線池；設定 DATABASE_READ_URL 時連至副本資料庫（可能略晚於主庫），
+        本行程剛寫入主庫時（Config.READ_AFTER_WRITE_SECONDS 內）改用主庫，寫入後重新計算的統計不會讀到舊資料
+        
+        Args:
+            fresh: 必須讀到主庫最新提交的資料（例如寫入後刷新快照），有副本時一律改用主庫
+        """
+        if self._ReadSessionLocal is None:
+            raise Exception("資料庫未初始化")
+        if self.read_database_url and (fresh or self._replica_may_lag()):
+            return self._SessionLocal()
+        return self._ReadSessionLocal()
+    
+    def get_pool_stats(self) -> dict:
+        """各連線池的取用、等待、溢出與失效指標 {'write': ..., 'read': ...}"""
+        return {name: metrics.get_stats() for name, metrics in self.pool_metrics.items()}
+    
     def get_engine(self):
         """獲取資料庫引擎"""
         return self._engine
     
+    def get_read_engine(self):
+        """獲取唯讀查詢用的資料庫引擎"""
+        return self._read_engine
+    
     def close(self):
         """關閉資料庫連接"""
+        if self._read_engine is not None and self._read_engine is not self._engine:
+            self._read_engine.dispose()
         if self._engine:
             self._engine.dispose()
 
@@ -189,6 +678,7 @@ def init_database():
     """初始化資料庫（創建表格）"""
     try:
         Base.metadata.create_all(bind=db_manager.get_engine())
+        db_manager.upgrade_schema()
         print("資料庫初始化完成")
         return True
     except Exception as e:
@@ -209,7 +699,7 @@ if __name__ == "__main__":
             test_time="120000",
             test_type="left",
             fixture="治具1",  # 新增治具測試
-            freq_1000=-75.5,
+            measurement_data=pack_measurements({1000: -75.5}),
             filename="test_file.csv"
         )
         
@@ -219,7 +709,7 @@ if __name__ == "__main__":
         
         # 測試查詢
         records = session.query(TestRecord).filter_by(sn="TEST123456789").all()
-        print(f"查詢到 {len(records)} 筆記錄")
+        print(f"查詢到 {len(records)} 筆記錄，量測值：{records[0].get_frequency_data()}")
         
     except Exception as e:
         print(f"資料庫操作錯誤: {str(e)}")
@@ -0,0 +1,131 @@
+"""
+平行解析模組
+專案：CSV 數據分析與管理系統
+負責：以多行程平行解析大型 CSV 或多個 CSV 檔案
+"""
+
+import multiprocessing
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Optional, Iterator
+
+import pandas as pd
+
+from csv_parser import CSVDataParser, DataValidator, ParsedRecord
+from instrumentation import stage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _parse_chunk(df: pd.DataFrame, filename_col: str,
+                 frequency_columns: Dict[str, str]) -> Tuple[Dict, Dict]:
+    """
+    Worker 行程：解析並驗證單一分塊
+    回傳欄式結果（numpy 陣列與錯誤訊息），不回傳 ParsedRecord 物件，
+    減少行程間序列化的資料量；記錄由寫入端以 CSVDataParser.build_records 組裝
+
+    Returns:
+        Tuple[Dict, Dict]: (已驗證的欄式解析結果, 分塊解析統計)
+    """
+    parser = CSVDataParser()
+    with stage('parse', parser.stats['timings']):
+        columns = parser._parse_columns(df, filename_col, frequency_columns)
+    with stage('validate', parser.stats['timings']):
+        DataValidator.validate_columns(columns)
+    return columns, parser.stats
+
+class ParallelCSVParser:
+    """
+    平行 CSV 解析器
+    主行程分塊讀取 CSV，分塊交由 ProcessPoolExecutor 執行 FilenameParser / CSVDataParser /
+    DataValidator，再依原始順序產出結果給單一寫入端；輸出與 CSVDataParser 串流解析相同
+    """
+
+    # 共用行程池，依 (worker 數, 啟動方式) 分別建立；不因其他解析器要求不同大小而關閉，
+    # 匯入佇列與目錄監看等執行緒可能仍在使用既有的行程池
+    _executors: Dict[Tuple[int, str], ProcessPoolExecutor] = {}
+    _executor_lock = threading.Lock()
+
+    def __init__(self, workers: int, chunk_size: Optional[int] = None, start_method: str = 'spawn'):
+        self.workers = workers
+        self.chunk_size = chunk_size or CSVDataParser.DEFAULT_CHUNK_SIZE
+        self.start_method = start_method
+        self.stats = CSVDataParser().stats
+        self.file_stats = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """取得共用的行程池（跨匯入重複使用，避免每次啟動 worker 的成本）"""
+        cls = ParallelCSVParser
+        key = (self.workers, self.start_method)
+        with cls._executor_lock:
+            executor = cls._executors.get(key)
+            if executor is None:
+                executor = cls._executors[key] = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method)
+                )
+            return executor
+
+    def iter_parse_csv_file(self, file_path: str, encoding: str = 'utf-8',
+                            chunk_size: Optional[int] = None) -> Iterator[List[ParsedRecord]]:
+        """
+        平行串流解析單一 CSV 檔案（介面同 CSVDataParser.iter_parse_csv_file）
+
+        Yields:
+            List[ParsedRecord]: 依檔案順序產出的分塊解析記錄
+        """
+        for _, records in self.iter_parse_csv_files([(file_path, encoding)], chunk_size):
+            if records is not None:
+                yield records
+
+    def iter_parse_csv_files(self, files: List[Tuple[str, str]],
+                             chunk_size: Optional[int] = None) -> Iterator[Tuple[int, Optional[List[ParsedRecord]]]]:
+        """
+        平行解析多個 CSV 檔案
+        同時處理中的分塊數上限為 worker 數的兩倍，記憶體用量有界
+
+        Args:
+            files: [(檔案路徑, 編碼)]
+            chunk_size: 每個分塊的行數
+
+        Yields:
+            Tuple[int, Optional[List[ParsedRecord]]]: (檔案索引, 分塊解析記錄)；
+            每個檔案結束時產出 (檔案索引, None)，此時 self.file_stats[檔案索引] 為該檔案的完整統計
+        """
+        chunk_size = chunk_size or self.chunk_size
+        executor = self._get_executor()
+        max_in_flight = self.workers * 2
+        in_flight = deque()
+        readers = {}
+        self.file_stats = {}
+
+        def _collect():
+            file_index, future = in_flight.popleft()
+            if future is None:
+                return file_index, None
+            columns, chunk_stats = future.result()
+            reader = readers[file_index]
+            reader.merge_statistics(chunk_stats)
+            with stage('parse', reader.stats['timings']):
+                records = CSVDataParser.build_records(columns)
+            return file_index, records
+
+        for file_index, (file_path, encoding) in enumerate(files):
+            # 每個檔案使用獨立的讀取器與統計
+            reader = CSVDataParser()
+            readers[file_index] = reader
+            self.file_stats[file_index] = reader.stats
+            self.stats = reader.stats
+
+            for df, filename_col, frequency_columns in reader.iter_csv_chunks(file_path, encoding, chunk_size):
+                in_flight.append((file_index, executor.submit(_parse_chunk, df, filename_col, frequency_columns)))
+                while len(in_flight) >= max_in_flight:
+                    yield _collect()
+
+            # 檔案結束標記
+            in_flight.append((file_index, None))
+
+        while in_flight:
+            yield _collect()
@@ -0,0 +1,140 @@
+"""
+連線池指標模組
+專案：CSV 數據分析與管理系統
+負責：以連線池事件統計取用次數、等待時間、溢出連線與失效連線，作為調整連線池大小的依據
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PoolMetrics:
+    """
+    單一連線池的指標
+    計數由連線池事件（connect / checkout / checkin / invalidate / soft_invalidate）累加；
+    等待時間由 TimedQueuePool 於取得連線時量測，連線池目前狀態於查詢時讀取
+    """
+
+    # 等待超過此秒數的取用另外計數
+    SLOW_WAIT_SECONDS = 0.1
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._pool = None
+        self.stats = {
+            'connects': 0, 'checkouts': 0, 'checkins': 0,
+            'invalidations': 0, 'soft_invalidations': 0,
+            'waits': 0, 'slow_waits': 0, 'timeouts': 0,
+            'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0,
+            'overflow_max': 0, 'checked_out_max': 0
+        }
+
+    def attach(self, engine):
+        """於引擎的連線池註冊事件；QueuePool 另量測取得連線的等待時間"""
+        pool = engine.pool
+        self._pool = pool
+        if isinstance(pool, TimedQueuePool):
+            pool.metrics = self
+
+        event.listen(pool, 'connect', self._on_connect)
+        event.listen(pool, 'checkout', self._on_checkout)
+        event.listen(pool, 'checkin', self._on_checkin)
+        event.listen(pool, 'invalidate', self._on_invalidate)
+        event.listen(pool, 'soft_invalidate', self._on_soft_invalidate)
+        return self
+
+    def _increment(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self._increment('connects')
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        pool = self._pool
+        with self._lock:
+            self.stats['checkouts'] += 1
+            if isinstance(pool, QueuePool):
+                self.stats['checked_out_max'] = max(self.stats['checked_out_max'], pool.checkedout())
+                self.stats['overflow_max'] = max(self.stats['overflow_max'], pool.overflow())
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self._increment('checkins')
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self._increment('invalidations')
+        if exception is not None:
+            logger.warning(f"連線池 {self.name} 連線失效：{exception}")
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        self._increment('soft_invalidations')
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        """記錄一次取得連線的等待時間"""
+        with self._lock:
+            self.stats['waits'] += 1
+            self.stats['wait_seconds_total'] += seconds
+            self.stats['wait_seconds_max'] = max(self.stats['wait_seconds_max'], seconds)
+            if seconds >= self.SLOW_WAIT_SECONDS:
+                self.stats['slow_waits'] += 1
+            if timed_out:
+                self.stats['timeouts'] += 1
+
+    def get_stats(self) -> Dict:
+        """累計指標與連線池目前狀態"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['wait_seconds_avg'] = stats['wait_seconds_total'] / stats['waits'] if stats['waits'] else 0.0
+
+        pool = self._pool
+        stats['pool_class'] = type(pool).__name__ if pool is not None else None
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout()
+            })
+        return stats
+
+    def reset(self):
+        """清除累計指標"""
+        with self._lock:
+            for key, value in self.stats.items():
+                self.stats[key] = type(value)()
+
+class TimedQueuePool(QueuePool):
+    """量測取得連線等待時間的 QueuePool（連線池沒有「開始取用」事件，只能在此量測）"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() 會以 recreate 建立新的連線池，事件會複製，指標需另外帶過去
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics._pool = pool
+        return pool
@@ -0,0 +1,194 @@
+"""
+母體統計模組
+專案：CSV 數據分析與管理系統
+負責：以 NumPy 矩陣（每列一筆記錄、每欄一個頻帶，無值為 NaN）向量化計算母體統計、離群值與規格界線判定
+"""
+
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from measurement_codec import unpack_measurements
+
+# 常態分布下 MAD 與標準差的換算係數（robust z = 0.6745 * (x - median) / MAD）
+MAD_SCALE = 0.6745
+
+OUTLIER_METHODS = ('zscore', 'mad')
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+def pivot_measurements(blobs: Sequence[Optional[bytes]], bands: List[str],
+                       out: Optional[np.ndarray] = None, row_offset: int = 0) -> np.ndarray:
+    """
+    將記錄的量測值（test_records.measurement_data）放入寬矩陣
+
+    Args:
+        blobs: 各記錄的 measurement_data，第 i 筆放入矩陣第 row_offset + i 列
+        bands: 頻帶（矩陣欄順序）
+        out: 填入既有矩陣（分批讀取記錄時逐批填入）
+        row_offset: 本批記錄在矩陣中的起始列
+
+    Returns:
+        np.ndarray: (記錄數, 頻帶數) 矩陣；不在 bands 中的量測值忽略
+    """
+    matrix = np.full((len(blobs), len(bands)), np.nan) if out is None else out
+    rows, frequencies, values = unpack_measurements(blobs)
+    if not len(values) or not len(bands):
+        return matrix
+
+    band_values = np.asarray(bands, dtype=np.int64)
+    band_order = np.argsort(band_values)
+    sorted_bands = band_values[band_order]
+    positions = np.minimum(np.searchsorted(sorted_bands, frequencies), len(band_values) - 1)
+
+    valid = sorted_bands[positions] == frequencies
+    matrix[rows[valid] + row_offset, band_order[positions[valid]]] = values[valid]
+    return matrix
+
+def band_statistics(values: np.ndarray, percentiles: Sequence[int] = PERCENTILES) -> Dict[str, np.ndarray]:
+    """
+    各頻帶（欄）統計：count、mean、std（母體）、min、max、median、mad 與 p{N} 百分位數；
+    無值的頻帶統計值為 NaN。
+    逐頻帶取出去除 NaN 後的連續陣列計算（百分位數與中位數共用一次 partition），不使用 nan 系列函數的整體複本
+    """
+    levels = sorted(set(percentiles) | {50})
+    band_count = values.shape[1]
+    stats = {name: np.full(band_count, np.nan) for name in ['mean', 'std', 'min', 'max', 'median', 'mad']}
+    quantiles = np.full((len(levels), band_count), np.nan)
+    stats['count'] = np.zeros(band_count, dtype=np.int64)
+
+    for index in range(band_count):
+        column = values[:, index]
+        column = column[~np.isnan(column)]
+        if not len(column):
+            continue
+        mean = column.mean()
+        quantiles[:, index] = np.percentile(column, levels)
+        median = quantiles[levels.index(50), index]
+        stats['count'][index] = len(column)
+        stats['mean'][index] = mean
+        stats['std'][index] = np.sqrt(np.mean(np.square(column - mean)))
+        stats['min'][index] = column.min()
+        stats['max'][index] = column.max()
+        stats['median'][index] = median
+        stats['mad'][index] = np.median(np.abs(column - median))
+
+    stats.update({f'p{percentile}': quantiles[levels.index(percentile)] for percentile in percentiles})
+    return stats
+
+def outlier_scores(values: np.ndarray, stats: Dict[str, np.ndarray], method: str = 'zscore') -> np.ndarray:
+    """
+    每個量測值的離群分數（絕對值）
+    zscore：|x - mean| / std；mad：0.6745 * |x - median| / MAD。
+    分散度為 0 的頻帶分數為 0，無值為 NaN
+    """
+    if method == 'mad':
+        center, spread = stats['median'], stats['mad'] / MAD_SCALE
+    else:
+        center, spread = stats['mean'], stats['std']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.abs(values - center) / spread
+    scores[:, ~(spread > 0)] = 0.0
+    scores[np.isnan(values)] = np.nan
+    return scores
+
+def limit_margins(values: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """
+    每個量測值與規格界線的餘裕（min(x - lower, upper - x)，負值為超出界線）；
+    未設界線或無值時為 NaN
+    """
+    margins = np.full(values.shape, np.nan)
+    limited = ~(np.isnan(lower) & np.isnan(upper))
+    margins[:, limited] = np.fmin(values[:, limited] - lower[limited], upper[limited] - values[:, limited])
+    return margins
+
+def group_codes(keys: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    將分組鍵值（如 SN）編碼為整數
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (每列的分組編號, 各編號對應的鍵值)
+    """
+    codes, uniques = pd.factorize(np.asarray(keys, dtype=object))
+    return codes, np.asarray(uniques, dtype=object)
+
+def nan_reduce(function, values: np.ndarray, axis: int) -> np.ndarray:
+    """以 np.nanmin / np.nanmax 等沿指定軸歸約；全為 NaN 或長度為 0 時結果為 NaN（不產生警告）"""
+    if not values.shape[axis]:
+        return np.full(values.shape[1 - axis], np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return function(values, axis=axis)
+
+def group_reduce(function: np.ufunc, codes: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """
+    依分組編號歸約（function 為 np.maximum / np.minimum），NaN 忽略，沒有值的組為 NaN
+    """
+    identity = -np.inf if function is np.maximum else np.inf
+    result = np.full(size, identity)
+    mask = ~np.isnan(values)
+    function.at(result, codes[mask], values[mask])
+    result[result == identity] = np.nan
+    return result
+
+def group_statistics(codes: np.ndarray, values: np.ndarray, size: int) -> Dict[str, np.ndarray]:
+    """
+    依分組編號計算 count、sum、sum_squares、mean、std（母體）、min、max；沒有值的組 count 為 0、其餘為 NaN
+    標準差先求各組平均再計算離差平方，不使用 E[x²] - E[x]²（平均值遠大於離散程度時相減會失去精度）
+    """
+    count = np.bincount(codes, minlength=size)
+    total = np.bincount(codes, weights=values, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.bincount(codes, weights=np.square(values - mean[codes]), minlength=size) / count
+    return {
+        'count': count,
+        'sum': total,
+        'sum_squares': np.bincount(codes, weights=np.square(values), minlength=size),
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'min': group_reduce(np.minimum, codes, values, size),
+        'max': group_reduce(np.maximum, codes, values, size)
+    }
+
+def group_measurements(record_keys: List[Sequence], positions: np.ndarray, frequencies: np.ndarray,
+                       values: np.ndarray) -> Tuple[List[Tuple], Dict[str, np.ndarray]]:
+    """
+    量測值依（記錄的分組欄位..., 頻率）分組統計
+
+    Args:
+        record_keys: 分組欄位，每個欄位為長度等於記錄數的序列（如 [各記錄 SN, 各記錄治具]）
+        positions / frequencies / values: measurement_codec.unpack_measurements 的結果（可先篩選）
+
+    Returns:
+        Tuple[List[Tuple], Dict[str, np.ndarray]]: (各組鍵值 (欄位值..., 頻率), group_statistics 結果)
+    """
+    if not len(values):
+        return [], group_statistics(np.empty(0, dtype=np.int64), values, 0)
+
+    # 各欄位編碼後以混合進位組合為單一整數
+    columns = [group_codes(keys) for keys in record_keys]
+    band_values, band_codes = np.unique(frequencies, return_inverse=True)
+    combined = np.zeros(len(values), dtype=np.int64)
+    for codes, uniques in columns:
+        combined = combined * len(uniques) + codes[positions]
+    combined = combined * len(band_values) + band_codes
+
+    groups, codes = np.unique(combined, return_inverse=True)
+    stats = group_statistics(codes, values, len(groups))
+
+    keys = []
+    for group in groups.tolist():
+        group, band = divmod(group, len(band_values))
+        key = [int(band_values[band])]
+        for _, uniques in reversed(columns):
+            group, code = divmod(group, len(uniques))
+            key.append(uniques[code])
+        keys.append(tuple(reversed(key)))
+    return keys, stats
+
+def to_list(values: np.ndarray) -> List[Optional[float]]:
+    """轉為 JSON 可序列化的列表（NaN 轉為 None）"""
+    return [None if np.isnan(value) else float(value) for value in values]
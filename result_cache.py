@@ -0,0 +1,137 @@
+"""
+查詢結果快取模組
+專案：CSV 數據分析與管理系統
+負責：統計查詢結果的 TTL 快取（LRU 上限）、匯入後失效、同一鍵值同時只計算一次
+"""
+
+import copy
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """
+    TTL 結果快取
+    快取僅存在於本行程；匯入寫入資料後由 DatabaseService 呼叫 invalidate()，
+    多行程部署時其他行程的快取則於 TTL 到期後更新。
+    鍵值可能來自請求參數（例如搜尋條件），因此讀寫時移除過期項目，並以 LRU 限制項目數；
+    單一計算用的鍵值鎖在最後一個等待者結束後移除
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = Config.STATS_CACHE_TTL if ttl is None else ttl
+        self.max_entries = Config.STATS_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        # 依最近使用順序排列（最舊在前）
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        # 鍵值 -> [鎖, 使用中的請求數]
+        self._key_locks: Dict[Hashable, List] = {}
+        self._generation = 0
+
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        取得快取結果，過期或不存在時呼叫 compute 重新計算
+
+        Args:
+            key: 快取鍵值
+            compute: 計算結果的函數
+            ttl: 此鍵值的存活秒數（預設為快取的 TTL，0 表示不快取）
+
+        Returns:
+            Any: 結果的複本（呼叫端修改不影響快取內容）
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return compute()
+
+        value = self._get(key)
+        if value is not None:
+            return copy.deepcopy(value)
+
+        # 同一鍵值同時只計算一次，其他請求等待結果
+        key_lock = self._acquire_key_lock(key)
+        try:
+            with key_lock:
+                value = self._get(key, count=False)
+                if value is not None:
+                    return copy.deepcopy(value)
+
+                with self._lock:
+                    self.stats['misses'] += 1
+                    generation = self._generation
+
+                value = compute()
+
+                with self._lock:
+                    # 計算期間已失效（例如匯入寫入新資料）的結果不存入快取
+                    if generation == self._generation:
+                        self._store(key, (time.monotonic() + ttl, value))
+
+                return copy.deepcopy(value)
+        finally:
+            self._release_key_lock(key)
+
+    def _get(self, key: Hashable, count: bool = True) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.stats['hits'] += 1
+            return entry[1]
+
+    def _store(self, key: Hashable, entry: Tuple[float, Any]):
+        """存入結果，並移除過期項目與超過上限的最久未使用項目（呼叫端須持有 self._lock）"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        now = time.monotonic()
+        for expired in [expired for expired, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[expired]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _acquire_key_lock(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            holder = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            holder[1] += 1
+            return holder[0]
+
+    def _release_key_lock(self, key: Hashable):
+        with self._lock:
+            holder = self._key_locks[key]
+            holder[1] -= 1
+            if not holder[1]:
+                del self._key_locks[key]
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """使快取失效（未指定鍵值則清除全部）"""
+        with self._lock:
+            self._generation += 1
+            self.stats['invalidations'] += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        """快取命中統計"""
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries, ttl=self.ttl)
+
+# 全域統計快取實例（所有 DatabaseService 實例共用）
+statistics_cache = ResultCache()
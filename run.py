@@ -106,6 +106,123 @@ def main():
         logger.error(f"應用啟動失敗：{e}")
         return False
 
+def import_directory(directory, fixture='治具1', encoding='utf-8', mode=None):
+    """批次匯入伺服器端目錄中的所有 CSV 檔案（含子目錄），mode 為已存在記錄的處理方式"""
+    from data_service import import_service
+    from analytics_snapshot import analytics_snapshot
+    
+    if not os.path.isdir(directory):
+        print(f"❌ 目錄不存在：{directory}")
+        return False
+    
+    files = import_service.find_csv_files(directory, recursive=True)
+    if not files:
+        print(f"⚠️  目錄中沒有 CSV 檔案：{directory}")
+        return False
+    
+    print(f"📂 開始批次匯入 {len(files)} 個檔案（治具：{fixture}）...")
+    success, report = import_service.import_batch(files, fixture, encoding, mode=mode)
+    
+    for file_result in report['files']:
+        mark = '✓' if file_result['success'] else '✗'
+        print(f"  {mark} {file_result['filename']}：{file_result['message']}")
+    
+    print("=" * 60)
+    print(report['message'])
+    
+    # 匯入後排程的快照刷新在背景執行緒，行程結束前須等待完成
+    if analytics_snapshot.available:
+        print("⏳ 更新分析快照...")
+        analytics_snapshot.ensure_initialized()
+        analytics_snapshot.wait()
+    return success
+
+def watch_directory(directory, fixture='治具1', encoding='utf-8', mode=None):
+    """監看目錄，新增或變更的 CSV 檔案自動匯入（內容已匯入者跳過）"""
+    from directory_watcher import DirectoryWatcher
+    from analytics_snapshot import analytics_snapshot
+    from import_queue import import_queue
+    
+    if not os.path.isdir(directory):
+        print(f"❌ 目錄不存在：{directory}")
+        return False
+    
+    print(f"👀 監看目錄：{directory}（治具：{fixture}），按 Ctrl+C 停止")
+    watcher = DirectoryWatcher(directory, fixture, encoding, mode=mode)
+    watcher.run_forever()
+    
+    # 等待已排入的匯入與其後的快照刷新完成
+    import_queue.shutdown(wait=True)
+    analytics_snapshot.wait()
+    
+    print(f"已排入匯入 {watcher.stats['queued_files']} 個檔案，跳過重複內容 {watcher.stats['skipped_files']} 個檔案")
+    return True
+
+def migrate_measurements():
+    """將舊版 freq_XXX 寬欄位或 test_measurements 表的量測值編碼至記錄，SQLite 另執行 VACUUM 回收空間"""
+    from sqlalchemy import text
+    from models import db_manager
+    
+    # 資料庫初始化時已自動搬移，此處再確認一次
+    migrated = db_manager.migrate_measurements()
+    if migrated:
+        print(f"✓ 搬移量測值 {migrated} 筆")
+    else:
+        print("✓ 沒有需要搬移的舊版量測值")
+    
+    engine = db_manager.get_engine()
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+        print("✓ 已執行 VACUUM")
+    return True
+
+def rebuild_summaries():
+    """自 test_records 重建統計摘要表與 SN 搜尋索引，並列出與重建前不一致的筆數"""
+    from summary_service import summary_service
+    from sn_search import sn_search
+    from result_cache import statistics_cache
+    
+    result = summary_service.rebuild(verify=True)
+    statistics_cache.invalidate()
+    
+    for table in ('sn_summaries', 'sn_frequency_summaries', 'sn_frequency_daily_summaries', 'summary_counts'):
+        print(f"  {table}：{result[table]} 筆，不一致 {result['mismatches'][table]} 筆")
+    
+    sn_search.ensure_initialized()
+    print(f"  sn_lookup：{sn_search.rebuild()} 筆（子字串索引：{sn_search.backend}）")
+    
+    consistent = not any(result['mismatches'].values())
+    print("✓ 摘要表與明細資料一致" if consistent else "⚠️  重建前的摘要表與明細資料不一致，已重建修正")
+    return True
+
+def refresh_snapshot(full=False):
+    """增量刷新 Parquet 分析快照（full 為 True 時全部重建）"""
+    from analytics_snapshot import analytics_snapshot
+    
+    if not analytics_snapshot.available:
+        print("❌ 分析快照無法使用：請安裝 pyarrow 並確認 SNAPSHOT_ENABLED 未設為 false")
+        return False
+    
+    result = analytics_snapshot.refresh(full=full)
+    print(f"✓ 分析快照：{result['partitions']} 個分區，重寫 {result['written']} 個"
+          f"（{result['records']} 筆記錄），移除 {result['removed']} 個")
+    print(f"  位置：{analytics_snapshot.snapshot_dir}")
+    return True
+
+def evaluate_limits(fixture=None, test_type=None):
+    """依黃金曲線重新判定既有記錄"""
+    from limit_service import limit_service
+    
+    curves = limit_service.list_curves()
+    if not curves:
+        print("⚠️  尚未設定任何黃金曲線，請先透過 POST /api/limits/curves 新增")
+        return True
+    
+    result = limit_service.evaluate(fixture, test_type)
+    print(f"✓ 界線判定：{result['evaluated']} 筆記錄，不合格 {result['failed']} 筆（{result['chunks']} 個交易）")
+    return True
+
 # 命令行工具
 if __name__ == "__main__":
     if len(sys.argv) > 1:
@@ -118,12 +235,48 @@ if __name__ == "__main__":
             else:
                 print("✗ 資料庫初始化失敗")
                 
+        elif command == "import-dir":
+            if len(sys.argv) < 3:
+                print("用法：python run.py import-dir <目錄> [治具] [編碼] [skip|overwrite|keep_latest]")
+                sys.exit(1)
+            setup_logging()
+            sys.exit(0 if import_directory(*sys.argv[2:6]) else 1)
+            
+        elif command == "watch":
+            if len(sys.argv) < 3:
+                print("用法：python run.py watch <目錄> [治具] [編碼] [skip|overwrite|keep_latest]")
+                sys.exit(1)
+            setup_logging()
+            sys.exit(0 if watch_directory(*sys.argv[2:6]) else 1)
+                
+        elif command == "migrate-measurements":
+            setup_logging()
+            sys.exit(0 if migrate_measurements() else 1)
+                
+        elif command == "rebuild-summaries":
+            setup_logging()
+            sys.exit(0 if rebuild_summaries() else 1)
+                
+        elif command == "snapshot":
+            setup_logging()
+            sys.exit(0 if refresh_snapshot(len(sys.argv) > 2 and sys.argv[2] == '--full') else 1)
+                
+        elif command == "evaluate-limits":
+            setup_logging()
+            sys.exit(0 if evaluate_limits(*sys.argv[2:4]) else 1)
+                
         elif command == "help":
             print("=== CSV 數據分析系統 - 命令行工具 ===")
             print("用法：python run.py [命令]")
             print("可用命令：")
             print("  (無參數)    啟動 Web 應用")
             print("  init        初始化資料庫")
+            print("  import-dir <目錄> [治具] [編碼] [模式]  批次匯入目錄中的 CSV 檔案（模式：skip/overwrite/keep_latest）")
+            print("  watch <目錄> [治具] [編碼] [模式]       監看目錄並自動匯入新增/變更的 CSV 檔案")
+            print("  migrate-measurements  將舊版量測值（頻率寬欄位/量測值表）編碼至記錄並回收空間")
+            print("  rebuild-summaries     重建統計摘要表與 SN 搜尋索引並驗證增量維護結果")
+            print("  snapshot [--full]     增量刷新 Parquet 分析快照（--full 全部重建）")
+            print("  evaluate-limits [治具] [測試項目]  依黃金曲線重新判定既有記錄")
             print("  help        顯示此幫助訊息")
         else:
             print(f"❌ 未知命令：{command}")
@@ -596,8 +596,8 @@ document.getElementById('searchForm').addEventListener('submit', async function(
 
 def check_python_version():
     """檢查 Python 版本"""
-    if sys.version_info < (3, 8):
-        print("❌ 錯誤：需要 Python 3.8 或更高版本")
+    if sys.version_info < (3, 11):
+        print("❌ 錯誤：需要 Python 3.11 或更高版本")
         print(f"當前版本：{sys.version}")
         return False
     return True
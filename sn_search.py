@@ -0,0 +1,229 @@
+"""
+SN 搜尋模組
+專案：CSV 數據分析與管理系統
+負責：SN 完全相同/開頭相符/包含搜尋，維護 sn_lookup 與子字串搜尋索引
+"""
+
+import logging
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import Table, Column, Integer, String, MetaData, select, insert, delete, func, text, and_, exists
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from config import Config
+from models import TestRecord, SNLookup, SNSummary, UPSERT_DIALECTS, supports_upsert_returning, db_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLite FTS5 trigram 虛擬資料表（external content，內容存於 sn_lookup，不在 ORM metadata 中建立）
+FTS_TABLE_NAME = 'sn_lookup_trigram'
+sn_trigram = Table(
+    FTS_TABLE_NAME, MetaData(),
+    Column('rowid', Integer, primary_key=True),
+    Column('sn', String(50))
+)
+
+SQLITE_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE_NAME} "
+    f"USING fts5(sn, content='sn_lookup', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS sn_lookup_ai AFTER INSERT ON sn_lookup BEGIN "
+    f"INSERT INTO {FTS_TABLE_NAME}(rowid, sn) VALUES (new.id, new.sn); END",
+    f"CREATE TRIGGER IF NOT EXISTS sn_lookup_ad AFTER DELETE ON sn_lookup BEGIN "
+    f"INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, sn) VALUES ('delete', old.id, old.sn); END"
+]
+
+# trigram 索引可查詢的最短字串長度
+FTS_MIN_PATTERN_LENGTH = 3
+
+POSTGRESQL_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_sn_lookup_trgm ON sn_lookup USING gin (sn gin_trgm_ops)"
+]
+
+class SNSearchService:
+    """
+    SN 搜尋服務
+    exact 與 prefix 以 test_records.sn 的 B-tree 索引查詢（prefix 轉為範圍條件）；
+    contains 先在 sn_lookup（每個 SN 一列）的 trigram 索引找出相符 SN，再以 SN 索引取回記錄。
+    資料庫不支援 trigram 索引時改為掃描 sn_lookup，仍遠小於掃描 test_records
+    """
+
+    def __init__(self):
+        self.db_manager = db_manager
+        self.backend = None  # fts5 / pg_trgm / like
+
+    def ensure_initialized(self):
+        """建立子字串搜尋索引；sn_lookup 尚無內容（例如既有資料庫升級）時自 test_records 重建"""
+        if self.backend is not None:
+            return
+
+        engine = self.db_manager.get_engine()
+        self.backend = 'like'
+        created = False
+        try:
+            with engine.begin() as connection:
+                if engine.dialect.name == 'sqlite':
+                    created = FTS_TABLE_NAME not in engine.dialect.get_table_names(connection)
+                    for statement in SQLITE_FTS_DDL:
+                        connection.execute(text(statement))
+                    self.backend = 'fts5'
+                elif engine.dialect.name == 'postgresql':
+                    for statement in POSTGRESQL_TRGM_DDL:
+                        connection.execute(text(statement))
+                    self.backend = 'pg_trgm'
+        except DBAPIError as e:
+            logger.warning(f"無法建立 SN 子字串搜尋索引，改為掃描 sn_lookup：{str(e)}")
+
+        session = self.db_manager.get_session()
+        try:
+            registered = session.query(SNLookup.id).first() is not None
+            has_records = session.query(TestRecord.id).first() is not None
+        finally:
+            session.close()
+
+        if has_records and not registered:
+            logger.info("SN 搜尋索引尚未初始化，開始自 test_records 重建")
+            self.rebuild()
+        elif created and registered:
+            self._rebuild_fts()
+
+    # ==================== 維護 ====================
+
+    def register_sns(self, session: Session, sns: Iterable[str]) -> Set[str]:
+        """
+        於寫入交易內登錄 SN（已存在者忽略），trigram 索引由觸發器或資料庫索引同步更新
+
+        Returns:
+            Set[str]: 本次新登錄的 SN（ON CONFLICT DO NOTHING 的 RETURNING 只含實際插入的列，
+                      併發交易登錄同一 SN 時只有一方會取得）
+        """
+        sns = sorted(set(sns))
+        if not sns:
+            return set()
+
+        bind = session.get_bind()
+        if supports_upsert_returning(bind):
+            result = session.execute(
+                UPSERT_DIALECTS[bind.dialect.name](SNLookup)
+                .on_conflict_do_nothing(index_elements=['sn']).returning(SNLookup.sn),
+                [{'sn': sn} for sn in sns]
+            )
+            return set(result.scalars())
+
+        # 不支援 RETURNING 時先查詢已登錄的 SN（呼叫端已在寫入交易內寫入記錄，SQLite 寫入鎖已取得）
+        existing = set(session.execute(select(SNLookup.sn).where(SNLookup.sn.in_(sns))).scalars())
+        missing = [sn for sn in sns if sn not in existing]
+        if missing:
+            session.execute(insert(SNLookup), [{'sn': sn} for sn in missing])
+        return set(missing)
+
+    @staticmethod
+    def prune_sns(session: Session, sns: Iterable[str]):
+        """於刪除交易內移除已沒有任何記錄的 SN（須在摘要表更新後呼叫）"""
+        sns = sorted(set(sns))
+        if not sns:
+            return
+        session.execute(delete(SNLookup).where(
+            SNLookup.sn.in_(sns),
+            ~exists().where(SNSummary.sn == SNLookup.sn)
+        ))
+
+    def rebuild(self) -> int:
+        """
+        自 test_records 重建 sn_lookup 與 trigram 索引
+
+        Returns:
+            int: 登錄的 SN 數
+        """
+        session = self.db_manager.get_session()
+        try:
+            session.execute(delete(SNLookup))
+            session.execute(insert(SNLookup).from_select(
+                ['sn'], select(TestRecord.sn).distinct().order_by(TestRecord.sn)
+            ))
+            count = session.query(func.count(SNLookup.id)).scalar()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        self._rebuild_fts()
+        logger.info(f"SN 搜尋索引重建完成：{count} 個 SN")
+        return count
+
+    def _rebuild_fts(self):
+        """依 sn_lookup 內容重建 FTS5 索引"""
+        if self.backend != 'fts5':
+            return
+        with self.db_manager.get_engine().begin() as connection:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}) VALUES ('rebuild')"))
+
+    # ==================== 查詢 ====================
+
+    def build_filter(self, sn: str, match: Optional[str] = None):
+        """
+        建立 test_records.sn 的過濾條件
+
+        Args:
+            sn: 搜尋字串
+            match: exact / prefix / contains（預設 Config.SN_MATCH_MODE）
+
+        Returns:
+            SQL 條件運算式
+        """
+        match = match or Config.SN_MATCH_MODE
+        if match not in Config.SN_MATCH_MODES:
+            raise ValueError(f"不支援的 SN 搜尋方式：{match}")
+
+        if match == 'exact':
+            return TestRecord.sn == sn
+        if match == 'prefix':
+            return self._prefix_condition(TestRecord.sn, sn)
+
+        self.ensure_initialized()
+        return TestRecord.sn.in_(self._contains_query(sn))
+
+    def search_sns(self, session: Session, sn: str, match: Optional[str] = None,
+                   limit: int = 20) -> List[str]:
+        """列出符合的 SN（依 SN 排序）"""
+        match = match or Config.SN_MATCH_MODE
+        if match not in Config.SN_MATCH_MODES:
+            raise ValueError(f"不支援的 SN 搜尋方式：{match}")
+
+        self.ensure_initialized()
+        if match == 'exact':
+            query = select(SNLookup.sn).where(SNLookup.sn == sn)
+        elif match == 'prefix':
+            query = select(SNLookup.sn).where(self._prefix_condition(SNLookup.sn, sn))
+        else:
+            query = self._contains_query(sn)
+        return list(session.execute(query.order_by(text('sn')).limit(limit)).scalars())
+
+    def _contains_query(self, sn: str):
+        """
+        包含搜尋字串的 SN 子查詢
+        FTS5 以片語 MATCH 查詢 trigram 索引（需 3 個字元以上，片語內 % 與 _ 不是萬用字元）；
+        較短的字串或其他資料庫以 LIKE 掃描 sn_lookup，% _ \\ 先行跳脫
+        """
+        if self.backend == 'fts5' and len(sn) >= FTS_MIN_PATTERN_LENGTH:
+            phrase = '"' + sn.replace('"', '""') + '"'
+            return select(sn_trigram.c.sn).where(sn_trigram.c.sn.match(phrase))
+        pattern = '%' + sn.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return select(SNLookup.sn).where(SNLookup.sn.like(pattern, escape='\\'))
+
+    @staticmethod
+    def _prefix_condition(column, prefix: str):
+        """開頭相符轉為範圍條件 prefix <= sn < 下一個前綴，可使用 B-tree 索引"""
+        if not prefix:
+            return column.isnot(None)
+        last = ord(prefix[-1])
+        if last >= 0x10FFFF:
+            return column >= prefix
+        return and_(column >= prefix, column < prefix[:-1] + chr(last + 1))
+
+# 全域 SN 搜尋服務實例
+sn_search = SNSearchService()
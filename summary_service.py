@@ -0,0 +1,552 @@
+"""
+統計摘要服務
+專案：CSV 數據分析與管理系統
+負責：維護 sn_summaries / sn_frequency_summaries / sn_frequency_daily_summaries / summary_counts 摘要表、重建與驗證
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from sqlalchemy import and_, select, insert, delete, update, func, desc, case
+from sqlalchemy.orm import Session
+
+from models import (TestRecord, SNSummary, FrequencySummary, FrequencyDailySummary, SummaryCount,
+                    UPSERT_DIALECTS, db_manager)
+from measurement_codec import unpack_measurements
+import population_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SummaryService:
+    """
+    統計摘要服務
+    新增的記錄以累加方式合併摘要；覆蓋或刪除記錄時，
+    以受影響 SN 為範圍自 test_records 重新計算。所有更新與資料寫入在同一交易內完成
+    """
+
+    # IN 查詢每次的 SN / 記錄 ID 數量上限
+    SN_CHUNK_SIZE = 500
+    ID_CHUNK_SIZE = 500
+
+    SN_SUMMARY_COLUMNS = ['sn', 'fixture', 'test_type', 'record_count', 'latest_date']
+    FREQUENCY_SUMMARY_COLUMNS = ['sn', 'fixture', 'frequency', 'value_count',
+                                 'min_value', 'max_value', 'sum_value', 'sum_squares']
+    DAILY_SUMMARY_COLUMNS = ['sn', 'frequency', 'test_date', 'fixture', 'value_count',
+                             'min_value', 'max_value', 'mean_value', 'squared_deviations']
+
+    # 摘要表結構版本，記錄於 summary_counts（dimension='version'）；低於此版本的資料庫啟動時重建一次摘要
+    # 2：新增 sn_frequency_daily_summaries
+    SUMMARY_VERSION = 2
+
+    def __init__(self):
+        self.db_manager = db_manager
+        self._initialized = False
+
+    def ensure_initialized(self):
+        """摘要表尚未建立內容或版本較舊時（例如既有資料庫升級），自 test_records 重建一次"""
+        if self._initialized:
+            return
+        session = self.db_manager.get_session()
+        try:
+            version = session.get(SummaryCount, ('version', ''))
+            initialized = version is not None and version.count >= self.SUMMARY_VERSION
+        finally:
+            session.close()
+        if not initialized:
+            logger.info("摘要表尚未初始化或版本較舊，開始自 test_records 重建")
+            self.rebuild(verify=False)
+        self._initialized = True
+
+    # ==================== 增量維護 ====================
+
+    def add_records(self, session: Session, record_ids: Iterable[int], new_sn_count: int):
+        """
+        將新寫入的記錄累加至摘要表（僅適用於新增記錄，覆蓋記錄請使用 refresh_sns）
+        記錄數以 INSERT ... SELECT ... ON CONFLICT 在資料庫內彙總並合併；
+        量測值存於記錄的編碼欄位，只解碼本次新增的記錄，頻率統計以 NumPy 分組計算後以 ON CONFLICT 批次合併
+
+        Args:
+            session: 匯入交易的資料庫會話（新記錄與量測值須已寫入此交易）
+            record_ids: 新增記錄的 ID
+            new_sn_count: 新出現的 SN 數（sn_search.register_sns 於同一交易實際登錄的 SN 數）；
+                          不以「摘要表中不存在」判斷，避免併發匯入同一新 SN 時重複計數
+        """
+        record_ids = list(record_ids)
+        dialect_insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+        deltas = Counter()
+        if dialect_insert is not None:
+            deltas[('sn', '')] += new_sn_count
+
+        for start in range(0, len(record_ids), self.ID_CHUNK_SIZE):
+            condition = TestRecord.id.in_(record_ids[start:start + self.ID_CHUNK_SIZE])
+
+            if dialect_insert is None:
+                sns = session.execute(select(TestRecord.sn).where(condition).distinct()).scalars().all()
+                self.refresh_sns(session, sns)
+                continue
+
+            fixture = func.coalesce(TestRecord.fixture, '')
+            for fixture_value, test_type, count in session.execute(
+                    select(fixture, TestRecord.test_type, func.count(TestRecord.id))
+                    .where(condition).group_by(fixture, TestRecord.test_type)):
+                deltas[('total', '')] += count
+                deltas[('fixture', fixture_value)] += count
+                deltas[('test_type', test_type)] += count
+
+            table = SNSummary.__table__
+            stmt = dialect_insert(table).from_select(self.SN_SUMMARY_COLUMNS, self._sn_summary_query(condition))
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['sn', 'fixture', 'test_type'],
+                set_={
+                    'record_count': table.c.record_count + stmt.excluded.record_count,
+                    'latest_date': case(
+                        (table.c.latest_date.is_(None), stmt.excluded.latest_date),
+                        (stmt.excluded.latest_date > table.c.latest_date, stmt.excluded.latest_date),
+                        else_=table.c.latest_date
+                    )
+                }
+            ))
+
+            frequency_rows, daily_rows = self._frequency_summary_rows(session, condition)
+            if not frequency_rows:
+                continue
+            table = FrequencySummary.__table__
+            stmt = dialect_insert(table)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['sn', 'fixture', 'frequency'],
+                set_={
+                    'value_count': table.c.value_count + stmt.excluded.value_count,
+                    'min_value': case((stmt.excluded.min_value < table.c.min_value, stmt.excluded.min_value),
+                                      else_=table.c.min_value),
+                    'max_value': case((stmt.excluded.max_value > table.c.max_value, stmt.excluded.max_value),
+                                      else_=table.c.max_value),
+                    'sum_value': table.c.sum_value + stmt.excluded.sum_value,
+                    'sum_squares': table.c.sum_squares + stmt.excluded.sum_squares
+                }
+            ), frequency_rows)
+
+            # 每日摘要以平均值與離均差平方和合併兩組數據（Chan 等人的合併公式），不累加平方和
+            table = FrequencyDailySummary.__table__
+            stmt = dialect_insert(table)
+            total = table.c.value_count + stmt.excluded.value_count
+            delta = stmt.excluded.mean_value - table.c.mean_value
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['sn', 'frequency', 'test_date', 'fixture'],
+                set_={
+                    'value_count': total,
+                    'min_value': case((stmt.excluded.min_value < table.c.min_value, stmt.excluded.min_value),
+                                      else_=table.c.min_value),
+                    'max_value': case((stmt.excluded.max_value > table.c.max_value, stmt.excluded.max_value),
+                                      else_=table.c.max_value),
+                    'mean_value': (table.c.mean_value * table.c.value_count
+                                   + stmt.excluded.mean_value * stmt.excluded.value_count) / total,
+                    'squared_deviations': table.c.squared_deviations + stmt.excluded.squared_deviations
+                                          + delta * delta * table.c.value_count * stmt.excluded.value_count / total
+                }
+            ), daily_rows)
+
+        self._apply_count_deltas(session, deltas)
+
+    def refresh_sns(self, session: Session, sns: Iterable[str]):
+        """
+        自 test_records 重新計算指定 SN 的摘要（覆蓋或刪除記錄後使用）
+
+        Args:
+            session: 寫入交易的資料庫會話
+            sns: 受影響的 SN
+        """
+        sns = sorted(set(sns))
+        deltas = Counter()
+
+        for start in range(0, len(sns), self.SN_CHUNK_SIZE):
+            chunk = sns[start:start + self.SN_CHUNK_SIZE]
+
+            old_rows = session.execute(
+                select(SNSummary.sn, SNSummary.fixture, SNSummary.test_type, SNSummary.record_count)
+                .where(SNSummary.sn.in_(chunk))
+            ).all()
+            session.execute(delete(SNSummary).where(SNSummary.sn.in_(chunk)))
+            session.execute(delete(FrequencySummary).where(FrequencySummary.sn.in_(chunk)))
+            session.execute(delete(FrequencyDailySummary).where(FrequencyDailySummary.sn.in_(chunk)))
+
+            self._insert_summaries_from_records(session, TestRecord.sn.in_(chunk))
+
+            new_rows = session.execute(
+                select(SNSummary.sn, SNSummary.fixture, SNSummary.test_type, SNSummary.record_count)
+                .where(SNSummary.sn.in_(chunk))
+            ).all()
+
+            for sign, rows in ((-1, old_rows), (1, new_rows)):
+                for _, fixture, test_type, count in rows:
+                    deltas[('total', '')] += sign * count
+                    deltas[('fixture', fixture)] += sign * count
+                    deltas[('test_type', test_type)] += sign * count
+                deltas[('sn', '')] += sign * len({row.sn for row in rows})
+
+        self._apply_count_deltas(session, deltas)
+
+    @staticmethod
+    def _sn_summary_query(condition=None):
+        """由明細資料彙總 sn_summaries 的查詢（condition 為 test_records 的過濾條件）"""
+        fixture = func.coalesce(TestRecord.fixture, '')
+        sn_query = select(
+            TestRecord.sn, fixture, TestRecord.test_type,
+            func.count(TestRecord.id), func.max(TestRecord.test_date)
+        ).group_by(TestRecord.sn, fixture, TestRecord.test_type)
+        if condition is not None:
+            sn_query = sn_query.where(condition)
+        return sn_query
+
+    @classmethod
+    def _frequency_summary_rows(cls, session: Session, condition) -> Tuple[List[Dict], List[Dict]]:
+        """
+        讀取符合條件記錄的量測值，計算 sn_frequency_summaries（SN + 治具 + 頻率）與
+        sn_frequency_daily_summaries（SN + 頻率 + 測試日期 + 治具）的列（各依主鍵排序）
+        """
+        records = session.execute(
+            select(TestRecord.sn, func.coalesce(TestRecord.fixture, ''), TestRecord.test_date,
+                   TestRecord.measurement_data)
+            .where(condition)
+        ).all()
+        if not records:
+            return [], []
+        sns, fixtures, dates, blobs = zip(*records)
+        measurements = unpack_measurements(blobs)
+
+        keys, stats = population_stats.group_measurements([sns, fixtures], *measurements)
+        frequency_rows = [
+            dict(zip(cls.FREQUENCY_SUMMARY_COLUMNS, (
+                sn, fixture, frequency, int(stats['count'][index]),
+                float(stats['min'][index]), float(stats['max'][index]),
+                float(stats['sum'][index]), float(stats['sum_squares'][index])
+            )))
+            for index, (sn, fixture, frequency) in enumerate(keys)
+        ]
+
+        keys, stats = population_stats.group_measurements([sns, dates, fixtures], *measurements)
+        daily_rows = [
+            dict(zip(cls.DAILY_SUMMARY_COLUMNS, (
+                sn, frequency, test_date, fixture, int(stats['count'][index]),
+                float(stats['min'][index]), float(stats['max'][index]), float(stats['mean'][index]),
+                float(stats['count'][index] * np.square(stats['std'][index]))
+            )))
+            for index, (sn, test_date, fixture, frequency) in enumerate(keys)
+        ]
+
+        return (sorted(frequency_rows, key=lambda row: (row['sn'], row['fixture'], row['frequency'])),
+                sorted(daily_rows, key=lambda row: (row['sn'], row['frequency'], row['test_date'], row['fixture'])))
+
+    def _insert_summaries_from_records(self, session: Session, condition):
+        """自明細資料計算摘要並寫入（目標範圍內的摘要須已清除）"""
+        session.execute(insert(SNSummary).from_select(self.SN_SUMMARY_COLUMNS, self._sn_summary_query(condition)))
+        frequency_rows, daily_rows = self._frequency_summary_rows(session, condition)
+        if frequency_rows:
+            session.execute(insert(FrequencySummary), frequency_rows)
+            session.execute(insert(FrequencyDailySummary), daily_rows)
+
+    @staticmethod
+    def _apply_count_deltas(session: Session, deltas: Counter):
+        """
+        累加全域計數（不存在的維度值則新增）
+        支援 ON CONFLICT 的資料庫以單一 UPSERT 累加，併發交易新增同一維度值時不會違反主鍵
+        """
+        rows = [{'dimension': dimension, 'key': key, 'count': delta}
+                for (dimension, key), delta in sorted(deltas.items()) if delta]
+        if not rows:
+            return
+
+        dialect_insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+        if dialect_insert is not None:
+            stmt = dialect_insert(SummaryCount)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['dimension', 'key'],
+                set_={'count': SummaryCount.count + stmt.excluded.count}
+            ), rows)
+            return
+
+        for row in rows:
+            dimension, key, delta = row['dimension'], row['key'], row['count']
+            result = session.execute(
+                update(SummaryCount)
+                .where(SummaryCount.dimension == dimension, SummaryCount.key == key)
+                .values(count=SummaryCount.count + delta)
+            )
+            if result.rowcount == 0:
+                session.execute(insert(SummaryCount).values(dimension=dimension, key=key, count=delta))
+
+    # ==================== 重建與驗證 ====================
+
+    def rebuild(self, verify: bool = True) -> Dict:
+        """
+        自 test_records 完整重建所有摘要表
+
+        Args:
+            verify: 是否與重建前的摘要內容比對
+
+        Returns:
+            Dict: 各摘要表筆數；verify 時另含與重建前不一致的筆數 mismatches
+        """
+        session = self.db_manager.get_session()
+        try:
+            before = self._snapshot(session) if verify else None
+
+            session.execute(delete(SummaryCount))
+            session.execute(delete(FrequencyDailySummary))
+            session.execute(delete(FrequencySummary))
+            session.execute(delete(SNSummary))
+            # 依 SN 分塊計算，每次只解碼一個分塊的量測值
+            sns = session.execute(select(TestRecord.sn).distinct().order_by(TestRecord.sn)).scalars().all()
+            for start in range(0, len(sns), self.SN_CHUNK_SIZE):
+                self._insert_summaries_from_records(session, TestRecord.sn.in_(sns[start:start + self.SN_CHUNK_SIZE]))
+
+            deltas = Counter({('total', ''): 0, ('sn', ''): 0})
+            for fixture, test_type, count in session.execute(
+                    select(SNSummary.fixture, SNSummary.test_type, func.sum(SNSummary.record_count))
+                    .group_by(SNSummary.fixture, SNSummary.test_type)):
+                deltas[('total', '')] += count
+                deltas[('fixture', fixture)] += count
+                deltas[('test_type', test_type)] += count
+            deltas[('sn', '')] = session.execute(select(func.count(func.distinct(SNSummary.sn)))).scalar()
+            deltas[('version', '')] = self.SUMMARY_VERSION
+
+            session.add_all(SummaryCount(dimension=dimension, key=key, count=count)
+                            for (dimension, key), count in deltas.items())
+            session.flush()
+
+            after = self._snapshot(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        result = {table: len(rows) for table, rows in after.items()}
+        if before is not None:
+            result['mismatches'] = {
+                table: self._count_mismatches(before[table], rows) for table, rows in after.items()
+            }
+        logger.info(f"摘要表重建完成：{result}")
+        return result
+
+    @staticmethod
+    def _snapshot(session: Session) -> Dict[str, Dict]:
+        """讀取摘要表內容（驗證用）"""
+        return {
+            'sn_summaries': {
+                (row.sn, row.fixture, row.test_type): (row.record_count, row.latest_date)
+                for row in session.query(SNSummary)
+            },
+            'sn_frequency_summaries': {
+                (row.sn, row.fixture, row.frequency): (row.value_count, row.min_value, row.max_value,
+                                                       row.sum_value, row.sum_squares)
+                for row in session.query(FrequencySummary)
+            },
+            'sn_frequency_daily_summaries': {
+                (row.sn, row.frequency, row.test_date, row.fixture): (
+                    row.value_count, row.min_value, row.max_value, row.mean_value, row.squared_deviations
+                )
+                for row in session.query(FrequencyDailySummary)
+            },
+            'summary_counts': {
+                (row.dimension, row.key): row.count
+                for row in session.query(SummaryCount) if row.count
+            }
+        }
+
+    @staticmethod
+    def _count_mismatches(before: Dict, after: Dict, tolerance: float = 1e-6) -> int:
+        """比對兩份摘要內容，浮點數總和允許累加順序造成的誤差"""
+        def _equal(left, right):
+            if isinstance(left, tuple):
+                return len(left) == len(right) and all(_equal(a, b) for a, b in zip(left, right))
+            if isinstance(left, float) and isinstance(right, float):
+                return abs(left - right) <= tolerance * max(1.0, abs(left), abs(right))
+            return left == right
+
+        keys = set(before) | set(after)
+        return sum(1 for key in keys if key not in before or key not in after
+                   or not _equal(before[key], after[key]))
+
+    # ==================== 查詢 ====================
+
+    def get_statistics(self, session: Session, top_n: int = 20) -> Dict:
+        """
+        自摘要表讀取儀表板統計（格式同 DatabaseService.get_sn_statistics）
+        top_sns 依 SN 分組彙總 sn_summaries（依主鍵順序掃描，成本與 SN x 治具 x 測試項目的組合數成正比），
+        結果由 statistics_cache 快取，僅在資料寫入後重新計算
+        """
+        counts = {
+            (row.dimension, row.key): row.count
+            for row in session.query(SummaryCount).filter(SummaryCount.count > 0)
+        }
+
+        latest_date = session.query(func.max(SNSummary.latest_date)).scalar()
+
+        sn_counts = session.query(
+            SNSummary.sn,
+            func.sum(SNSummary.record_count).label('count')
+        ).group_by(SNSummary.sn)\
+         .order_by(desc('count'))\
+         .limit(top_n).all()
+
+        return {
+            'total_sns': counts.get(('sn', ''), 0),
+            'total_records': counts.get(('total', ''), 0),
+            'latest_date': latest_date,
+            'test_type_stats': {key: count for (dimension, key), count in sorted(counts.items())
+                                if dimension == 'test_type'},
+            'fixture_stats': {key or None: count for (dimension, key), count in sorted(counts.items())
+                              if dimension == 'fixture'},
+            'top_sns': [{'sn': sn, 'count': int(count)} for sn, count in sn_counts]
+        }
+
+    @staticmethod
+    def get_count(session: Session, dimension: str = 'total', key: str = '') -> int:
+        """讀取全域計數（dimension 為 total/sn/fixture/test_type）"""
+        count = session.query(SummaryCount.count).filter(
+            SummaryCount.dimension == dimension, SummaryCount.key == key
+        ).scalar()
+        return count or 0
+
+    def get_frequency_summary(self, session: Session, sn: str, frequency: int, fixture: Optional[str] = None,
+                              date_range: Optional[Tuple[str, str]] = None) -> Optional[Dict]:
+        """
+        讀取 SN 在指定頻率的 count/min/max/avg/std（未指定治具則合併所有治具）
+
+        Returns:
+            Optional[Dict]: 無數據時返回 None
+        """
+        rows = self.get_frequency_summaries(session, [sn], [frequency], [fixture] if fixture else None,
+                                            date_range=date_range)
+        if not rows:
+            return None
+        return {key: rows[0][key] for key in ('count', 'min_value', 'max_value', 'avg_value', 'std_value')}
+
+    def get_frequency_summaries(self, session: Session, sns: Iterable[str], frequencies: Iterable[int],
+                                fixtures: Optional[Iterable[str]] = None, by_fixture: bool = False,
+                                date_range: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        以分組查詢讀取多個 SN x 頻率的 count/min/max/avg/std
+
+        Args:
+            sns: 設備序號
+            frequencies: 頻率（Hz）
+            fixtures: 只統計這些治具（None 表示全部）
+            by_fixture: 是否依治具分開統計（否則合併所有治具，fixture 為 None）
+            date_range: 測試日期範圍 (start_date, end_date)（指定時彙總每日摘要表）
+
+        Returns:
+            List[Dict]: 依 sn、fixture、frequency 排序，沒有數據的組合不列出
+        """
+        sns = sorted(set(sns))
+        frequencies = sorted(set(frequencies))
+        if date_range:
+            rows = []
+            for start in range(0, len(sns), self.SN_CHUNK_SIZE):
+                rows.extend(self._daily_summary_rows(session, sns[start:start + self.SN_CHUNK_SIZE],
+                                                     frequencies, fixtures, by_fixture, date_range))
+            return rows
+
+        group_columns = [FrequencySummary.sn, FrequencySummary.frequency]
+        if by_fixture:
+            group_columns.insert(1, FrequencySummary.fixture)
+
+        rows = []
+        for start in range(0, len(sns), self.SN_CHUNK_SIZE):
+            query = session.query(
+                *group_columns,
+                func.sum(FrequencySummary.value_count),
+                func.min(FrequencySummary.min_value),
+                func.max(FrequencySummary.max_value),
+                func.sum(FrequencySummary.sum_value),
+                func.sum(FrequencySummary.sum_squares)
+            ).filter(
+                FrequencySummary.sn.in_(sns[start:start + self.SN_CHUNK_SIZE]),
+                FrequencySummary.frequency.in_(frequencies)
+            )
+            if fixtures is not None:
+                query = query.filter(FrequencySummary.fixture.in_([fixture or '' for fixture in fixtures]))
+
+            for row in query.group_by(*group_columns).order_by(*group_columns):
+                if by_fixture:
+                    sn, fixture, frequency, *sums = row
+                else:
+                    (sn, frequency, *sums), fixture = row, None
+                stats = self._stats_from_sums(*sums)
+                if stats is not None:
+                    rows.append(dict(stats, sn=sn, fixture=fixture or None, frequency=frequency))
+        return rows
+
+    @staticmethod
+    def _daily_summary_rows(session: Session, sns: List[str], frequencies: List[int],
+                            fixtures: Optional[Iterable[str]], by_fixture: bool,
+                            date_range: Tuple[str, str]) -> List[Dict]:
+        """
+        彙總日期範圍內的每日摘要（格式同 get_frequency_summaries）
+        第一段以子查詢求各組筆數與平均，第二段以各日平均與組平均的差合併離均差平方和，
+        不使用 avg(x²) - avg² 以免數值相近時相減失去精度
+        """
+        daily = FrequencyDailySummary
+        conditions = [daily.sn.in_(sns), daily.frequency.in_(frequencies), daily.test_date.between(*date_range)]
+        if fixtures is not None:
+            conditions.append(daily.fixture.in_([fixture or '' for fixture in fixtures]))
+        group_names = ['sn'] + (['fixture'] if by_fixture else []) + ['frequency']
+
+        totals = select(
+            *(getattr(daily, name) for name in group_names),
+            func.sum(daily.value_count).label('value_count'),
+            func.min(daily.min_value).label('min_value'),
+            func.max(daily.max_value).label('max_value'),
+            (func.sum(daily.mean_value * daily.value_count) / func.sum(daily.value_count)).label('mean_value')
+        ).where(*conditions).group_by(*(getattr(daily, name) for name in group_names)).subquery()
+
+        deviation = daily.mean_value - totals.c.mean_value
+        group_columns = [totals.c[name] for name in group_names]
+        query = select(
+            *group_columns, totals.c.value_count, totals.c.min_value, totals.c.max_value, totals.c.mean_value,
+            func.sum(daily.squared_deviations + daily.value_count * deviation * deviation)
+        ).join_from(
+            daily, totals, and_(*(getattr(daily, name) == totals.c[name] for name in group_names))
+        ).where(*conditions).group_by(*group_columns, totals.c.value_count, totals.c.min_value,
+                                      totals.c.max_value, totals.c.mean_value).order_by(*group_columns)
+
+        rows = []
+        for row in session.execute(query):
+            if by_fixture:
+                sn, fixture, frequency, count, min_value, max_value, mean, squared_deviations = row
+            else:
+                (sn, frequency, count, min_value, max_value, mean, squared_deviations), fixture = row, None
+            rows.append({
+                'sn': sn,
+                'fixture': fixture or None,
+                'frequency': frequency,
+                'count': int(count),
+                'min_value': min_value,
+                'max_value': max_value,
+                'avg_value': mean,
+                'std_value': (max(squared_deviations, 0.0) / count) ** 0.5
+            })
+        return rows
+
+    @staticmethod
+    def _stats_from_sums(count, min_value, max_value, sum_value, sum_squares) -> Optional[Dict]:
+        """由 count/min/max/sum/sum of squares 計算統計值（母體標準差）"""
+        if not count:
+            return None
+        mean = sum_value / count
+        variance = max(sum_squares / count - mean * mean, 0.0)
+        return {
+            'count': int(count),
+            'min_value': min_value,
+            'max_value': max_value,
+            'avg_value': mean,
+            'std_value': variance ** 0.5
+        }
+
+# 全域摘要服務實例
+summary_service = SummaryService()
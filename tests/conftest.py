@@ -0,0 +1,66 @@
+"""
+測試共用設定
+資料庫管理器於匯入 models 時即建立連線，因此測試資料庫路徑須在匯入任何專案模組前以環境變數指定
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+TEST_DIR = tempfile.mkdtemp(prefix='record_parser_tests_')
+os.environ['DATABASE_URL'] = f'sqlite:///{TEST_DIR}/test_records.db'
+os.environ['SNAPSHOT_ENABLED'] = 'false'
+os.environ['SNAPSHOT_DIR'] = str(Path(TEST_DIR) / 'snapshot')
+os.environ['UPLOAD_FOLDER'] = str(Path(TEST_DIR) / 'uploads')
+os.environ['SQLITE_WRITE_WAIT_TIMEOUT'] = '5'  # 連線等待逾時縮短，死結時測試很快失敗而不是卡住
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+from sqlalchemy import delete, text
+
+from models import Base, db_manager
+
+FREQUENCIES = ['1000', '2000', '4000']
+
+def write_csv(path, rows, frequencies=FREQUENCIES):
+    """
+    寫入測試用 CSV
+
+    Args:
+        rows: [(檔名, {頻率: 數值})]
+    """
+    lines = [','.join(['檔案名稱'] + frequencies)]
+    for filename, values in rows:
+        lines.append(','.join([filename] + ['' if values.get(freq) is None else str(values[freq])
+                                            for freq in frequencies]))
+    Path(path).write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+def record_name(sn, date='20250101', time='120000', test_type='left'):
+    return f'{sn}_{date}_{time}_{test_type}'
+
+@pytest.fixture
+def clean_db():
+    """清空所有資料表並重建摘要計數，各測試從空資料庫開始"""
+    from summary_service import summary_service
+    from sn_search import sn_search, FTS_TABLE_NAME
+    from result_cache import statistics_cache
+
+    with db_manager.get_engine().begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(delete(table))
+        if sn_search.backend == 'fts5':
+            connection.execute(text(f"INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}) VALUES ('rebuild')"))
+    summary_service.rebuild(verify=False)
+    statistics_cache.invalidate()
+    yield db_manager
+    statistics_cache.invalidate()
+
+@pytest.fixture
+def services(clean_db):
+    """資料服務實例（database_service, import_service, query_service）"""
+    from data_service import database_service, import_service, query_service
+    return database_service, import_service, query_service
@@ -0,0 +1,112 @@
+"""
+分析查詢測試：母體分析的資料庫讀取
+"""
+
+import numpy as np
+import pytest
+
+from conftest import write_csv, record_name
+
+@pytest.fixture
+def population(services, tmp_path):
+    """匯入 25 筆記錄（部分頻率無值），回傳 {SN: [1000, 2000, 4000 的值]}"""
+    _, import_service, _ = services
+    rows, expected = [], {}
+    for index in range(25):
+        sn = f'SN{index:04d}'
+        values = {'1000': -60.0 - index, '2000': None if index % 3 else -50.0 + index / 10, '4000': -40.0}
+        rows.append((record_name(sn), values))
+        expected[sn] = [values[frequency] if values[frequency] is not None else np.nan
+                        for frequency in ('1000', '2000', '4000')]
+    success, result = import_service.import_csv_file(write_csv(tmp_path / 'population.csv', rows), 'population.csv')
+    assert success, result
+    return expected
+
+@pytest.mark.parametrize('fetch_size', [1, 7, 20000])
+def test_band_matrix_streams_from_database(services, population, monkeypatch, fetch_size):
+    _, _, query_service = services
+    monkeypatch.setattr(query_service, 'BAND_MATRIX_FETCH_SIZE', fetch_size)
+
+    sns, values, source = query_service._load_band_matrix(['1000', '2000', '4000'], None, None, None)
+
+    assert source == 'database'
+    assert sns.tolist() == sorted(population)
+    np.testing.assert_array_equal(values, np.array([population[sn] for sn in sns]))
+
+def test_band_matrix_filters(services, population):
+    _, _, query_service = services
+
+    sns, values, _ = query_service._load_band_matrix(['2000'], ['治具1'], ['right'], None)
+    assert len(sns) == 0 and values.shape == (0, 1)
+
+    sns, values, _ = query_service._load_band_matrix(['2000'], ['治具1'], ['left'], ('20250101', '20250101'))
+    assert len(sns) == 25 and np.count_nonzero(~np.isnan(values)) == 9
+
+def _import_values(import_service, tmp_path, sn, values):
+    rows = [(record_name(sn, time=f'12{index:04d}'), {'1000': value}) for index, value in enumerate(values)]
+    success, result = import_service.import_csv_file(write_csv(tmp_path / 'values.csv', rows, ['1000']), 'values.csv')
+    assert success, result
+
+def test_date_range_std_is_numerically_stable(services, tmp_path):
+    _, import_service, query_service = services
+    # 平均值遠大於離散程度時，avg(x²) - avg² 會相減失去全部有效位數
+    values = [round(-60.0 + index * 1e-4, 4) for index in range(50)]  # 量測值保存 7 位有效數字
+    _import_values(import_service, tmp_path, 'SN0001', values)
+    date_range = ('20250101', '20250101')
+
+    analysis = query_service.get_frequency_analysis('SN0001', '1000', date_range=date_range)
+    assert analysis['count'] == 50
+    assert analysis['avg_value'] == pytest.approx(np.mean(values))
+
+    for by_fixture in (False, True):
+        batch = query_service.batch_frequency_analysis(['SN0001'], ['1000'], by_fixture=by_fixture,
+                                                       date_range=date_range)
+        assert batch['rows'] == 1
+        assert batch['data']['std_value'][0] == pytest.approx(np.std(values), rel=1e-6)
+        assert batch['data']['avg_value'][0] == pytest.approx(np.mean(values))
+
+def test_date_range_statistics_merge_imports_without_decoding(services, tmp_path, monkeypatch):
+    import data_service
+    import summary_service
+    _, import_service, query_service = services
+    # 同一天分三次匯入，每日摘要以平均值與離均差平方和合併
+    batches = [[-60.0, -61.5, -59.25], [-58.0], [-62.75, -60.5]]
+    for batch_index, values in enumerate(batches):
+        rows = [(record_name('SN0001', time=f'1{batch_index}{index:04d}'), {'1000': value})
+                for index, value in enumerate(values)]
+        name = f'batch{batch_index}.csv'
+        assert import_service.import_csv_file(write_csv(tmp_path / name, rows, ['1000']), name)[0]
+
+    def _fail(*args, **kwargs):
+        raise AssertionError('統計值不應解碼記錄的量測值')
+    monkeypatch.setattr(data_service, 'unpack_measurements', _fail)
+    monkeypatch.setattr(summary_service, 'unpack_measurements', _fail)
+
+    values = [value for batch in batches for value in batch]
+    batch = query_service.batch_frequency_analysis(['SN0001'], ['1000'], date_range=('20250101', '20250101'))
+    assert batch['data']['count'] == [len(values)]
+    assert batch['data']['min_value'] == [min(values)] and batch['data']['max_value'] == [max(values)]
+    assert batch['data']['avg_value'][0] == pytest.approx(np.mean(values))
+    assert batch['data']['std_value'][0] == pytest.approx(np.std(values))
+
+def test_date_range_without_data_returns_error(services, tmp_path):
+    _, import_service, query_service = services
+    _import_values(import_service, tmp_path, 'SN0001', [-60.0])
+
+    analysis = query_service.get_frequency_analysis('SN0001', '1000', date_range=('20240101', '20241231'))
+    assert 'error' in analysis
+
+def test_compare_fixtures_without_data_returns_error(services):
+    _, _, query_service = services
+
+    assert 'error' in query_service.compare_fixture_performance('SN9999', '1000')
+
+def test_limit_evaluation_reads_record_measurements(services, population):
+    from limit_service import limit_service
+
+    limit_service.save_curve('治具1', 'left', {'1000': {'lower': -70.0}, '2000': {'upper': -48.0}})
+    outcome = limit_service.evaluate()
+
+    # 1000 Hz 低於 -70（index > 10）或 2000 Hz 高於 -48（index 21、24）
+    assert outcome['evaluated'] == 25
+    assert outcome['failed'] == 14
@@ -0,0 +1,102 @@
+"""
+Web API 測試
+"""
+
+import pytest
+
+from conftest import write_csv, record_name
+
+@pytest.fixture
+def client(services):
+    from app import app
+    app.config['TESTING'] = True
+    return app.test_client()
+
+@pytest.fixture
+def record_ids(services, tmp_path):
+    """匯入三筆記錄，回傳其 ID（依 SN 排序）"""
+    from models import TestRecord
+    database_service, import_service, _ = services
+
+    path = write_csv(tmp_path / 'records.csv', [
+        (record_name(f'SN000{index}'), {'1000': float(index), '2000': 1.0, '4000': 2.0})
+        for index in range(1, 4)
+    ])
+    success, _ = import_service.import_csv_file(path, 'records.csv')
+    assert success
+    with database_service.get_session(read_only=True) as session:
+        return [record_id for record_id, in session.query(TestRecord.id).order_by(TestRecord.sn)]
+
+def _remaining_ids(services):
+    from models import TestRecord
+    with services[0].get_session(read_only=True) as session:
+        return sorted(record_id for record_id, in session.query(TestRecord.id))
+
+# ==================== 批次刪除 ====================
+
+def test_batch_delete_by_id_list(client, services, record_ids):
+    response = client.post('/api/batch/delete', json={'record_ids': record_ids[:2]})
+    assert response.status_code == 200
+    assert response.get_json()['deleted_count'] == 2
+    assert _remaining_ids(services) == record_ids[2:]
+
+def test_batch_delete_by_comma_separated_ids(client, services, record_ids):
+    response = client.post('/api/batch/delete',
+                           json={'record_ids': f'{record_ids[0]}, {record_ids[2]}'})
+    assert response.status_code == 200
+    assert response.get_json()['deleted_count'] == 2
+    assert _remaining_ids(services) == [record_ids[1]]
+
+@pytest.mark.parametrize('value', [['abc'], [1.5], [True], {'id': 1}, 12, 'abc,1'])
+def test_batch_delete_rejects_malformed_ids(client, services, record_ids, value):
+    response = client.post('/api/batch/delete', json={'record_ids': value})
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert _remaining_ids(services) == record_ids
+
+def test_batch_delete_sn_defaults_to_exact_match(client, services, tmp_path):
+    _, import_service, _ = services
+    path = write_csv(tmp_path / 'sns.csv', [
+        (record_name(sn), {'1000': -60.0}) for sn in ('SN0001', 'SN00010', 'XSN0001')
+    ])
+    assert import_service.import_csv_file(path, 'sns.csv')[0]
+
+    response = client.post('/api/batch/delete', json={'sn': 'SN0001'})
+    assert response.get_json()['deleted_count'] == 1
+
+    response = client.post('/api/batch/delete', json={'sn': 'SN0001', 'sn_match': 'contains'})
+    assert response.get_json()['deleted_count'] == 2
+
+@pytest.mark.parametrize('dates', [{'start_date': '20240101'}, {'end_date': '20240101'}])
+def test_batch_delete_rejects_half_open_date_range(client, services, record_ids, dates):
+    response = client.post('/api/batch/delete', json=dict(dates, fixture='治具1'))
+    assert response.status_code == 400
+    assert _remaining_ids(services) == record_ids
+
+# ==================== 匯出 ====================
+
+def test_export_query_string_ids(client, record_ids):
+    response = client.get(f'/api/export?format=jsonl&record_ids={record_ids[0]},{record_ids[1]}')
+    assert response.status_code == 200
+    assert len(response.get_data(as_text=True).strip().splitlines()) == 2
+
+def test_export_rejects_malformed_ids(client, record_ids):
+    assert client.get('/api/export?record_ids=1,x').status_code == 400
+    assert client.post('/api/batch/export', json={'record_ids': ['x']}).status_code == 400
+
+# ==================== 母體分析 ====================
+
+def test_population_accepts_scalar_filters(client, services, tmp_path):
+    _, import_service, _ = services
+    path = write_csv(tmp_path / 'population.csv', [
+        (record_name('SN0001'), {'1000': -60.0}),
+        (record_name('SN0002', test_type='right'), {'1000': -62.0}),
+    ])
+    assert import_service.import_csv_file(path, 'population.csv')[0]
+
+    response = client.post('/api/analytics/population',
+                           json={'frequencies': '1000', 'fixtures': '治具1', 'test_types': 'left'})
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['records'] == 1
+    assert data['bands']['data']['frequency'] == [1000]
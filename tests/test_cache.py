@@ -0,0 +1,69 @@
+"""
+統計結果快取測試：過期移除、LRU 上限、單一計算鎖的回收
+"""
+
+import threading
+import time
+
+from result_cache import ResultCache
+
+def test_lru_limit_evicts_least_recently_used():
+    cache = ResultCache(ttl=60, max_entries=2)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: 0)  # 命中，a 成為最近使用
+    cache.get_or_compute('c', lambda: 3)
+
+    assert cache.get_or_compute('a', lambda: 'recomputed') == 1
+    assert cache.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
+    assert cache.get_stats()['entries'] == 2
+    assert cache.get_stats()['evictions'] == 2
+
+def test_expired_entries_are_removed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = ResultCache(ttl=10, max_entries=100)
+    for key in range(5):
+        cache.get_or_compute(key, lambda: key)
+
+    now[0] += 11
+    assert cache.get_or_compute('fresh', lambda: 'value') == 'value'
+    assert cache.get_stats()['entries'] == 1
+
+    now[0] += 11
+    assert cache.get_or_compute('fresh', lambda: 'again') == 'again'
+
+def test_key_locks_are_released_after_compute():
+    cache = ResultCache(ttl=60, max_entries=100)
+    for key in range(10):
+        cache.get_or_compute(key, lambda: key)
+    assert cache._key_locks == {}
+
+    def _fail():
+        raise RuntimeError('compute failed')
+    try:
+        cache.get_or_compute('error', _fail)
+    except RuntimeError:
+        pass
+    assert cache._key_locks == {}
+
+def test_concurrent_requests_compute_once():
+    cache = ResultCache(ttl=60, max_entries=100)
+    calls = []
+
+    def _compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'value': 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('key', _compute)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'value': 42}] * 5
+    assert cache._key_locks == {}
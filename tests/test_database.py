@@ -0,0 +1,281 @@
+"""
+資料庫管理器測試：啟動、SQLite 效能設定與讀寫連線分離
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from conftest import ROOT_DIR, TEST_DIR
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import app
+client = app.app.test_client()
+response = client.get('/health')
+assert response.status_code == 200, response.get_data(as_text=True)
+print(round(time.perf_counter() - start, 2))
+"""
+
+def _start_app(database_path, timeout=60):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database_path}', SQLITE_WRITE_WAIT_TIMEOUT='5')
+    return subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=ROOT_DIR, env=env,
+                          capture_output=True, text=True, timeout=timeout)
+
+def test_app_starts_on_new_and_existing_sqlite_database():
+    database_path = os.path.join(TEST_DIR, 'startup.db')
+
+    for attempt in ('new', 'existing'):
+        result = _start_app(database_path)
+        assert result.returncode == 0, f"{attempt} database: {result.stderr[-2000:]}"
+        assert float(result.stdout.strip().splitlines()[-1]) < 5
+
+def test_sqlite_pragmas_applied(clean_db):
+    with clean_db.get_engine().connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar().lower() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert connection.execute(text('PRAGMA temp_store')).scalar() == 2  # MEMORY
+
+def test_reads_continue_while_write_transaction_is_open(clean_db):
+    from models import TestRecord
+
+    writer = clean_db.get_session()
+    try:
+        writer.add(TestRecord(sn='SN1', test_date='20250101', test_time='120000', test_type='left'))
+        writer.flush()  # 持有寫入鎖，尚未提交
+
+        start = time.perf_counter()
+        reader = clean_db.get_read_session()
+        try:
+            assert reader.query(TestRecord).count() == 0  # 讀不到未提交的資料，也不會被阻擋
+        finally:
+            reader.close()
+        assert time.perf_counter() - start < 1
+    finally:
+        writer.rollback()
+        writer.close()
+
+def test_concurrent_writers_are_serialized(clean_db):
+    from models import TestRecord
+
+    errors = []
+
+    def _write(index):
+        session = clean_db.get_session()
+        try:
+            for row in range(20):
+                session.add(TestRecord(sn=f'SN{index}', test_date='20250101',
+                                       test_time=f'12{row:04d}', test_type='left'))
+                session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=_write, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    session = clean_db.get_read_session()
+    try:
+        assert session.query(TestRecord).count() == 80
+    finally:
+        session.close()
+
+def test_read_sessions_use_primary_while_replica_may_lag(clean_db, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from config import Config
+    from models import SummaryCount
+
+    replica = create_engine(f'sqlite:///{TEST_DIR}/replica.db')
+    monkeypatch.setattr(clean_db, 'read_database_url', str(replica.url))
+    monkeypatch.setattr(clean_db, '_ReadSessionLocal', sessionmaker(bind=replica))
+    monkeypatch.setattr(clean_db, '_last_write_time', None)
+    monkeypatch.setattr(Config, 'READ_AFTER_WRITE_SECONDS', 60)
+
+    def _bind(**kwargs):
+        session = clean_db.get_read_session(**kwargs)
+        try:
+            return session.get_bind()
+        finally:
+            session.close()
+
+    assert _bind() is replica
+    assert _bind(fresh=True) is clean_db.get_engine()
+
+    session = clean_db.get_session()
+    try:
+        session.add(SummaryCount(dimension='test', key='', count=1))
+        session.commit()
+    finally:
+        session.close()
+    assert _bind() is clean_db.get_engine()
+
+    monkeypatch.setattr(Config, 'READ_AFTER_WRITE_SECONDS', 0)
+    assert _bind() is replica
+    replica.dispose()
+
+def test_cursor_pagination_includes_records_without_import_time(services):
+    from datetime import datetime
+    from models import TestRecord
+
+    database_service, _, _ = services
+    with database_service.get_session() as session:
+        for index in range(7):
+            # 升級前匯入的舊記錄沒有 import_time
+            import_time = datetime(2025, 1, 1, 12, index % 2) if index < 4 else None
+            record = TestRecord(sn=f'SN{index:04d}', test_date='20250101', test_time='120000', test_type='left')
+            session.add(record)
+            session.flush()
+            record.import_time = import_time
+        session.commit()
+
+    expected = [record.id for record in database_service.query_records(limit=100, count_mode='none')[0]]
+    assert len(expected) == 7
+
+    for page_size in (1, 2, 3, 4):
+        ids, cursor = [], None
+        while True:
+            records, _, cursor = database_service.query_records(limit=page_size, cursor=cursor, count_mode='none')
+            ids += [record.id for record in records]
+            if cursor is None:
+                break
+        assert ids == expected
+
+def test_measurement_codec_round_trip():
+    from measurement_codec import pack_measurements, unpack_measurements, unpack_record
+
+    data = {1000: -50.1, 125: -49.9, 20000: 0.0, 400: -199.99, 2000: -60.12345}
+    blob = pack_measurements(data)
+    assert len(blob) == 6 * len(data)
+    assert unpack_record(blob) == data
+    assert pack_measurements({}) is None and unpack_record(None) == {}
+
+    positions, frequencies, values = unpack_measurements([blob, None, pack_measurements({100: -1.5})])
+    assert positions.tolist() == [0] * len(data) + [2]
+    assert frequencies.tolist() == sorted(data) + [100]
+    assert values.tolist() == [data[frequency] for frequency in sorted(data)] + [-1.5]
+
+def test_measurement_precision_is_seven_significant_digits():
+    from measurement_codec import rounding_errors, unpack_record, pack_measurements
+
+    assert unpack_record(pack_measurements({1000: -123.4567, 2000: 1e-9, 4000: -50.123456789})) == {
+        1000: -123.4567, 2000: 1e-9, 4000: -50.12346
+    }
+    errors = rounding_errors([-50.1, -123.4567, -50.123456789])
+    assert errors[:2].tolist() == [0.0, 0.0]
+    assert 0 < errors[2] <= 5e-7 * 50.123456789
+
+def _insert_legacy_record(connection, sn):
+    connection.execute(text(
+        "INSERT INTO test_records (sn, test_date, test_time, test_type, fixture) "
+        "VALUES (:sn, '20250101', '120000', 'left', '治具1')"
+    ), {'sn': sn})
+    return connection.execute(text('SELECT id FROM test_records WHERE sn = :sn'), {'sn': sn}).scalar()
+
+def test_migrates_legacy_measurement_storage(clean_db, caplog):
+    from sqlalchemy import inspect
+    from models import TestRecord
+
+    with clean_db.get_engine().begin() as connection:
+        # 舊版寬欄位
+        connection.execute(text('ALTER TABLE test_records ADD COLUMN freq_1000 FLOAT'))
+        connection.execute(text('ALTER TABLE test_records ADD COLUMN freq_2000 FLOAT'))
+        wide_id = _insert_legacy_record(connection, 'SN0001')
+        connection.execute(text('UPDATE test_records SET freq_1000 = -60.5, freq_2000 = NULL WHERE id = :id'),
+                           {'id': wide_id})
+        # 長格式量測值表
+        connection.execute(text(
+            'CREATE TABLE test_measurements (record_id INTEGER, frequency INTEGER, value FLOAT NOT NULL, '
+            'PRIMARY KEY (record_id, frequency))'
+        ))
+        long_id = _insert_legacy_record(connection, 'SN0002')
+        # 舊版 Float 欄位的值超過 7 位有效數字時會被捨入
+        connection.execute(text('INSERT INTO test_measurements VALUES (:id, 125, -49.9), (:id, 4000, -40.0), '
+                                '(:id, 8000, -50.123456789)'), {'id': long_id})
+        _insert_legacy_record(connection, 'SN0003')
+
+    with caplog.at_level(logging.WARNING, logger='models'):
+        assert clean_db.migrate_measurements() == 4
+    assert '1 筆量測值超過 7 位有效數字' in caplog.text
+    assert clean_db.migrate_measurements() == 0
+
+    with clean_db.get_engine().connect() as connection:
+        inspector = inspect(connection)
+        assert 'test_measurements' not in inspector.get_table_names()
+        assert not [column for column in inspector.get_columns('test_records') if column['name'].startswith('freq_')]
+
+    session = clean_db.get_read_session()
+    try:
+        data = {record.sn: record.get_frequency_data() for record in session.query(TestRecord)}
+    finally:
+        session.close()
+    assert data == {'SN0001': {'1000': -60.5}, 'SN0002': {'125': -49.9, '4000': -40.0, '8000': -50.12346},
+                    'SN0003': {}}
+
+@pytest.mark.parametrize('present', [3, 14, 24])
+def test_packed_measurements_smaller_than_wide_columns(tmp_path, present):
+    """與舊版寬欄位（每個頻帶一欄）比較 SQLite 檔案大小：稀疏、舊治具 14 頻帶與全頻帶記錄都較小"""
+    from sqlalchemy import create_engine
+    from config import Config
+    from measurement_codec import pack_measurements
+    from models import TestRecord
+
+    bands = Config.FREQUENCY_BANDS
+    rng = np.random.default_rng(0)
+    rows = []
+    for index in range(2000):
+        chosen = sorted(rng.choice(len(bands), present, replace=False))
+        rows.append({'sn': f'SN{index:05d}', 'test_date': '20250101', 'test_time': '120000', 'test_type': 'left',
+                     'fixture': '治具1', 'filename': 'data.csv', 'import_time': None,
+                     'values': {int(bands[band]): round(float(rng.uniform(-80, -20)), 2) for band in chosen}})
+
+    def _file_size(name, prepare, insert_row):
+        engine = create_engine(f'sqlite:///{tmp_path / name}')
+        with engine.begin() as connection:
+            TestRecord.__table__.create(connection)
+            prepare(connection)
+            for row in rows:
+                insert_row(connection, row)
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+            size = (connection.execute(text('PRAGMA page_count')).scalar()
+                    * connection.execute(text('PRAGMA page_size')).scalar())
+        engine.dispose()
+        return size
+
+    base_columns = ['sn', 'test_date', 'test_time', 'test_type', 'fixture', 'filename', 'import_time']
+
+    def _insert(connection, values):
+        connection.execute(text(
+            f"INSERT INTO test_records ({', '.join(values)}) VALUES ({', '.join(':' + column for column in values)})"
+        ), values)
+
+    def _insert_packed(connection, row):
+        _insert(connection, dict({column: row[column] for column in base_columns},
+                                 measurement_data=pack_measurements(row['values'])))
+
+    def _prepare_wide(connection):
+        connection.execute(text('ALTER TABLE test_records DROP COLUMN measurement_data'))
+        for band in bands:
+            connection.execute(text(f'ALTER TABLE test_records ADD COLUMN freq_{band} FLOAT'))
+
+    def _insert_wide(connection, row):
+        _insert(connection, dict({column: row[column] for column in base_columns},
+                                 **{f'freq_{band}': value for band, value in row['values'].items()}))
+
+    packed = _file_size('packed.db', lambda connection: None, _insert_packed)
+    wide = _file_size('wide.db', _prepare_wide, _insert_wide)
+    assert packed < wide
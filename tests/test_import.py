@@ -0,0 +1,154 @@
+"""
+匯入測試：背景匯入佇列、內容雜湊去重、目錄監看與匯入模式
+"""
+
+import threading
+
+import pytest
+
+from conftest import write_csv, record_name
+
+def _count_records():
+    from models import TestRecord, db_manager
+    session = db_manager.get_read_session()
+    try:
+        return session.query(TestRecord).count()
+    finally:
+        session.close()
+
+# ==================== 匯入佇列 ====================
+
+def test_queue_tracks_active_jobs_and_results():
+    from import_queue import ImportJobQueue
+
+    queue = ImportJobQueue(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def _job():
+        started.set()
+        release.wait(5)
+        return True, {'success': True}
+
+    try:
+        future = queue.submit([1, 2], _job)
+        started.wait(5)
+        assert queue.is_active(1) and queue.is_active(2)
+        assert queue.active_count() == 2
+        assert queue.get_result(1) is None
+
+        release.set()
+        assert future.result(5) == (True, {'success': True})
+        assert not queue.is_active(1)
+        assert queue.active_count() == 0
+        assert queue.get_result(2) == {'success': True}
+    finally:
+        release.set()
+        queue.shutdown()
+
+def test_queue_records_failed_job():
+    from import_queue import ImportJobQueue
+
+    def _job():
+        raise RuntimeError('boom')
+
+    queue = ImportJobQueue(max_workers=1)
+    try:
+        success, result = queue.submit([7], _job).result(5)
+    finally:
+        queue.shutdown()
+    assert success is False
+    assert 'boom' in result['message']
+    assert queue.get_result(7) is result
+    assert not queue.is_active(7)
+
+def test_enqueue_import_completes_in_background(services, tmp_path):
+    from import_queue import import_queue
+    _, import_service, _ = services
+
+    path = write_csv(tmp_path / 'a.csv', [
+        (record_name('SN0001'), {'1000': 1.0, '2000': 2.0, '4000': 3.0}),
+        (record_name('SN0002'), {'1000': 4.0, '2000': 5.0, '4000': 6.0}),
+    ])
+    import_id = import_service.enqueue_import(path, 'a.csv', remove_file=False)
+    import_queue.shutdown(wait=True)
+
+    status = import_service.get_import_status(import_id)
+    assert status['import_status'] == 'completed'
+    assert _count_records() == 2
+
+# ==================== 內容雜湊去重 ====================
+
+def test_orphaned_queued_import_is_not_a_duplicate(services, tmp_path):
+    _, import_service, _ = services
+
+    path = write_csv(tmp_path / 'a.csv', [(record_name('SN0001'), {'1000': 1.0})])
+    file_hash = import_service.compute_file_hash(path)
+
+    # 行程重新啟動前排入佇列但未執行的記錄
+    import_service.create_import_log('a.csv', file_hash=file_hash, status='processing')
+    assert import_service.find_imported_hashes([file_hash]) == set()
+
+    import_service.create_import_log('a.csv', file_hash=file_hash, status='completed')
+    assert import_service.find_imported_hashes([file_hash]) == {file_hash}
+
+# ==================== 目錄監看 ====================
+
+def test_watcher_retries_file_whose_hash_failed(services, tmp_path, monkeypatch):
+    from directory_watcher import DirectoryWatcher
+    from import_queue import import_queue
+    _, import_service, _ = services
+
+    path = write_csv(tmp_path / 'a.csv', [(record_name('SN0001'), {'1000': 1.0})])
+    watcher = DirectoryWatcher(str(tmp_path), settle_seconds=0)
+    compute_file_hash = import_service.compute_file_hash
+
+    def _unreadable(file_path):
+        raise PermissionError('locked')
+
+    monkeypatch.setattr(import_service, 'compute_file_hash', _unreadable)
+    watcher.scan()
+    assert watcher.process_pending(force=True) == []
+
+    monkeypatch.setattr(import_service, 'compute_file_hash', compute_file_hash)
+    watcher.scan()
+    import_ids = watcher.process_pending(force=True)
+    import_queue.shutdown(wait=True)
+    assert len(import_ids) == 1
+
+    # 內容未變動，再次掃描不會重新排入
+    watcher.scan()
+    assert watcher.process_pending(force=True) == []
+    assert _count_records() == 1
+
+# ==================== 匯入模式 ====================
+
+@pytest.mark.parametrize('mode, expected', [('skip', -60.0), ('overwrite', -70.0), ('keep_latest', -70.0)])
+def test_write_conflict_retry_keeps_import_mode(services, tmp_path, monkeypatch, mode, expected):
+    from data_service import DatabaseService
+    from models import TestRecord, db_manager
+    database_service, import_service, _ = services
+
+    path = write_csv(tmp_path / 'a.csv', [(record_name('SN0001'), {'1000': -60.0})])
+    assert import_service.import_csv_file(path, 'a.csv')[0]
+
+    # 不支援 RETURNING 的路徑：第一次查詢既有記錄時看不到（模擬查詢後才由併發匯入寫入）
+    monkeypatch.setattr(db_manager.get_engine().dialect, 'insert_executemany_returning', False)
+    find_existing_keys = DatabaseService._find_existing_keys
+    calls = []
+
+    def _stale_lookup(session, keys, *args, **kwargs):
+        calls.append(1)
+        return {} if len(calls) == 1 else find_existing_keys(session, keys, *args, **kwargs)
+    monkeypatch.setattr(DatabaseService, '_find_existing_keys', staticmethod(_stale_lookup))
+
+    path = write_csv(tmp_path / 'b.csv', [(record_name('SN0001'), {'1000': -70.0})])
+    success, result = import_service.import_csv_file(path, 'b.csv', mode=mode)
+    assert success, result
+    assert len(calls) == 2  # 寫入衝突後重新查詢一次
+    assert result['statistics']['failed_imports'] == 0
+    assert result['statistics']['duplicate_skips'] == (1 if mode == 'skip' else 0)
+
+    with database_service.get_session(read_only=True) as session:
+        records = session.query(TestRecord).all()
+    assert len(records) == 1
+    assert records[0].get_frequency_data() == {'1000': expected}
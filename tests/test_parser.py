@@ -0,0 +1,161 @@
+"""
+CSV 解析測試：向量化解析、逐行解析與平行解析的結果一致性
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT_DIR, write_csv, record_name
+
+# 有效、檔名錯誤、日期/時間錯誤、SN 過短、數值超出範圍或無法轉換等情況
+EDGE_CASE_ROWS = [
+    (record_name('SN0001'), {'1000': -60.5, '2000': -55.0, '4000': -40.25}),
+    (record_name('SN0002', test_type='rec2'), {'1000': -61.0}),
+    (record_name('SN0003', date='20250230'), {'1000': -60.0}),
+    (record_name('SN0004', date='20251301'), {'1000': -60.0}),
+    (record_name('SN0005', date='00010101'), {'1000': -60.0}),
+    (record_name('SN0006', date='99991231'), {'1000': -60.0}),
+    (record_name('SN0007', date='20240229'), {'1000': -60.0}),
+    (record_name('SN0008', date='20230229'), {'1000': -60.0}),
+    (record_name('SN0009', time='240000'), {'1000': -60.0}),
+    (record_name('SN0010', time='235960'), {'1000': -60.0}),
+    (record_name('SN0011', time='236000'), {'1000': -60.0}),
+    (record_name('SN0012', time='235959'), {'1000': -60.0}),
+    (record_name('SN0013', test_type='middle'), {'1000': -60.0}),
+    ('not_a_record_name', {'1000': -60.0}),
+    ('', {'1000': -60.0}),
+    (record_name('SN0014') + '.wav', {'2000': -50.0}),
+    (record_name('SN1'), {'1000': -60.0}),
+    (record_name('SN0015'), {'1000': 60.0}),
+    (record_name('SN0016'), {'1000': -60.0, '2000': -300.0}),
+    (record_name('SN0017'), {'1000': 'nan'}),
+    (record_name('SN0018'), {'1000': 'abc', '2000': -50.0}),
+    (record_name('SN0019'), {}),
+    (record_name('SN0020', date='2025010'), {'1000': -60.0}),
+]
+
+@pytest.fixture
+def edge_case_csv(tmp_path):
+    return write_csv(tmp_path / 'edge.csv', EDGE_CASE_ROWS * 7)
+
+def _serial_records(file_path, chunk_size):
+    from csv_parser import CSVDataParser
+
+    parser = CSVDataParser()
+    records = []
+    for chunk in parser.iter_parse_csv_file(file_path, chunk_size=chunk_size):
+        records.extend(chunk)
+    return records, parser.stats
+
+def _record_contents(records):
+    """解析內容（不含驗證狀態：串流解析的記錄於寫入時才驗證，平行解析由 worker 先驗證）"""
+    return [(record.parsed_filename, record.frequency_data, record.original_row_index) for record in records]
+
+def _import_outcome(services, monkeypatch, file_path, workers):
+    """以指定解析行程數匯入後讀取匯入結果與寫入的記錄，再刪除本次匯入的記錄"""
+    from config import Config
+    from models import TestRecord
+    database_service, import_service, _ = services
+
+    monkeypatch.setattr(Config, 'PARSE_WORKERS', workers)
+    success, result = import_service.import_csv_file(file_path, 'edge.csv', chunk_size=17)
+    assert success, result
+    with database_service.get_session(read_only=True) as session:
+        records = sorted(
+            (record.sn, record.test_date, record.test_time, record.test_type, record.get_frequency_data())
+            for record in session.query(TestRecord)
+        )
+    database_service.delete_records(import_log_id=result['import_id'])
+    return result['statistics'], result['errors'], records
+
+def _counts(stats):
+    return {key: value for key, value in stats.items() if key != 'timings'}
+
+def test_vectorized_matches_row_by_row(edge_case_csv):
+    from csv_parser import CSVDataParser
+
+    vectorized, vectorized_stats = CSVDataParser().parse_csv_file(edge_case_csv, vectorized=True)
+    row_by_row, row_stats = CSVDataParser().parse_csv_file(edge_case_csv, vectorized=False)
+
+    assert vectorized == row_by_row
+    assert _counts(vectorized_stats) == _counts(row_stats)
+
+def test_date_column_matches_strptime():
+    """pandas 判定無效的日期（含超出 Timestamp 範圍的年份）以 strptime 確認，結果須與逐行驗證相同"""
+    import pandas as pd
+    from csv_parser import CSVDataParser, FilenameParser
+
+    values = ['20250101', '20240229', '20230229', '20250230', '20251301', '00010101', '99991231',
+              '16770101', '22621231', '19700101', '20250000']
+    series = pd.Series(values + [None], dtype=object)
+
+    is_ok = CSVDataParser._validate_datetime_column(series, series.notna(), '%Y%m%d',
+                                                    FilenameParser._validate_date)
+    assert is_ok.tolist()[:-1] == [FilenameParser._validate_date(value) for value in values]
+
+def test_parallel_import_matches_serial(services, monkeypatch, edge_case_csv):
+    serial = _import_outcome(services, monkeypatch, edge_case_csv, workers=1)
+    parallel = _import_outcome(services, monkeypatch, edge_case_csv, workers=2)
+
+    assert parallel == serial
+    statistics, errors, records = serial
+    assert statistics['failed_imports'] > 0 and errors
+    assert statistics['successful_imports'] == len(records) > 0
+
+def test_parallel_parser_matches_serial_parse(edge_case_csv):
+    from parallel_parser import ParallelCSVParser
+
+    serial, serial_stats = _serial_records(edge_case_csv, chunk_size=17)
+
+    parser = ParallelCSVParser(2, chunk_size=17)
+    parallel = []
+    for records in parser.iter_parse_csv_file(edge_case_csv):
+        parallel.extend(records)
+
+    assert _record_contents(parallel) == _record_contents(serial)
+    assert all(record.validated for record in parallel)
+    assert _counts(parser.stats) == _counts(serial_stats)
+
+def test_parallel_multiple_files_keep_order(tmp_path):
+    from parallel_parser import ParallelCSVParser
+
+    files = [
+        write_csv(tmp_path / f'{index}.csv',
+                  [(record_name(f'SN{index:02d}{row:03d}'), {'1000': -float(row)}) for row in range(40)])
+        for index in range(3)
+    ]
+    parser = ParallelCSVParser(2, chunk_size=7)
+    by_file = {}
+    for file_index, records in parser.iter_parse_csv_files([(path, 'utf-8') for path in files]):
+        if records is not None:
+            by_file.setdefault(file_index, []).extend(records)
+
+    for file_index, path in enumerate(files):
+        serial, serial_stats = _serial_records(path, chunk_size=7)
+        assert _record_contents(by_file[file_index]) == _record_contents(serial)
+        assert _counts(parser.file_stats[file_index]) == _counts(serial_stats)
+
+def test_parsers_with_different_worker_counts_share_no_executor(edge_case_csv):
+    from parallel_parser import ParallelCSVParser
+
+    first, second = ParallelCSVParser(2, chunk_size=17), ParallelCSVParser(3, chunk_size=17)
+    chunks = first.iter_parse_csv_file(edge_case_csv)
+    parsed = list(next(chunks))
+    # 另一個匯入要求不同大小的行程池，不影響仍在使用既有行程池的解析
+    assert sum(len(records) for records in second.iter_parse_csv_file(edge_case_csv)) > 0
+    for records in chunks:
+        parsed.extend(records)
+
+    assert first._get_executor() is not second._get_executor()
+    assert _record_contents(parsed) == _record_contents(_serial_records(edge_case_csv, chunk_size=17)[0])
+
+def test_frequency_bands_env_ignores_whitespace_and_empty_items():
+    env = dict(os.environ, FREQUENCY_BANDS=' 100, 125 ,,0160, ')
+    result = subprocess.run([sys.executable, '-c', 'from config import Config; '
+                             'print(Config.FREQUENCY_BANDS, sorted(Config.SUPPORTED_FREQUENCIES))'],
+                            cwd=ROOT_DIR, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "['100', '125', '160'] ['100', '125', '160']"
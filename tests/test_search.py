@@ -0,0 +1,44 @@
+"""
+SN 搜尋測試：包含搜尋的 trigram 索引與 LIKE 備援
+"""
+
+import pytest
+
+from conftest import write_csv, record_name
+
+SNS = ['ABC12345', 'ABD12345', 'XYZ98765']
+
+@pytest.fixture
+def imported(services, tmp_path):
+    _, import_service, _ = services
+    rows = [(record_name(sn), {'1000': -60.0}) for sn in SNS]
+    success, result = import_service.import_csv_file(write_csv(tmp_path / 'sns.csv', rows), 'sns.csv')
+    assert success, result
+
+@pytest.mark.parametrize('backend', ['fts5', 'like'])
+@pytest.mark.parametrize('pattern, expected', [
+    ('C12', ['ABC12345']),
+    ('c12', ['ABC12345']),
+    ('12345', ['ABC12345', 'ABD12345']),
+    ('C1', ['ABC12345']),  # 短於 trigram 長度
+    ('Z', ['XYZ98765']),
+    ('', SNS),
+    ('B_1', []),  # 萬用字元須視為一般字元
+    ('_', []),
+    ('%', []),
+    ('A%5', []),
+    ('\\', []),
+])
+def test_contains_search(services, imported, monkeypatch, backend, pattern, expected):
+    from sn_search import sn_search
+
+    database_service, _, query_service = services
+    sn_search.ensure_initialized()
+    if backend == 'fts5' and sn_search.backend != 'fts5':
+        pytest.skip('SQLite 未支援 FTS5 trigram')
+    monkeypatch.setattr(sn_search, 'backend', backend)
+
+    assert query_service.search_sns(pattern, 'contains') == expected
+    if pattern:
+        records, _, _ = database_service.query_records(sn=pattern, sn_match='contains', count_mode='none')
+        assert sorted(record.sn for record in records) == expected
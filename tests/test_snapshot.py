@@ -0,0 +1,76 @@
+"""
+分析快照測試：增量刷新、啟動時建立、背景刷新等待與行程間鎖定
+"""
+
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import write_csv, record_name
+
+pytest.importorskip('pyarrow')
+
+@pytest.fixture
+def snapshot(services, tmp_path, monkeypatch):
+    from config import Config
+    from analytics_snapshot import AnalyticsSnapshot
+
+    monkeypatch.setattr(Config, 'SNAPSHOT_ENABLED', True)
+    return AnalyticsSnapshot(str(tmp_path / 'snapshot'))
+
+def _import(import_service, tmp_path, name, rows):
+    success, result = import_service.import_csv_file(write_csv(tmp_path / name, rows), name)
+    assert success, result
+
+def test_incremental_refresh_tracks_imports_and_deletes(services, snapshot, tmp_path):
+    database_service, import_service, _ = services
+
+    _import(import_service, tmp_path, 'a.csv', [
+        (record_name('SN0001'), {'1000': -60.0}),
+        (record_name('SN0002', date='20250102'), {'1000': -61.0}),
+    ])
+    result = snapshot.refresh()
+    assert (result['partitions'], result['written']) == (2, 2)
+    assert snapshot.read(['sn']).num_rows == 2
+
+    # 只重寫變動的分區
+    _import(import_service, tmp_path, 'b.csv', [(record_name('SN0003', date='20250102'), {'1000': -62.0})])
+    assert snapshot.refresh()['written'] == 1
+
+    database_service.delete_records(date_range=('20250101', '20250101'))
+    result = snapshot.refresh()
+    assert (result['partitions'], result['removed']) == (1, 1)
+    assert sorted(snapshot.read(['sn']).column('sn').to_pylist()) == ['SN0002', 'SN0003']
+
+def test_missing_snapshot_is_built_in_background(services, snapshot, tmp_path):
+    _, import_service, _ = services
+    _import(import_service, tmp_path, 'a.csv', [(record_name('SN0001'), {'1000': -60.0})])
+
+    assert not snapshot.ready
+    snapshot.ensure_initialized()
+    assert snapshot.wait(timeout=30)
+    assert snapshot.ready
+    assert snapshot.read(['sn']).num_rows == 1
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='flock 僅支援 POSIX')
+def test_refresh_waits_for_lock_held_by_other_process(services, snapshot, tmp_path):
+    import os
+
+    os.makedirs(snapshot.snapshot_dir, exist_ok=True)
+    lock_path = os.path.join(snapshot.snapshot_dir, snapshot.REFRESH_LOCK_FILE)
+    holder = subprocess.Popen([sys.executable, '-c', (
+        'import fcntl, sys, time\n'
+        f'handle = open({lock_path!r}, "a")\n'
+        'fcntl.flock(handle, fcntl.LOCK_EX)\n'
+        'print("locked", flush=True)\n'
+        'time.sleep(1)\n'
+    )], stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'locked'
+        start = time.perf_counter()
+        snapshot.refresh()
+        assert time.perf_counter() - start >= 0.5
+    finally:
+        holder.wait(10)
@@ -0,0 +1,149 @@
+"""
+統計摘要測試：增量累加、覆蓋/刪除後重算與全域計數
+"""
+
+import numpy as np
+import pytest
+
+from conftest import write_csv, record_name
+
+def _import(import_service, tmp_path, name, rows, mode=None):
+    success, result = import_service.import_csv_file(write_csv(tmp_path / name, rows), name, mode=mode)
+    assert success, result
+    return result
+
+def _assert_consistent(summary_service):
+    """摘要表內容與自明細資料重建的結果一致"""
+    result = summary_service.rebuild(verify=True)
+    assert result['mismatches'] == {'sn_summaries': 0, 'sn_frequency_summaries': 0,
+                                    'sn_frequency_daily_summaries': 0, 'summary_counts': 0}
+
+def _counts(database_service):
+    from summary_service import summary_service
+    with database_service.get_session(read_only=True) as session:
+        return {dimension: summary_service.get_count(session, dimension)
+                for dimension in ('total', 'sn')}
+
+@pytest.fixture(params=[True, False], ids=['returning', 'no_returning'])
+def returning(request, clean_db, monkeypatch):
+    """關閉方言的 RETURNING 能力，模擬 SQLite 3.35 以前的環境"""
+    if not request.param:
+        monkeypatch.setattr(clean_db.get_engine().dialect, 'insert_executemany_returning', False)
+    return request.param
+
+def test_incremental_add_counts_new_sns_once(services, tmp_path, returning):
+    from summary_service import summary_service
+    database_service, import_service, _ = services
+
+    _import(import_service, tmp_path, 'a.csv', [
+        (record_name('SN0001'), {'1000': -60.0}),
+        (record_name('SN0001', time='130000'), {'1000': -61.0}),
+        (record_name('SN0002', test_type='right'), {'1000': -62.0, '2000': -50.0}),
+    ])
+    assert _counts(database_service) == {'total': 3, 'sn': 2}
+
+    # 既有 SN 的新記錄不增加 SN 數，新 SN 只計一次
+    _import(import_service, tmp_path, 'b.csv', [
+        (record_name('SN0001', date='20250102'), {'1000': -63.0}),
+        (record_name('SN0003'), {'1000': -64.0}),
+        (record_name('SN0003', test_type='right'), {'1000': -65.0}),
+    ])
+    assert _counts(database_service) == {'total': 6, 'sn': 3}
+    _assert_consistent(summary_service)
+
+    # 重複匯入全部跳過
+    result = _import(import_service, tmp_path, 'b.csv', [(record_name('SN0003'), {'1000': -64.0})])
+    assert result['statistics']['duplicate_skips'] == 1
+    assert _counts(database_service) == {'total': 6, 'sn': 3}
+
+def test_register_sns_returns_only_new_sns(clean_db, returning):
+    from sn_search import sn_search
+
+    session = clean_db.get_session()
+    try:
+        assert sn_search.register_sns(session, ['SN0001', 'SN0002']) == {'SN0001', 'SN0002'}
+        assert sn_search.register_sns(session, ['SN0002', 'SN0003']) == {'SN0003'}
+        session.rollback()
+    finally:
+        session.close()
+
+def test_count_deltas_upsert_existing_and_new_keys(clean_db):
+    from collections import Counter
+    from models import SummaryCount
+    from summary_service import summary_service
+
+    session = clean_db.get_session()
+    try:
+        summary_service._apply_count_deltas(session, Counter({('total', ''): 5, ('fixture', '治具9'): 2}))
+        summary_service._apply_count_deltas(session, Counter({('total', ''): 3, ('fixture', '治具9'): -2,
+                                                              ('test_type', 'rec1'): 0}))
+        session.commit()
+        counts = {(row.dimension, row.key): row.count for row in session.query(SummaryCount)}
+    finally:
+        session.close()
+
+    assert counts[('total', '')] == 8
+    assert counts[('fixture', '治具9')] == 0
+    assert ('test_type', 'rec1') not in counts
+
+@pytest.mark.parametrize('mode', ['overwrite', 'keep_latest'])
+def test_overwrite_and_delete_refresh_summaries(services, tmp_path, mode, returning):
+    from summary_service import summary_service
+    database_service, import_service, _ = services
+
+    _import(import_service, tmp_path, 'a.csv', [
+        (record_name('SN0001'), {'1000': -60.0, '2000': -50.0}),
+        (record_name('SN0002'), {'1000': -62.0}),
+    ])
+    _import(import_service, tmp_path, 'b.csv', [
+        (record_name('SN0001'), {'1000': -70.0}),
+        (record_name('SN0004'), {'4000': -40.0}),
+    ], mode=mode)
+    assert _counts(database_service) == {'total': 3, 'sn': 3}
+    _assert_consistent(summary_service)
+
+    outcome = database_service.delete_records(sn='SN0001', sn_match='exact')
+    assert outcome['deleted'] == 1
+    assert _counts(database_service) == {'total': 2, 'sn': 2}
+    _assert_consistent(summary_service)
+
+def test_frequency_summary_matches_measurements(services, tmp_path):
+    from summary_service import summary_service
+    database_service, import_service, _ = services
+
+    values = [-60.0, -61.5, -59.25, -70.0, -45.5]
+    _import(import_service, tmp_path, 'a.csv', [
+        (record_name('SN0001', time=f'12{index:04d}'), {'1000': value}) for index, value in enumerate(values)
+    ])
+
+    with database_service.get_session(read_only=True) as session:
+        summary = summary_service.get_frequency_summary(session, 'SN0001', 1000)
+        statistics = summary_service.get_statistics(session)
+
+    assert summary['count'] == len(values)
+    assert summary['min_value'] == min(values) and summary['max_value'] == max(values)
+    assert summary['avg_value'] == pytest.approx(np.mean(values))
+    assert summary['std_value'] == pytest.approx(np.std(values))
+    assert statistics['top_sns'] == [{'sn': 'SN0001', 'count': len(values)}]
+    assert statistics['total_records'] == len(values)
+
+def test_ensure_initialized_backfills_older_summary_version(services, tmp_path):
+    from sqlalchemy import delete
+    from models import FrequencyDailySummary, SummaryCount
+    from summary_service import summary_service
+    database_service, import_service, _ = services
+
+    _import(import_service, tmp_path, 'a.csv', [(record_name('SN0001'), {'1000': -60.0})])
+    # 模擬新增每日摘要表之前建立的資料庫
+    with database_service.get_session() as session:
+        session.execute(delete(FrequencyDailySummary))
+        session.execute(delete(SummaryCount).where(SummaryCount.dimension == 'version'))
+        session.commit()
+
+    summary_service._initialized = False
+    summary_service.ensure_initialized()
+
+    with database_service.get_session(read_only=True) as session:
+        summary = summary_service.get_frequency_summary(session, 'SN0001', 1000,
+                                                        date_range=('20250101', '20250101'))
+    assert summary['count'] == 1 and summary['avg_value'] == -60.0